@@ -0,0 +1,85 @@
+"""Throughput of POST /transactions/bulk against one POST /transactions/ per record.
+
+Needs a running backend; every run writes fresh random hashes. Run from Backend/Database:
+
+    python -m HelperScripts.bench_bulk_insert --url http://localhost:8000 --count 5000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import aiohttp
+
+
+def make_records(count):
+    wallet_address = "0x" + uuid.uuid4().hex[:40]
+    return [
+        {
+            "wallet_address": wallet_address,
+            "transaction_hash": "0x" + uuid.uuid4().hex * 2,
+            "transaction_type": "onramp",
+            "transaction_status": "pending",
+        }
+        for _ in range(count)
+    ]
+
+
+async def insert_single(session, url, records, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(record):
+        async with semaphore:
+            async with session.post(f"{url}/transactions/", json=record) as response:
+                response.raise_for_status()
+
+    await asyncio.gather(*(post(record) for record in records))
+
+
+async def insert_bulk(session, url, records, batch_size):
+    for i in range(0, len(records), batch_size):
+        batch = records[i : i + batch_size]
+        async with session.post(f"{url}/transactions/bulk", json=batch) as response:
+            response.raise_for_status()
+            result = await response.json()
+            assert result["created"] == len(batch), result
+
+
+async def run(args):
+    async with aiohttp.ClientSession() as session:
+        for name, insert in (
+            (
+                f"single (concurrency {args.concurrency})",
+                lambda records: insert_single(
+                    session, args.url, records, args.concurrency
+                ),
+            ),
+            (
+                f"bulk (batches of {args.batch_size})",
+                lambda records: insert_bulk(
+                    session, args.url, records, args.batch_size
+                ),
+            ),
+        ):
+            records = make_records(args.count)
+            start = time.perf_counter()
+            await insert(records)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:<32} {args.count} rows in {elapsed:7.2f}s"
+                f" = {args.count / elapsed:9.0f} rows/s"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
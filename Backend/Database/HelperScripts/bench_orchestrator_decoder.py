@@ -0,0 +1,101 @@
+"""Throughput of orchestrator_decoder against eth_abi.decode on generated calldata.
+
+Encodes a mix of inputs for every Orchestrator function with eth_abi, checks that both
+decoders agree on them and times decoding the whole batch. Run from Backend/Database:
+
+    python -m HelperScripts.bench_orchestrator_decoder --count 20000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from eth_abi import decode, encode
+
+from orchestrator_decoder import get_decoder, load_abi
+
+
+def sample_value(abi_type):
+    if abi_type == "address":
+        return "0x" + uuid.uuid4().hex + uuid.uuid4().hex[:8]
+    if abi_type == "uint256":
+        return random.randrange(2**64)
+    if abi_type == "string":
+        return f"user-{uuid.uuid4().hex[:random.randrange(4, 32)]}@example.com"
+    if abi_type == "address[]":
+        return [sample_value("address") for _ in range(random.randrange(0, 8))]
+    raise ValueError(abi_type)
+
+
+def make_inputs(abi, selectors, count):
+    functions = [function for function in abi if function["type"] == "function"]
+    inputs = []
+    for _ in range(count):
+        function = random.choice(functions)
+        types = [arg["type"] for arg in function["inputs"]]
+        selector = bytes.fromhex(selectors[function["name"]][2:])
+        inputs.append(selector + encode(types, [sample_value(t) for t in types]))
+    return inputs
+
+
+def decode_with_eth_abi(abi, inputs):
+    types_by_selector = {
+        bytes.fromhex(selector[2:]): [arg["type"] for arg in function["inputs"]]
+        for function in abi
+        if function["type"] == "function"
+        for selector, name in get_decoder().selectors.items()
+        if name == function["name"]
+    }
+    return [decode(types_by_selector[data[:4]], data[4:]) for data in inputs]
+
+
+def normalize(value):
+    if isinstance(value, str) and value.startswith("0x"):
+        return value.lower()
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    abi = load_abi()
+    decoder = get_decoder()
+    selectors = {name: selector for selector, name in decoder.selectors.items()}
+    inputs = make_inputs(abi, selectors, args.count)
+    hex_inputs = ["0x" + data.hex() for data in inputs]
+
+    # Both decoders must agree before their speed means anything
+    expected = decode_with_eth_abi(abi, inputs)
+    for calldata, reference in zip(inputs, expected):
+        decoded = decoder.decode(calldata)
+        assert normalize(list(decoded.args.values())) == normalize(reference), decoded
+
+    for name, run in (
+        ("eth_abi.decode", lambda: decode_with_eth_abi(abi, inputs)),
+        ("decode_many(bytes)", lambda: decoder.decode_many(inputs)),
+        ("decode_many(hex str)", lambda: decoder.decode_many(hex_inputs)),
+    ):
+        elapsed = best_of(args.repeat, run)
+        print(
+            f"{name:<22} {args.count} inputs in {elapsed * 1000:8.1f}ms"
+            f" = {args.count / elapsed:10.0f} inputs/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
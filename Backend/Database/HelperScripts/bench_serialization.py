@@ -0,0 +1,91 @@
+"""Micro-benchmark of response encoding for the pending transactions payload.
+
+Compares the old path (jsonable_encoder walking plain dicts, then json.dumps) with the
+response-model path FastAPI now takes (pydantic serializing straight to JSON bytes) and
+with orjson on the raw rows. Run from Backend/Database:
+
+    python -m HelperScripts.bench_serialization --repeat 20
+"""
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from schemas import PendingTransactionsPage
+
+SIZES = (1, 100, 10_000)
+
+
+def make_payload(rows):
+    now = datetime.now(timezone.utc)
+    return {
+        "pending_transactions": [
+            {
+                "id": i,
+                "wallet_address": "0x" + uuid.uuid4().hex[:40],
+                "transaction_hash": "0x" + uuid.uuid4().hex * 2,
+                "transaction_type": "offramp",
+                "transaction_status": "pending",
+                "created_at": now,
+            }
+            for i in range(rows)
+        ],
+        "next_cursor": None,
+    }
+
+
+def encode_before(payload):
+    return json.dumps(jsonable_encoder(payload)).encode()
+
+
+PAGE_ADAPTER = TypeAdapter(PendingTransactionsPage)
+
+
+def encode_response_model(payload):
+    return PAGE_ADAPTER.dump_json(PAGE_ADAPTER.validate_python(payload))
+
+
+def encode_orjson(payload):
+    return orjson.dumps(payload)
+
+
+ENCODERS = {
+    "jsonable_encoder+json": encode_before,
+    "response_model": encode_response_model,
+    "orjson": encode_orjson,
+}
+
+
+def best_of(func, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(payload)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6}  " + "  ".join(f"{name:>22}" for name in ENCODERS))
+    for rows in SIZES:
+        payload = make_payload(rows)
+        baseline = best_of(encode_before, payload, args.repeat)
+        cells = []
+        for func in ENCODERS.values():
+            elapsed = best_of(func, payload, args.repeat)
+            cells.append(f"{elapsed * 1000:10.3f}ms ({baseline / elapsed:4.1f}x)")
+        print(f"{rows:>6}  " + "  ".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
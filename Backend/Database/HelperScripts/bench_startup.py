@@ -0,0 +1,106 @@
+"""Start-up time of the API container steps against the configured database.
+
+Times init_db.py on its schema-version fast path and, for comparison, the full set-up it
+used to run on every start, the import of main, and a uvicorn process from launch until
+/health/live and /health/ready answer 200. Run from Backend/Database after init_db.py has
+applied the migrations:
+
+    python -m HelperScripts.bench_startup --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+FULL_INIT = (
+    "import init_db; init_db.setup_database(); init_db.create_tables();"
+    " init_db.run_migrations()"
+)
+IMPORT_MAIN = (
+    "import time; start = time.perf_counter(); import main;"
+    " print(time.perf_counter() - start)"
+)
+
+
+def run_seconds(command):
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} did not answer 200 in time")
+
+
+def api_start(port, env):
+    """Returns the seconds from launching uvicorn until liveness and readiness answer."""
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        live = wait_for(f"{base}/health/live", start + 30)
+        ready = wait_for(f"{base}/health/ready", start + 30)
+        return live - start, ready - start
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def report(name, samples):
+    print(
+        f"{name:<30} min {min(samples) * 1000:8.1f}ms"
+        f"  median {statistics.median(samples) * 1000:8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8019)
+    args = parser.parse_args()
+
+    # Only start-up is measured, keep the background sweeper out of it
+    env = dict(os.environ, SWEEPER_MODE="external")
+    python = sys.executable
+    samples = {
+        "init_db.py (fast path)": [],
+        "init_db full set-up": [],
+        "import main": [],
+        "uvicorn until /health/live": [],
+        "uvicorn until /health/ready": [],
+    }
+    for _ in range(args.repeat):
+        samples["init_db.py (fast path)"].append(run_seconds([python, "init_db.py"]))
+        samples["init_db full set-up"].append(run_seconds([python, "-c", FULL_INIT]))
+        imported = subprocess.run(
+            [python, "-c", IMPORT_MAIN], check=True, capture_output=True, text=True
+        )
+        samples["import main"].append(float(imported.stdout.strip().splitlines()[-1]))
+        live, ready = api_start(args.port, env)
+        samples["uvicorn until /health/live"].append(live)
+        samples["uvicorn until /health/ready"].append(ready)
+
+    for name, values in samples.items():
+        report(name, values)
+
+
+if __name__ == "__main__":
+    main()
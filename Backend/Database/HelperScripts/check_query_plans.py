@@ -0,0 +1,118 @@
+"""EXPLAIN every endpoint query and fail if one of them scans a whole table.
+
+Run from Backend/Database after init_db.py has applied the migrations:
+
+    python -m HelperScripts.check_query_plans
+"""
+
+import asyncio
+import sys
+
+import asyncpg
+
+import database
+import queries
+
+WALLET = "0x0000000000000000000000000000000000000000"
+TX_HASH = "0x" + "0" * 64
+
+# Query name -> sample parameters used for EXPLAIN
+CHECKED_QUERIES = {
+    "CLAIM_DUE_TRANSACTIONS": ("worker", 60.0, 100),
+    "CLAIM_DUE_UNINCLUDED_TRANSACTIONS": ("worker", 60.0, 100, 3600.0),
+    "RESCHEDULE_TRANSACTIONS": (
+        [1, 2],
+        [5.0, 60.0],
+        [1, 3],
+        ["unknown", "included"],
+        "worker",
+    ),
+    "SELECT_PENDING_BY_HASHES": ([TX_HASH],),
+    "MARK_TRANSACTIONS_INCLUDED": ([1], [100]),
+    "SELECT_PENDING_INCLUDED_UP_TO": (100,),
+    "SELECT_PENDING_HASHES_FOR_WALLET": (WALLET,),
+    "SELECT_PENDING_REGISTRATION_FOR_WALLET": (WALLET,),
+    "SELECT_PENDING_ID_FOR_WALLET": (WALLET,),
+    "SELECT_PENDING_FOR_WALLET": (WALLET,),
+    "SELECT_PENDING_OFFRAMPS_FOR_WALLET": (WALLET,),
+    "SELECT_PENDING_FOR_WALLET_PAGE": (WALLET, 0, 101),
+    "SELECT_PENDING_OFFRAMPS_FOR_WALLET_PAGE": (WALLET, 0, 101),
+    "BULK_UPDATE_TRANSACTION_STATUSES": ([1, 2], ["success", "failed"]),
+    "SET_TRANSACTION_SUCCESS": (1,),
+    "BULK_DELETE_ONRAMPS_BY_HASH": ([TX_HASH],),
+    "UPDATE_ONRAMP_HASH": (TX_HASH, WALLET),
+    "DELETE_ONRAMP_BY_WALLET": (WALLET,),
+    "SELECT_ONRAMPS_BY_AGE": (),
+    "SELECT_PENDING_BACKLOG": (),
+    "ARCHIVE_SETTLED_TRANSACTIONS": (30 * 24 * 60 * 60.0, 500),
+    "SELECT_WALLET_STATE": (WALLET,),
+    "SELECT_WALLET_RANGE_END": (WALLET, 5000),
+    "SELECT_MAX_WALLET_ADDRESS": (),
+    "LOCK_WALLET_STATE_RANGE": (WALLET, WALLET),
+    "SELECT_ONRAMP_BY_WALLET": (WALLET,),
+    "SELECT_OLDEST_ONRAMP_EXCLUDING": ([WALLET],),
+    "SELECT_ONRAMP_WALLETS": (),
+    "SELECT_ONRAMP_WALLETS_PAGE": (0, 101),
+    "SELECT_INGESTION_CURSOR": ("blocks",),
+    "CLAIM_STATUS_OUTBOX": ("worker", 60.0, 500),
+    "DELETE_STATUS_OUTBOX": ([1, 2], "worker"),
+    "RETRY_STATUS_OUTBOX": ([1, 2], 5.0, "error", "worker"),
+    "SELECT_STATUS_OUTBOX_BACKLOG": (10000,),
+    "RELEASE_LEADER_LEASE": ("sweeper", "worker"),
+    "SELECT_LEADER_LEASE": ("sweeper",),
+    "SELECT_SCHEMA_VERSION": (),
+}
+
+# Queries that read a whole table by design (the NDJSON wallet stream, the matchmaking queue
+# load, the bounded outbox count)
+FULL_SCAN_ALLOWED = {
+    "SELECT_ONRAMP_WALLETS",
+    "SELECT_ONRAMPS_BY_AGE",
+    "SELECT_STATUS_OUTBOX_BACKLOG",
+}
+
+# Plan fragments that indicate a full table scan on CockroachDB and PostgreSQL respectively
+FULL_SCAN_MARKERS = ("FULL SCAN", "Seq Scan")
+
+
+async def explain(conn, sql, params):
+    rows = await conn.fetch(f"EXPLAIN {sql}", *params)
+    return "\n".join(str(list(row.values())[0]) for row in rows)
+
+
+async def main():
+    conn = await asyncpg.connect(database.DB_DSN)
+    try:
+        version = await conn.fetchval("SELECT version()")
+        if "CockroachDB" not in version:
+            # PostgreSQL happily seq-scans tiny tables, so make it show the index it would use
+            await conn.execute("SET enable_seqscan = off")
+
+        failures = []
+        for name, params in CHECKED_QUERIES.items():
+            plan = await explain(conn, getattr(queries, name), params)
+            uses_full_scan = any(marker in plan for marker in FULL_SCAN_MARKERS)
+            print(f"{'FULL SCAN' if uses_full_scan else 'ok':>9}  {name}")
+            if uses_full_scan and name not in FULL_SCAN_ALLOWED:
+                failures.append((name, plan))
+
+        unchecked = [
+            name
+            for name, value in vars(queries).items()
+            if name.isupper()
+            and isinstance(value, str)
+            and name not in CHECKED_QUERIES
+            and not value.lstrip().upper().startswith("INSERT")
+        ]
+        for name in unchecked:
+            failures.append((name, "query is not listed in CHECKED_QUERIES"))
+
+        for name, plan in failures:
+            print(f"\n{name}:\n{plan}")
+        return 1 if failures else 0
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,440 @@
+"""Load test of the backend with a seeded database and a synthetic zkSync RPC node.
+
+Seeds transactions and openonramps at the requested scale, serves a synthetic zks RPC
+node with configurable statuses and latency, starts the backend against both and drives
+a weighted mix of registration polls, pending lookups, inserts, wallet listings and
+status refreshes from closed-loop clients. Afterwards every seeded pending transaction
+is made due and one full reconciler sweep over them is timed, followed by draining the
+status outbox it filled. Run from Backend/Database against a dedicated benchmark
+database, the sweep claims any due transaction:
+
+    python -m HelperScripts.load_test --wallets 1000 --duration 30 --output run.json
+    python -m HelperScripts.load_test --compare run.json --max-regression 0.2
+
+Seeded wallets share the address prefix 0x10ad and are deleted before each run. Results
+are printed as a table and written as JSON; --compare prints the change against an
+earlier result file and exits with status 1 if throughput or p99 latency of any request
+type regressed by more than --max-regression.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import aiohttp
+from aiohttp import web
+
+import database
+import queries
+import wallet_state
+from bulk_insert import BULK_INSERT_CHUNK_SIZE
+from HelperScripts.zksync_rpc_stub import make_app
+
+WALLET_PREFIX = "0x10ad"
+TRANSACTION_TYPES = ("register", "onramp", "offramp")
+# Relative weights of the request types in the traffic mix
+DEFAULT_MIX = "registration=35,pending=25,refresh=15,insert=15,wallets=10"
+# Answers of zks_getTransactionDetails and their shares
+DEFAULT_STATUSES = "Included=0.6,Verified=0.3,Failed=0.1"
+
+
+def parse_weights(text):
+    weights = {}
+    for part in text.split(","):
+        key, _, value = part.partition("=")
+        weights[key.strip()] = float(value)
+    return weights
+
+
+def wallet(index):
+    return f"{WALLET_PREFIX}{index:036x}"
+
+
+def tx_hash(*parts):
+    return "0x" + hashlib.sha256("/".join(map(str, parts)).encode()).hexdigest()
+
+
+class SyntheticChain:
+    """zks_getTransactionDetails answers drawn from a status distribution.
+
+    The status of a hash is derived from the hash itself, so every run and every repeated
+    lookup sees the same answer.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.cumulative = []
+        total = 0.0
+        for share in statuses.values():
+            total += share
+            self.cumulative.append(total)
+        self.calls = 0
+
+    def handle(self, method, params):
+        self.calls += 1
+        if method != "zks_getTransactionDetails":
+            raise KeyError(method)
+        point = int(params[0][-8:], 16) / 0xFFFFFFFF * self.cumulative[-1]
+        for status, bound in zip(self.statuses, self.cumulative):
+            if point <= bound:
+                return {"status": status}
+        return {"status": self.statuses[-1]}
+
+
+async def seed(args):
+    """Replaces the seeded wallets with args.wallets wallets of fresh transactions.
+
+    Every wallet gets one registration plus args.transactions onramps and offramps, of
+    which args.pending_share stay pending; the first args.onramps wallets have an open
+    onramp.
+    """
+    rows = ([], [], [], [])
+    for index in range(args.wallets):
+        for number in range(args.transactions + 1):
+            pending = random.random() < args.pending_share
+            rows[0].append(wallet(index))
+            rows[1].append(tx_hash("seed", index, number))
+            rows[2].append(
+                "register" if number == 0 else random.choice(TRANSACTION_TYPES[1:])
+            )
+            rows[3].append("pending" if pending else "success")
+
+    async with database.get_db_connection() as conn:
+        await conn.execute(
+            "DELETE FROM transactions WHERE wallet_address LIKE $1", WALLET_PREFIX + "%"
+        )
+        await conn.execute(
+            "DELETE FROM openonramps WHERE wallet_address LIKE $1", WALLET_PREFIX + "%"
+        )
+        await conn.execute(
+            "DELETE FROM wallet_state WHERE wallet_address LIKE $1", WALLET_PREFIX + "%"
+        )
+        await conn.execute(
+            "DELETE FROM status_outbox WHERE wallet_address LIKE $1",
+            WALLET_PREFIX + "%",
+        )
+        for i in range(0, len(rows[0]), BULK_INSERT_CHUNK_SIZE):
+            async with conn.transaction():
+                inserted = await conn.fetch(
+                    queries.BULK_INSERT_TRANSACTIONS,
+                    *(column[i : i + BULK_INSERT_CHUNK_SIZE] for column in rows),
+                )
+                await wallet_state.record_inserted(conn, inserted)
+        # Parked until the sweep, so the backend's first reconciler tick leaves them alone
+        await conn.execute(
+            "UPDATE transactions SET next_check_at = now() + INTERVAL '1 day'"
+            " WHERE transaction_status = 'pending' AND wallet_address LIKE $1",
+            WALLET_PREFIX + "%",
+        )
+        onramps = [
+            (wallet(index), tx_hash("onramp", index))
+            for index in range(min(args.onramps, args.wallets))
+        ]
+        await conn.executemany(queries.INSERT_ONRAMP, onramps)
+        await wallet_state.set_open_onramp(
+            conn, [wallet_address for wallet_address, _ in onramps], True
+        )
+    return len(rows[0])
+
+
+async def start_rpc_stub(args):
+    chain = SyntheticChain(parse_weights(args.statuses))
+    runner = web.AppRunner(make_app(chain, args.rpc_latency, args.rpc_error_rate))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.rpc_port).start()
+    return runner, chain
+
+
+async def start_backend(args, session):
+    env = dict(
+        os.environ,
+        ZKSYNC_RPC_URLS=f"http://127.0.0.1:{args.rpc_port}",
+        # The sweep is measured separately, keep it out of the request latencies
+        SWEEPER_MODE="external",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/metrics/db_pool") as response:
+                if response.status == 200:
+                    return process, url
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not start within 30s")
+
+
+def make_requests(args):
+    """Returns request type -> function building (method, path, json body) for a client."""
+    inserted = iter(range(sys.maxsize))
+
+    def any_wallet():
+        return wallet(random.randrange(args.wallets))
+
+    return {
+        "registration": lambda: (
+            "GET",
+            f"/transactions/{any_wallet()}/registration_status",
+            None,
+        ),
+        "pending": lambda: ("GET", f"/transactions/{any_wallet()}/pending", None),
+        "refresh": lambda: (
+            "POST",
+            f"/transactions/{any_wallet()}/update_transaction_status",
+            None,
+        ),
+        "insert": lambda: (
+            "POST",
+            "/transactions/",
+            {
+                "wallet_address": any_wallet(),
+                "transaction_hash": tx_hash("load", args.run_id, next(inserted)),
+                "transaction_type": random.choice(TRANSACTION_TYPES[1:]),
+                "transaction_status": "pending",
+            },
+        ),
+        "wallets": lambda: ("GET", "/wallets/", None),
+    }
+
+
+async def drive(args, session, url):
+    """Runs args.concurrency closed-loop clients for args.duration seconds.
+
+    Returns:
+        dict: request type -> list of (latency seconds, HTTP status or 0 on a client error)
+    """
+    mix = parse_weights(args.mix)
+    builders = make_requests(args)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    samples = {kind: [] for kind in kinds}
+    deadline = time.monotonic() + args.duration
+
+    async def client():
+        while time.monotonic() < deadline:
+            kind = random.choices(kinds, weights)[0]
+            method, path, body = builders[kind]()
+            start = time.perf_counter()
+            try:
+                async with session.request(method, url + path, json=body) as response:
+                    await response.read()
+                    status = response.status
+            except aiohttp.ClientError:
+                status = 0
+            samples[kind].append((time.perf_counter() - start, status))
+
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    return samples
+
+
+def percentile(ordered, share):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def summarize(samples, duration):
+    summary = {}
+    for kind, results in list(samples.items()) + [
+        ("total", [result for results in samples.values() for result in results])
+    ]:
+        latencies = sorted(latency for latency, _ in results)
+        summary[kind] = {
+            "requests": len(results),
+            "errors": sum(1 for _, status in results if status == 0 or status >= 500),
+            "rate_limited": sum(1 for _, status in results if status == 429),
+            "statuses": dict(Counter(str(status) for _, status in results)),
+            "throughput_rps": len(results) / duration,
+            "p50_ms": (percentile(latencies, 0.5) * 1000 if latencies else None),
+            "p99_ms": (percentile(latencies, 0.99) * 1000 if latencies else None),
+        }
+    return summary
+
+
+async def sweep():
+    """Makes every seeded pending transaction due and times one reconciler pass over them,
+    then times draining the status outbox the pass filled.
+
+    Returns:
+        dict: transactions claimed and updated, batches, elapsed seconds and outbox drain
+    """
+    # Imported here so the RPC client picks up ZKSYNC_RPC_URLS set in main()
+    import outbox
+    import reconciler
+    from rpc_client import rpc_client
+
+    async with database.get_db_connection() as conn:
+        await conn.execute(
+            "UPDATE transactions SET next_check_at = now(), lease_expires_at = NULL"
+            " WHERE transaction_status = 'pending' AND wallet_address LIKE $1",
+            WALLET_PREFIX + "%",
+        )
+    totals = {"claimed": 0, "updated": 0, "batches": 0}
+    start = time.perf_counter()
+    try:
+        while True:
+            result = await reconciler.reconcile_batch()
+            if not result["claimed"]:
+                break
+            totals["batches"] += 1
+            totals["claimed"] += result["claimed"]
+            totals["updated"] += result["updated"]
+    finally:
+        await rpc_client.close()
+    totals["seconds"] = time.perf_counter() - start
+    totals["rows_per_s"] = (
+        totals["claimed"] / totals["seconds"] if totals["seconds"] else None
+    )
+
+    start = time.perf_counter()
+    drained = await outbox.drain()
+    totals["outbox_entries"] = drained["claimed"]
+    totals["outbox_seconds"] = time.perf_counter() - start
+    return totals
+
+
+def print_results(results):
+    print(
+        f"{'request':<14}{'requests':>10}{'errors':>8}{'429':>7}"
+        f"{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+    )
+    for kind, stats in results["requests"].items():
+        print(
+            f"{kind:<14}{stats['requests']:>10}{stats['errors']:>8}"
+            f"{stats['rate_limited']:>7}{stats['throughput_rps']:>10.1f}"
+            f"{stats['p50_ms'] or 0:>10.2f}{stats['p99_ms'] or 0:>10.2f}"
+        )
+    sweep_stats = results["sweep"]
+    print(
+        f"sweep: {sweep_stats['claimed']} transactions in {sweep_stats['batches']}"
+        f" batches, {sweep_stats['seconds']:.2f}s"
+        f" ({sweep_stats['rows_per_s'] or 0:.0f} rows/s),"
+        f" {sweep_stats['updated']} updated; outbox: {sweep_stats['outbox_entries']}"
+        f" entries in {sweep_stats['outbox_seconds']:.2f}s"
+    )
+
+
+def compare(results, baseline, max_regression):
+    """Prints throughput and p99 changes against baseline.
+
+    Returns:
+        bool: True if no request type regressed by more than max_regression
+    """
+    passed = True
+    for kind, stats in results["requests"].items():
+        before = baseline["requests"].get(kind)
+        if not before or not before["throughput_rps"] or not before["p99_ms"]:
+            continue
+        throughput = stats["throughput_rps"] / before["throughput_rps"] - 1
+        p99 = (stats["p99_ms"] or 0) / before["p99_ms"] - 1
+        regressed = throughput < -max_regression or p99 > max_regression
+        passed = passed and not regressed
+        print(
+            f"{kind:<14} throughput {throughput:+7.1%}  p99 {p99:+7.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    before, after = baseline["sweep"]["seconds"], results["sweep"]["seconds"]
+    if before:
+        change = after / before - 1
+        regressed = change > max_regression
+        passed = passed and not regressed
+        print(
+            f"{'sweep':<14} duration {change:+9.1%}{'  REGRESSION' if regressed else ''}"
+        )
+    return passed
+
+
+async def run(args):
+    random.seed(args.seed)
+    seeded = await seed(args)
+    print(f"Seeded {seeded} transactions for {args.wallets} wallets")
+
+    runner, chain = await start_rpc_stub(args)
+    try:
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=args.concurrency)
+        ) as session:
+            process, url = await start_backend(args, session)
+            try:
+                samples = await drive(args, session, url)
+            finally:
+                process.terminate()
+                process.wait()
+        rpc_calls = chain.calls
+        sweep_stats = await sweep()
+        sweep_stats["rpc_calls"] = chain.calls - rpc_calls
+    finally:
+        await runner.cleanup()
+        await database.db_pool.close()
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "compare", "max_regression")
+        },
+        "seeded_transactions": seeded,
+        "requests": summarize(samples, args.duration),
+        "sweep": sweep_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wallets", type=int, default=1000)
+    parser.add_argument(
+        "--transactions", type=int, default=5, help="onramps and offramps per wallet"
+    )
+    parser.add_argument("--pending-share", type=float, default=0.3)
+    parser.add_argument("--onramps", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--statuses", default=DEFAULT_STATUSES)
+    parser.add_argument(
+        "--rpc-latency", type=float, default=0.05, help="seconds per RPC request"
+    )
+    parser.add_argument("--rpc-error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--rpc-port", type=int, default=18545)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    args.run_id = os.urandom(4).hex()
+
+    # The in-process sweep talks to the same synthetic node as the backend
+    os.environ["ZKSYNC_RPC_URLS"] = f"http://127.0.0.1:{args.rpc_port}"
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
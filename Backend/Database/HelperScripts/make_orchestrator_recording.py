@@ -0,0 +1,103 @@
+"""Writes a zksync_rpc_stub recording of blocks full of generated Orchestrator calls.
+
+Every block holds a few encoded Orchestrator calls, some of them reverted, next to
+transfers and calls to other contracts, so the indexer can be run end to end against the
+stub. Run from Backend/Database:
+
+    python -m HelperScripts.make_orchestrator_recording orchestrator.json --blocks 2000
+    python -m HelperScripts.zksync_rpc_stub serve orchestrator.json --port 8545
+    ZKSYNC_RPC_URLS=http://127.0.0.1:8545 ORCHESTRATOR_ADDRESS=0x... \\
+        python -m orchestrator_indexer --from-block 1 --to-block 2000
+"""
+
+import argparse
+import json
+import random
+import uuid
+
+from eth_abi import encode
+
+from HelperScripts.bench_orchestrator_decoder import sample_value
+from orchestrator_decoder import get_decoder, load_abi
+
+DEFAULT_ORCHESTRATOR = "0x" + "0c" * 20
+
+
+def random_hash():
+    return "0x" + uuid.uuid4().hex + uuid.uuid4().hex
+
+
+def orchestrator_call(function, selector):
+    types = [arg["type"] for arg in function["inputs"]]
+    return selector + encode(types, [sample_value(t) for t in types]).hex()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording")
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--first-block", type=int, default=1)
+    parser.add_argument("--calls-per-block", type=int, default=4)
+    parser.add_argument("--other-per-block", type=int, default=6)
+    parser.add_argument("--revert-rate", type=float, default=0.05)
+    parser.add_argument("--address", default=DEFAULT_ORCHESTRATOR)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    functions = [function for function in load_abi() if function["type"] == "function"]
+    selectors = {name: selector for selector, name in get_decoder().selectors.items()}
+    address = args.address.lower()
+
+    recording = {"blocks": [], "receipts": {}, "transaction_details": {}}
+    expected = 0
+    for number in range(args.first_block, args.first_block + args.blocks):
+        transactions = []
+        for _ in range(args.calls_per_block):
+            function = random.choice(functions)
+            transactions.append(
+                {
+                    "hash": random_hash(),
+                    "from": sample_value("address"),
+                    "to": address,
+                    "input": orchestrator_call(function, selectors[function["name"]]),
+                }
+            )
+        expected += len(transactions)
+        for _ in range(args.other_per_block):
+            # Plain transfers, unknown selectors to the Orchestrator and other contracts
+            to, data = random.choice(
+                [
+                    (sample_value("address"), "0x"),
+                    (address, "0xdeadbeef" + "00" * 32),
+                    (sample_value("address"), "0xa9059cbb" + "00" * 64),
+                ]
+            )
+            transactions.append(
+                {
+                    "hash": random_hash(),
+                    "from": sample_value("address"),
+                    "to": to,
+                    "input": data,
+                }
+            )
+        random.shuffle(transactions)
+        recording["blocks"].append({"number": number, "transactions": transactions})
+        for tx in transactions:
+            reverted = random.random() < args.revert_rate
+            recording["receipts"][tx["hash"]] = "0x0" if reverted else "0x1"
+            recording["transaction_details"][tx["hash"]] = (
+                "failed" if reverted else "verified"
+            )
+
+    recording["finalized"] = args.first_block + args.blocks - 1
+    with open(args.recording, "w") as file:
+        json.dump(recording, file)
+    print(
+        f"Wrote {args.blocks} blocks with {expected} Orchestrator calls to"
+        f" {address} into {args.recording}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Simulates status polling strategies: RPC calls per hour against confirmation latency.
+
+Generates transactions arriving at a steady rate. Each one is first unknown to the node
+(propagation), then pending, included and finally verified, or reverted. A share is
+dropped (unknown forever) or stuck (pending forever). Every strategy checks the same
+transactions at reconciler tick granularity:
+
+    fixed     the original sweep, every hash every 600 s
+    age       the previous schedule by transaction age, 5 s up to 900 s
+    adaptive  polling_policy, also once per --included-max-delays value
+
+The first two fail a hash the node does not know at once, as the old status mapping did.
+No database or node is needed. Run from Backend/Database:
+
+    python -m HelperScripts.simulate_polling --hours 72 --rate 200
+"""
+
+import argparse
+import math
+import random
+import statistics
+
+from polling_policy import NO_ANSWER, PollingPolicy
+from sync_transaction_statuses import map_zksync_status
+
+SWEEP_INTERVAL = 600
+# (maximum transaction age in seconds, seconds until the next check) of the age schedule
+AGE_SCHEDULE = [(60, 5), (10 * 60, 15), (60 * 60, 60), (24 * 60 * 60, 300)]
+AGE_MAX_INTERVAL = 900
+
+
+class Transaction:
+    def __init__(self, created_at, kind, propagated, included, verified):
+        self.created_at = created_at
+        self.kind = kind  # "ok", "reverted", "dropped" or "stuck"
+        # Seconds after creation the node knows the hash, includes and verifies it
+        self.propagated = propagated
+        self.included = included
+        self.verified = verified
+
+    def rpc_status(self, now):
+        age = now - self.created_at
+        if self.kind == "dropped" or age < self.propagated:
+            return "unknown"
+        if self.kind == "stuck" or age < self.included:
+            return "pending"
+        if self.kind == "reverted":
+            return "failed"
+        return "included" if age < self.verified else "verified"
+
+    @property
+    def settled_at(self):
+        """Time the node first reports the final status, None if it never does."""
+        if self.kind == "reverted":
+            return self.created_at + self.included
+        if self.kind == "ok":
+            return self.created_at + self.verified
+        return None
+
+
+def generate(args):
+    transactions = []
+    now = 0.0
+    end = args.hours * 3600
+    while True:
+        now += random.expovariate(args.rate / 3600)
+        if now >= end:
+            return transactions
+        roll = random.random()
+        if roll < args.drop_rate:
+            kind = "dropped"
+        elif roll < args.drop_rate + args.stuck_rate:
+            kind = "stuck"
+        elif roll < args.drop_rate + args.stuck_rate + args.revert_rate:
+            kind = "reverted"
+        else:
+            kind = "ok"
+        propagated = random.expovariate(1 / args.propagation)
+        included = propagated + random.expovariate(1 / args.inclusion)
+        verified = included + random.uniform(*args.verification) * 60
+        transactions.append(Transaction(now, kind, propagated, included, verified))
+
+
+def fixed_delay(previous, attempts, rpc_status, age):
+    return previous, attempts, SWEEP_INTERVAL
+
+
+def age_delay(previous, attempts, rpc_status, age):
+    for max_age, delay in AGE_SCHEDULE:
+        if age < max_age:
+            return previous, attempts, delay
+    return previous, attempts, AGE_MAX_INTERVAL
+
+
+def old_mapping(status):
+    """The status mapping before polling_policy: unknown hashes failed at once."""
+    return "failed" if status == "unknown" else map_zksync_status(status)
+
+
+def simulate(tx, first_check, next_check, mapping, args, end):
+    """Checks one transaction until it settles, expires or the simulation ends.
+
+    Returns:
+        tuple: (checks made, outcome, time of the outcome)
+    """
+    tick = args.tick
+    now = first_check
+    previous, attempts, checks = None, 0, 0
+    while now < end:
+        checks += 1
+        if random.random() < args.no_answer_rate:
+            rpc_status = NO_ANSWER
+        else:
+            rpc_status = tx.rpc_status(now)
+            status = mapping(rpc_status)
+            if status != "pending":
+                return checks, status, now
+        previous, attempts, delay = next_check(
+            previous, attempts, rpc_status, now - tx.created_at
+        )
+        if delay is None:
+            return checks, "expired", now
+        now = math.ceil((now + delay) / tick) * tick
+    return checks, "pending", None
+
+
+def run(name, transactions, first_check, next_check, mapping, args):
+    end = args.hours * 3600
+    checks = 0
+    latencies = []
+    revert_latencies = []
+    resolved_unsettled = []
+    wrongly_failed = 0
+    unresolved = 0
+    for tx in transactions:
+        made, outcome, at = simulate(
+            tx, first_check(tx), next_check, mapping, args, end
+        )
+        checks += made
+        if outcome == "pending":
+            unresolved += 1
+        elif tx.settled_at is None:
+            # Dropped or stuck: any failure is right, the sooner the better
+            resolved_unsettled.append(at - tx.created_at)
+        elif outcome == "failed" and tx.kind == "ok" or outcome == "expired":
+            wrongly_failed += 1
+        elif tx.kind == "reverted":
+            revert_latencies.append(at - tx.settled_at)
+        else:
+            latencies.append(at - tx.settled_at)
+    return {
+        "strategy": name,
+        "rpc_per_hour": checks / args.hours,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "revert_p50": percentile(revert_latencies, 50),
+        "dead_resolved": len(resolved_unsettled),
+        "dead_p50_hours": percentile(resolved_unsettled, 50) / 3600,
+        "wrongly_failed": wrongly_failed,
+        "unresolved": unresolved,
+    }
+
+
+def percentile(values, percent):
+    if not values:
+        return float("nan")
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=72)
+    parser.add_argument("--rate", type=float, default=200, help="transactions per hour")
+    parser.add_argument("--drop-rate", type=float, default=0.03)
+    parser.add_argument("--stuck-rate", type=float, default=0.01)
+    parser.add_argument("--revert-rate", type=float, default=0.02)
+    parser.add_argument(
+        "--propagation", type=float, default=2, help="mean seconds until known"
+    )
+    parser.add_argument(
+        "--inclusion", type=float, default=5, help="mean seconds until included"
+    )
+    parser.add_argument(
+        "--verification",
+        type=float,
+        nargs=2,
+        default=(60, 240),
+        help="minutes from inclusion to verification, uniform between the two",
+    )
+    parser.add_argument("--no-answer-rate", type=float, default=0.01)
+    parser.add_argument("--tick", type=float, default=5, help="reconciler tick seconds")
+    parser.add_argument(
+        "--included-max-delays",
+        default="120,600,900",
+        help="extra adaptive runs with these POLL_INCLUDED_MAX_DELAY values",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    transactions = generate(args)
+    print(f"{len(transactions)} transactions over {args.hours:g} hours")
+
+    def next_tick(tx):
+        return math.ceil(tx.created_at / args.tick) * args.tick
+
+    def next_sweep(tx):
+        return math.ceil(tx.created_at / SWEEP_INTERVAL) * SWEEP_INTERVAL
+
+    strategies = [
+        ("fixed", next_sweep, fixed_delay, old_mapping),
+        ("age", next_tick, age_delay, old_mapping),
+        ("adaptive", next_tick, PollingPolicy().next_check, map_zksync_status),
+    ]
+    for value in args.included_max_delays.split(","):
+        if value:
+            policy = PollingPolicy(included_max_delay=float(value))
+            strategies.append(
+                (
+                    f"adaptive inc<={value}s",
+                    next_tick,
+                    policy.next_check,
+                    map_zksync_status,
+                )
+            )
+
+    print(
+        f"{'strategy':<22}{'rpc/hour':>10}{'p50 s':>9}{'p95 s':>9}{'revert s':>10}"
+        f"{'dead done':>11}{'dead p50 h':>12}{'wrong fail':>12}{'open':>7}"
+    )
+    for name, first_check, next_check, mapping in strategies:
+        # Same no-answer draws for every strategy
+        random.seed(args.seed + 1)
+        row = run(name, transactions, first_check, next_check, mapping, args)
+        print(
+            f"{row['strategy']:<22}{row['rpc_per_hour']:>10.0f}"
+            f"{row['latency_p50']:>9.1f}{row['latency_p95']:>9.1f}"
+            f"{row['revert_p50']:>10.1f}"
+            f"{row['dead_resolved']:>11}{row['dead_p50_hours']:>12.2f}"
+            f"{row['wrongly_failed']:>12}{row['unresolved']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Local zkSync JSON-RPC stub serving recorded blocks, receipts and transaction details.
+
+Serve a recording (point ZKSYNC_RPC_URL at it):
+
+    python -m HelperScripts.zksync_rpc_stub serve recording.json --port 8545
+
+Record a block range from a real node, --full-transactions keeps hash, from, to and input of
+every transaction for the Orchestrator indexer:
+
+    python -m HelperScripts.zksync_rpc_stub record recording.json --url https://sepolia.era.zksync.dev --from-block 100 --to-block 120
+
+Recording format:
+
+    {
+        "finalized": 110,
+        "blocks": [
+            {"number": 100, "transactions": ["0xabc..."]},
+            {"number": 101, "transactions": [{"hash": "0xdef...", "to": "0x...", "input": "0x..."}]}
+        ],
+        "receipts": {"0xabc...": "0x1"},
+        "transaction_details": {"0xabc...": "Verified"}
+    }
+
+Run several stubs with different --latency and --error-rate values and list them all in
+ZKSYNC_RPC_URLS to exercise endpoint failover, hedging and the circuit breaker.
+
+Block transactions are hashes or transaction objects; eth_getBlockByNumber returns the
+hashes, or the objects when its second parameter asks for full transactions.
+
+Single calls and JSON-RPC batches are supported for eth_blockNumber, eth_getBlockByNumber
+(numbers and the latest/finalized tags), eth_getTransactionReceipt and
+zks_getTransactionDetails.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+import aiohttp
+from aiohttp import web
+
+
+class RecordedChain:
+    def __init__(self, recording):
+        self.blocks = {block["number"]: block for block in recording.get("blocks", [])}
+        self.head = max(self.blocks, default=0)
+        self.finalized = recording.get("finalized", self.head)
+        self.receipts = {
+            tx.lower(): status for tx, status in recording.get("receipts", {}).items()
+        }
+        self.details = {
+            tx.lower(): status
+            for tx, status in recording.get("transaction_details", {}).items()
+        }
+        self.calls = 0
+
+    def _block(self, tag, full=False):
+        if tag == "latest":
+            number = self.head
+        elif tag == "finalized":
+            number = self.finalized
+        else:
+            number = int(tag, 16)
+        block = self.blocks.get(number)
+        if block is None:
+            return None
+        if full:
+            transactions = [
+                tx if isinstance(tx, dict) else {"hash": tx}
+                for tx in block["transactions"]
+            ]
+        else:
+            transactions = [
+                tx["hash"] if isinstance(tx, dict) else tx
+                for tx in block["transactions"]
+            ]
+        return {"number": hex(number), "transactions": transactions}
+
+    def handle(self, method, params):
+        self.calls += 1
+        if method == "eth_blockNumber":
+            return hex(self.head)
+        if method == "eth_getBlockByNumber":
+            return self._block(params[0], len(params) > 1 and params[1])
+        if method == "eth_getTransactionReceipt":
+            status = self.receipts.get(params[0].lower())
+            return {"transactionHash": params[0], "status": status} if status else None
+        if method == "zks_getTransactionDetails":
+            status = self.details.get(params[0].lower())
+            return {"status": status} if status else None
+        raise KeyError(method)
+
+
+def make_app(chain, latency=0.0, error_rate=0.0):
+    async def rpc(request):
+        body = await request.json()
+        if latency:
+            await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            return web.Response(status=503, text="stub failure")
+
+        def answer(call):
+            try:
+                result = chain.handle(call["method"], call.get("params", []))
+                return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+            except KeyError:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": call.get("id"),
+                    "error": {"code": -32601, "message": "Method not found"},
+                }
+
+        if isinstance(body, list):
+            return web.json_response([answer(call) for call in body])
+        return web.json_response(answer(body))
+
+    app = web.Application()
+    app.router.add_post("/", rpc)
+    return app
+
+
+async def record(url, from_block, to_block, out_path, full_transactions=False):
+    async with aiohttp.ClientSession() as session:
+
+        async def call(method, params):
+            payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+            async with session.post(url, json=payload) as response:
+                return (await response.json())["result"]
+
+        recording = {"blocks": [], "receipts": {}, "transaction_details": {}}
+        finalized = await call("eth_getBlockByNumber", ["finalized", False])
+        recording["finalized"] = int(finalized["number"], 16)
+        for number in range(from_block, to_block + 1):
+            block = await call("eth_getBlockByNumber", [hex(number), full_transactions])
+            transactions = block["transactions"]
+            if full_transactions:
+                transactions = [
+                    {key: tx.get(key) for key in ("hash", "from", "to", "input")}
+                    for tx in transactions
+                ]
+            recording["blocks"].append({"number": number, "transactions": transactions})
+            for tx in transactions:
+                tx_hash = tx["hash"] if full_transactions else tx
+                receipt = await call("eth_getTransactionReceipt", [tx_hash])
+                details = await call("zks_getTransactionDetails", [tx_hash])
+                recording["receipts"][tx_hash] = receipt["status"]
+                recording["transaction_details"][tx_hash] = details["status"]
+
+    with open(out_path, "w") as file:
+        json.dump(recording, file, indent=2)
+    print(f"Recorded blocks {from_block}-{to_block} to {out_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("recording")
+    serve_parser.add_argument("--port", type=int, default=8545)
+    serve_parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every request"
+    )
+    serve_parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="share of requests answered with HTTP 503",
+    )
+
+    record_parser = subparsers.add_parser("record")
+    record_parser.add_argument("recording")
+    record_parser.add_argument("--url", required=True)
+    record_parser.add_argument("--from-block", type=int, required=True)
+    record_parser.add_argument("--to-block", type=int, required=True)
+    record_parser.add_argument("--full-transactions", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        with open(args.recording) as file:
+            chain = RecordedChain(json.load(file))
+        web.run_app(make_app(chain, args.latency, args.error_rate), port=args.port)
+    else:
+        asyncio.run(
+            record(
+                args.url,
+                args.from_block,
+                args.to_block,
+                args.recording,
+                args.full_transactions,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import os
+
+import database
+import instrumentation
+import queries
+import reconciler
+from polling_policy import POLL_UNKNOWN_DEADLINE
+from sync_transaction_statuses import RpcError, rpc_batch, rpc_call
+
+# Name of this ingestion stream in ingestion_cursors
+CURSOR_NAME = os.getenv("INGESTOR_CURSOR_NAME", "zksync_blocks")
+# First block to scan when no cursor is stored yet, defaults to the current head
+START_BLOCK = os.getenv("INGESTOR_START_BLOCK")
+# Blocks fetched and matched per pass
+MAX_BLOCKS_PER_PASS = int(os.getenv("INGESTOR_MAX_BLOCKS_PER_PASS", "100"))
+# Blocks requested in one JSON-RPC batch
+BLOCK_BATCH_SIZE = int(os.getenv("INGESTOR_BLOCK_BATCH_SIZE", "25"))
+# Seconds to wait before polling for new blocks once the cursor has caught up with the head
+POLL_INTERVAL = float(os.getenv("INGESTOR_POLL_INTERVAL", "2"))
+
+
+async def get_cursor():
+    async with database.get_db_connection() as conn:
+        return await conn.fetchval(queries.SELECT_INGESTION_CURSOR, CURSOR_NAME)
+
+
+async def fetch_block_transactions(block_numbers):
+    """Fetches the transaction hashes of the given blocks in batched eth_getBlockByNumber calls.
+
+    Raises:
+        RpcError: a block could not be fetched, so the cursor must not move past it
+
+    Returns:
+        dict: Key=block number; value=list of transaction hashes
+    """
+    blocks = {}
+    for i in range(0, len(block_numbers), BLOCK_BATCH_SIZE):
+        batch = block_numbers[i : i + BLOCK_BATCH_SIZE]
+        results = await rpc_batch(
+            [("eth_getBlockByNumber", [hex(number), False]) for number in batch]
+        )
+        for number, block in zip(batch, results):
+            if isinstance(block, RpcError) or block is None:
+                raise RpcError(f"Block {number} is not available yet")
+            blocks[number] = [tx.lower() for tx in block["transactions"]]
+    return blocks
+
+
+async def fetch_failed_hashes(transaction_hashes, semaphore=None):
+    """Returns the subset of included transactions whose receipt reports a revert.
+
+    Args:
+        transaction_hashes (list): hashes of included transactions
+        semaphore (asyncio.Semaphore): optional limit on concurrent POSTs, shared with
+            the caller's other RPC batches
+    """
+    if not transaction_hashes:
+        return set()
+    receipts = await rpc_batch(
+        [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in transaction_hashes],
+        semaphore,
+    )
+    return {
+        tx_hash
+        for tx_hash, receipt in zip(transaction_hashes, receipts)
+        if isinstance(receipt, dict) and receipt.get("status") == "0x0"
+    }
+
+
+async def _record_inclusions(conn, inclusions, cursor):
+    if inclusions:
+        await conn.execute(
+            queries.MARK_TRANSACTIONS_INCLUDED,
+            [tx_id for tx_id, _ in inclusions],
+            [block_number for _, block_number in inclusions],
+        )
+    await conn.execute(queries.UPSERT_INGESTION_CURSOR, CURSOR_NAME, cursor)
+
+
+async def ingest_blocks(from_block, to_block):
+    """Matches the transactions of blocks from_block..to_block against pending transactions.
+
+    Included transactions are tagged with their block, reverted ones are marked failed right
+    away, and the cursor moves to to_block in the same transaction as the inclusion tags.
+
+    Returns:
+        dict: number of scanned blocks, matched transactions and failed transactions
+    """
+    blocks = await fetch_block_transactions(list(range(from_block, to_block + 1)))
+    block_of_hash = {
+        tx_hash: number for number, hashes in blocks.items() for tx_hash in hashes
+    }
+
+    matched = []
+    if block_of_hash:
+        async with database.get_db_connection() as conn:
+            matched = await conn.fetch(
+                queries.SELECT_PENDING_BY_HASHES, list(block_of_hash)
+            )
+
+    failed_hashes = await fetch_failed_hashes(
+        [tx["transaction_hash"] for tx in matched]
+    )
+    if failed_hashes:
+        await reconciler.apply_status_updates(
+            matched, {tx_hash: "failed" for tx_hash in failed_hashes}
+        )
+
+    inclusions = [
+        (tx["id"], block_of_hash[tx["transaction_hash"]])
+        for tx in matched
+        if tx["transaction_hash"] not in failed_hashes
+    ]
+    async with database.get_db_connection() as conn:
+        await database.run_in_transaction(
+            conn, _record_inclusions, inclusions, to_block
+        )
+    return {
+        "blocks": len(blocks),
+        "matched": len(matched),
+        "failed": len(failed_hashes),
+    }
+
+
+async def settle_finalized():
+    """Marks pending transactions included at or below the finalized block as successful.
+
+    zkSync reports a transaction as verified once its batch is executed on L1, which is
+    exactly what the "finalized" block tag tracks.
+
+    Returns:
+        dict: counts from apply_status_updates
+    """
+    finalized = await rpc_call("eth_getBlockByNumber", ["finalized", False])
+    if not finalized:
+        return {"updated": 0, "failed": 0}
+
+    async with database.get_db_connection() as conn:
+        settled = await conn.fetch(
+            queries.SELECT_PENDING_INCLUDED_UP_TO, int(finalized["number"], 16)
+        )
+    return await reconciler.apply_status_updates(
+        settled, {tx["transaction_hash"]: "success" for tx in settled}
+    )
+
+
+async def expire_unincluded():
+    """Checks transactions no ingested block contained within POLL_UNKNOWN_DEADLINE by hash.
+
+    One reconciler batch per pass, so polling_policy fails hashes the node does not know
+    and stuck ones past their deadline, and settles transactions included before the
+    cursor started. Younger transactions cost no RPC calls.
+
+    Returns:
+        dict: counts from reconciler.reconcile_batch
+    """
+    return await reconciler.reconcile_batch(unincluded_older_than=POLL_UNKNOWN_DEADLINE)
+
+
+@instrumentation.timed("block_ingestion_pass")
+async def run_pass():
+    """Ingests up to MAX_BLOCKS_PER_PASS new blocks and settles finalized transactions.
+
+    RPC cost depends on the number of new blocks plus one receipt per matched transaction,
+    independent of how many transactions are pending.
+
+    Returns:
+        dict: ingestion, settlement and expiry counts, caught_up is True once the head is
+            reached
+    """
+    head = int(await rpc_call("eth_blockNumber", []), 16)
+    cursor = await get_cursor()
+    if cursor is None:
+        cursor = int(START_BLOCK) - 1 if START_BLOCK else head - 1
+
+    result = {"blocks": 0, "matched": 0, "failed": 0}
+    to_block = min(head, cursor + MAX_BLOCKS_PER_PASS)
+    if to_block > cursor:
+        result = await ingest_blocks(cursor + 1, to_block)
+
+    settled = await settle_finalized()
+    checked = await expire_unincluded()
+    return {
+        **result,
+        "settled": settled["updated"],
+        "expired": checked["expired"],
+        "caught_up": to_block >= head,
+    }
+
+
+async def run_forever():
+    """Background task following the chain block by block instead of polling every hash."""
+    logging.info(f"Starting block ingestion for cursor {CURSOR_NAME}")
+    instrumentation.current_operation.set("block_ingestor")
+    while True:
+        try:
+            result = await run_pass()
+            if result["matched"] or result["settled"] or result["expired"]:
+                logging.info(
+                    f"Ingested {result['blocks']} blocks, matched {result['matched']} "
+                    f"pending transactions, settled {result['settled']}, "
+                    f"expired {result['expired']}"
+                )
+            if result["caught_up"]:
+                await asyncio.sleep(POLL_INTERVAL)
+        except Exception as e:
+            # Keep following the chain through transient database or RPC failures
+            logging.error(f"Block ingestion pass failed: {e}")
+            await asyncio.sleep(POLL_INTERVAL)
@@ -0,0 +1,252 @@
+import logging
+import os
+
+import orjson
+from pydantic import ValidationError
+
+import database
+import queries
+import wallet_state
+from cache import response_cache
+from schemas import TransactionBase
+
+# Rows written per database transaction by the bulk endpoint
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+# Upper bound on records accepted in one bulk request
+BULK_INSERT_MAX_ITEMS = int(os.getenv("BULK_INSERT_MAX_ITEMS", "50000"))
+
+# Mirror the CHECK constraints of the transactions table, so one bad record is rejected
+# up front instead of failing the whole chunk it was written with
+TRANSACTION_TYPES = {"register", "onramp", "offramp"}
+TRANSACTION_STATUSES = {"pending", "success", "failed"}
+
+
+class BulkPayloadError(ValueError):
+    """Raised when a JSON array bulk request body cannot be decoded."""
+
+
+def parse_records(body):
+    """Decodes a JSON array bulk request body into a list of raw records.
+
+    Args:
+        body (bytes): request body
+
+    Raises:
+        BulkPayloadError: malformed JSON or too many records
+
+    Returns:
+        list: decoded records, not validated yet
+    """
+    try:
+        records = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise BulkPayloadError(f"Malformed JSON: {e}")
+    if not isinstance(records, list):
+        raise BulkPayloadError("Expected a JSON array of transactions")
+    if len(records) > BULK_INSERT_MAX_ITEMS:
+        raise BulkPayloadError(
+            f"At most {BULK_INSERT_MAX_ITEMS} transactions per request"
+        )
+    return records
+
+
+async def iter_lines(byte_chunks):
+    """Yields the non-blank lines of a body arriving in arbitrary byte chunks."""
+    buffered = b""
+    async for data in byte_chunks:
+        buffered += data
+        *lines, buffered = buffered.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffered.strip():
+        yield buffered
+
+
+def validate_record(index, record, first_index_of_hash):
+    """Validates one raw record and checks it against the hashes seen before it.
+
+    Args:
+        index (int): position of the record in the request
+        record: decoded record
+        first_index_of_hash (dict): Key=transaction_hash; value=index of its first record,
+            updated with accepted records
+
+    Returns:
+        tuple: (TransactionBase, None) for an accepted record, (None, result) otherwise
+    """
+    try:
+        transaction = TransactionBase.model_validate(record)
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        return None, {
+            "status": "invalid",
+            "error": f"{field}: {error['msg']}" if field else error["msg"],
+        }
+    if transaction.transaction_type not in TRANSACTION_TYPES:
+        return None, {
+            "status": "invalid",
+            "transaction_hash": transaction.transaction_hash,
+            "error": f"Unknown transaction_type {transaction.transaction_type!r}",
+        }
+    if transaction.transaction_status not in TRANSACTION_STATUSES:
+        return None, {
+            "status": "invalid",
+            "transaction_hash": transaction.transaction_hash,
+            "error": f"Unknown transaction_status {transaction.transaction_status!r}",
+        }
+    if transaction.transaction_hash in first_index_of_hash:
+        return None, {
+            "status": "duplicate",
+            "transaction_hash": transaction.transaction_hash,
+            "error": f"Repeats item {first_index_of_hash[transaction.transaction_hash]}",
+        }
+    first_index_of_hash[transaction.transaction_hash] = index
+    return transaction, None
+
+
+def validate_records(records):
+    """Validates raw records and drops repeated hashes within the request.
+
+    Returns:
+        tuple: (list of (index, TransactionBase) to insert, dict of index -> result for
+            records that were rejected)
+    """
+    accepted = []
+    rejected = {}
+    first_index_of_hash = {}
+    for index, record in enumerate(records):
+        transaction, rejection = validate_record(index, record, first_index_of_hash)
+        if transaction is None:
+            rejected[index] = rejection
+        else:
+            accepted.append((index, transaction))
+    return accepted, rejected
+
+
+async def _insert_chunk(conn, chunk):
+    inserted = await conn.fetch(
+        queries.BULK_INSERT_TRANSACTIONS,
+        [tx.wallet_address for _, tx in chunk],
+        [tx.transaction_hash for _, tx in chunk],
+        [tx.transaction_type for _, tx in chunk],
+        [tx.transaction_status for _, tx in chunk],
+    )
+    await wallet_state.record_inserted(conn, inserted)
+    return inserted
+
+
+async def _insert_accepted(accepted, results):
+    async with database.get_db_connection() as conn:
+        for i in range(0, len(accepted), BULK_INSERT_CHUNK_SIZE):
+            chunk = accepted[i : i + BULK_INSERT_CHUNK_SIZE]
+            try:
+                inserted = await database.run_in_transaction(conn, _insert_chunk, chunk)
+            except (database.PoolExhaustedError, database.DatabaseUnavailableError):
+                raise
+            except Exception as e:
+                logging.error(f"Failed to insert {len(chunk)} transactions: {e}")
+                for index, tx in chunk:
+                    results[index] = {
+                        "status": "failed",
+                        "transaction_hash": tx.transaction_hash,
+                        "error": str(e),
+                    }
+                continue
+
+            id_of_hash = {row["transaction_hash"]: row["id"] for row in inserted}
+            for index, tx in chunk:
+                if tx.transaction_hash in id_of_hash:
+                    results[index] = {
+                        "status": "created",
+                        "transaction_hash": tx.transaction_hash,
+                        "id": id_of_hash[tx.transaction_hash],
+                    }
+                else:
+                    results[index] = {
+                        "status": "duplicate",
+                        "transaction_hash": tx.transaction_hash,
+                        "error": "Transaction hash already stored",
+                    }
+            await response_cache.invalidate_wallets(
+                [
+                    tx.wallet_address
+                    for _, tx in chunk
+                    if tx.transaction_hash in id_of_hash
+                ]
+            )
+
+
+def _summary(results, total):
+    counts = {"created": 0, "duplicate": 0, "invalid": 0, "failed": 0}
+    for result in results.values():
+        counts[result["status"]] += 1
+    return {
+        **counts,
+        "results": [{"index": index, **results[index]} for index in range(total)],
+    }
+
+
+async def insert_transactions(records):
+    """Validates and stores many transactions, BULK_INSERT_CHUNK_SIZE rows per transaction.
+
+    Each chunk commits on its own, so a failing chunk only fails its own items. Hashes that
+    are already stored are reported as duplicates and left untouched.
+
+    Args:
+        records (list): raw records as decoded from the request body
+
+    Returns:
+        dict: per-status counts and one result per record, in request order
+    """
+    accepted, results = validate_records(records)
+    if accepted:
+        await _insert_accepted(accepted, results)
+    return _summary(results, len(records))
+
+
+async def insert_ndjson(byte_chunks):
+    """Stores NDJSON records while the body arrives, like insert_transactions.
+
+    Every BULK_INSERT_CHUNK_SIZE accepted records are written before more of the body is
+    read, so only one chunk of records is held at a time. Earlier chunks may already be
+    committed when a later line turns out bad, so malformed lines and lines beyond
+    BULK_INSERT_MAX_ITEMS are reported as invalid items instead of failing the request.
+
+    Args:
+        byte_chunks: async iterator over the request body, e.g. request.stream()
+
+    Returns:
+        dict: per-status counts and one result per non-blank line, in request order
+    """
+    results = {}
+    accepted = []
+    first_index_of_hash = {}
+    index = 0
+    async for line in iter_lines(byte_chunks):
+        if index >= BULK_INSERT_MAX_ITEMS:
+            results[index] = {
+                "status": "invalid",
+                "error": f"At most {BULK_INSERT_MAX_ITEMS} transactions per request",
+            }
+        else:
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                results[index] = {"status": "invalid", "error": f"Malformed JSON: {e}"}
+            else:
+                transaction, rejection = validate_record(
+                    index, record, first_index_of_hash
+                )
+                if transaction is None:
+                    results[index] = rejection
+                else:
+                    accepted.append((index, transaction))
+        index += 1
+        if len(accepted) >= BULK_INSERT_CHUNK_SIZE:
+            await _insert_accepted(accepted, results)
+            accepted = []
+    if accepted:
+        await _insert_accepted(accepted, results)
+    return _summary(results, index)
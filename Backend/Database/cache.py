@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+# Seconds a cached response stays valid when nothing invalidates it earlier
+CACHE_TTL = float(os.getenv("CACHE_TTL", "10"))
+# Entries kept by the in-process backend before the least recently used ones are evicted
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# Optional shared backend, e.g. redis://localhost:6379/0, so invalidations reach every worker
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+# Namespaces of cached data
+REGISTRATION_STATUS = "registration_status"
+PENDING_TRANSACTIONS = "pending_transactions"
+PENDING_OFFRAMPS = "pending_offramps"
+WALLET_LISTING = "wallet_listing"
+
+# Namespaces keyed by wallet address
+WALLET_NAMESPACES = (REGISTRATION_STATUS, PENDING_TRANSACTIONS, PENDING_OFFRAMPS)
+
+
+class LocalBackend:
+    """In-process LRU cache with per-entry expiry, private to one worker."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (namespace, key) -> (expires_at, value)
+
+    async def get(self, namespace, key):
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[(namespace, key)]
+            return None
+        self._entries.move_to_end((namespace, key))
+        return value
+
+    async def set(self, namespace, key, value, ttl):
+        self._entries[(namespace, key)] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, namespace, keys):
+        for key in keys:
+            self._entries.pop((namespace, key), None)
+
+    async def clear(self, namespace):
+        for entry_key in [k for k in self._entries if k[0] == namespace]:
+            del self._entries[entry_key]
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared cache in Redis, values stored as JSON with the TTL enforced by Redis."""
+
+    def __init__(self, url):
+        # Imported lazily so redis stays an optional dependency
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+
+    @staticmethod
+    def _key(namespace, key):
+        return f"zwift:{namespace}:{key}"
+
+    async def get(self, namespace, key):
+        raw = await self._client.get(self._key(namespace, key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, namespace, key, value, ttl):
+        raw = json.dumps(value, default=lambda o: o.isoformat())
+        await self._client.set(self._key(namespace, key), raw, px=int(ttl * 1000))
+
+    async def delete(self, namespace, keys):
+        if keys:
+            await self._client.delete(*(self._key(namespace, key) for key in keys))
+
+    async def clear(self, namespace):
+        keys = [key async for key in self._client.scan_iter(self._key(namespace, "*"))]
+        if keys:
+            await self._client.delete(*keys)
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    """Read-through cache for hot read endpoints with explicit invalidation on writes.
+
+    Backend errors are logged and treated as misses, so a cache outage never fails a request.
+    """
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self._hits = {}
+        self._misses = {}
+
+    async def get_or_load(self, namespace, key, loader):
+        """Returns the cached value for key or stores and returns the result of loader().
+
+        Args:
+            namespace (str): one of the namespaces defined in this module
+            key (str): cache key inside the namespace
+            loader (coroutine function): computes the value on a miss; exceptions are not cached
+
+        Returns:
+            Any: JSON-serializable value
+        """
+        try:
+            value = await self.backend.get(namespace, key)
+        except Exception as e:
+            logging.warning(f"Cache read failed for {namespace}: {e}")
+            value = None
+
+        if value is not None:
+            self._hits[namespace] = self._hits.get(namespace, 0) + 1
+            return value
+
+        self._misses[namespace] = self._misses.get(namespace, 0) + 1
+        value = await loader()
+        try:
+            await self.backend.set(namespace, key, value, self.ttl)
+        except Exception as e:
+            logging.warning(f"Cache write failed for {namespace}: {e}")
+        return value
+
+    async def invalidate(self, namespace, *keys):
+        try:
+            await self.backend.delete(namespace, keys)
+        except Exception as e:
+            logging.warning(f"Cache invalidation failed for {namespace}: {e}")
+
+    async def invalidate_wallets(self, wallet_addresses):
+        """Drops every per-wallet entry of the given wallets after their transactions changed."""
+        wallet_addresses = list(set(wallet_addresses))
+        for namespace in WALLET_NAMESPACES:
+            await self.invalidate(namespace, *wallet_addresses)
+
+    async def invalidate_wallet_listing(self):
+        try:
+            await self.backend.clear(WALLET_LISTING)
+        except Exception as e:
+            logging.warning(f"Cache invalidation failed for {WALLET_LISTING}: {e}")
+
+    def metrics(self):
+        """Hit/miss counters per namespace.
+
+        Returns:
+            dict: backend name, entry count (local backend only) and per-namespace hit ratios
+        """
+        namespaces = {}
+        for namespace in set(self._hits) | set(self._misses):
+            hits = self._hits.get(namespace, 0)
+            misses = self._misses.get(namespace, 0)
+            namespaces[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses),
+            }
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "ttl": self.ttl,
+            "namespaces": namespaces,
+        }
+
+
+response_cache = ResponseCache(
+    (
+        RedisBackend(CACHE_REDIS_URL)
+        if CACHE_REDIS_URL
+        else LocalBackend(CACHE_MAX_ENTRIES)
+    ),
+    CACHE_TTL,
+)
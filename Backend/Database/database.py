@@ -1,20 +1,217 @@
-import time
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncio
+import logging
 import os
+import random
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+import instrumentation
+
+DB_DSN = f"postgres://root@{os.getenv('DB_HOST', 'localhost')}:26257/state_database"
+
+# Pool sizing and behaviour, all overridable from the environment
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+# Seconds a request waits for a free connection before we give up with a 503
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "2"))
+# Connections idle for longer than this are closed by the pool and reopened on demand
+POOL_HEALTHCHECK_IDLE = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
+# Ping every connection with SELECT 1 when it is checked out. Off by default: it costs a
+# round trip per request, idle connections are already closed after
+# DB_POOL_HEALTHCHECK_IDLE and a dead connection fails its first query just the same
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") == "1"
+# Seconds allowed for opening a single new connection
+CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+# Times a transaction is re-run after CockroachDB asks the client to retry it
+TRANSACTION_RETRIES = int(os.getenv("DB_TRANSACTION_RETRIES", "5"))
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection became available within the acquire timeout."""
+
+
+class DatabaseUnavailableError(Exception):
+    """Raised when the pool cannot open a connection to the database."""
+
+
+class ConnectionPool:
+    """asyncpg connection pool with bounded waits, checkout health checks and usage counters.
+
+    Every coroutine in the process shares this pool, so a single uvicorn worker can serve
+    many concurrent requests without tying up a threadpool thread per blocking query.
+    """
+
+    def __init__(
+        self, dsn, min_size, max_size, acquire_timeout, healthcheck_idle, pre_ping
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.healthcheck_idle = healthcheck_idle
+        self.pre_ping = pre_ping
+
+        self._pool = None
+        self._init_lock = None
+
+        self._in_use = 0
+        self._acquired_total = 0
+        self._timeouts_total = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    async def _init_connection(self, conn):
+        # Runs once per new connection
+        conn.add_query_logger(instrumentation.observe_query)
+
+    async def _setup_connection(self, conn):
+        # Runs on every checkout; with pre_ping a broken connection raises here and acquire
+        # retries once, the pool opening a new connection for that attempt
+        if self.pre_ping:
+            await conn.fetchval("SELECT 1")
+
+    async def get_pool(self):
+        # Created lazily so importing the module never touches the database
+        if self._pool is None:
+            if self._init_lock is None:
+                self._init_lock = asyncio.Lock()
+            async with self._init_lock:
+                if self._pool is None:
+                    try:
+                        self._pool = await asyncpg.create_pool(
+                            dsn=self.dsn,
+                            min_size=self.min_size,
+                            max_size=self.max_size,
+                            max_inactive_connection_lifetime=self.healthcheck_idle,
+                            init=self._init_connection,
+                            setup=self._setup_connection,
+                            timeout=CONNECT_TIMEOUT,
+                        )
+                    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+                        raise DatabaseUnavailableError(
+                            f"Failed to connect to the database: {e}"
+                        ) from e
+        return self._pool
+
+    async def warm_up(self):
+        """Opens the pool ahead of the first request without failing start-up.
+
+        An unreachable database is left to the readiness probe and the requests to report.
+        """
+        try:
+            await self.get_pool()
+        except DatabaseUnavailableError as e:
+            logging.warning(f"Database not reachable yet: {e}")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Checks out a connection, waiting at most acquire_timeout seconds for a free one.
+
+        Raises:
+            PoolExhaustedError: all max_size connections stayed busy for the whole wait
+            DatabaseUnavailableError: a new connection could not be opened
+
+        Yields:
+            asyncpg.Connection: connection that is returned to the pool on exit
+        """
+        pool = await self.get_pool()
+        start = time.monotonic()
+        # A connection failing to open or its checkout ping is dropped by the pool, so one
+        # retry gets a freshly opened connection before we report the database as down
+        for attempt in range(2):
+            try:
+                conn = await pool.acquire(timeout=self.acquire_timeout)
+                break
+            except asyncio.TimeoutError as e:
+                self._timeouts_total += 1
+                instrumentation.DB_POOL_ACQUIRE_TIMEOUTS.inc()
+                raise PoolExhaustedError(
+                    f"No database connection available within {self.acquire_timeout}s"
+                ) from e
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                if attempt == 1:
+                    raise DatabaseUnavailableError(str(e)) from e
+
+        waited = time.monotonic() - start
+        self._in_use += 1
+        self._acquired_total += 1
+        self._wait_time_total += waited
+        self._wait_time_max = max(self._wait_time_max, waited)
+        instrumentation.DB_POOL_ACQUIRE_DURATION.observe(waited)
+        try:
+            yield conn
+        finally:
+            self._in_use -= 1
+            await pool.release(conn)
+
+    def metrics(self):
+        """Snapshot of pool usage counters.
+
+        Returns:
+            dict: sizes, in-use/idle connection counts and acquire wait statistics
+        """
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "in_use": self._in_use,
+            "idle": self._pool.get_idle_size() if self._pool is not None else 0,
+            "acquired_total": self._acquired_total,
+            "timeouts_total": self._timeouts_total,
+            "wait_time_avg_ms": (
+                self._wait_time_total / self._acquired_total * 1000
+                if self._acquired_total
+                else 0.0
+            ),
+            "wait_time_max_ms": self._wait_time_max * 1000,
+        }
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+db_pool = ConnectionPool(
+    DB_DSN,
+    POOL_MIN_SIZE,
+    POOL_MAX_SIZE,
+    POOL_ACQUIRE_TIMEOUT,
+    POOL_HEALTHCHECK_IDLE,
+    POOL_PRE_PING,
+)
 
 
 def get_db_connection():
-    attempts = 0
-    while attempts < 5:
+    """Async context manager checking out a pooled connection.
+
+    Usage:
+        async with database.get_db_connection() as conn:
+            row = await conn.fetchrow(...)
+    """
+    return db_pool.acquire()
+
+
+async def run_in_transaction(conn, func, *args):
+    """Runs func(conn, *args) in its own transaction, retrying on serialization conflicts.
+
+    CockroachDB runs every transaction as SERIALIZABLE and reports contention with
+    SQLSTATE 40001, expecting the client to retry the whole transaction.
+
+    Args:
+        conn (asyncpg.Connection): connection checked out from the pool
+        func (coroutine function): transaction body, must be safe to run more than once
+
+    Returns:
+        Any: whatever func returns
+    """
+    for attempt in range(TRANSACTION_RETRIES + 1):
         try:
-            conn = psycopg2.connect(
-                dsn=f"postgres://root@{os.getenv('DB_HOST', 'localhost')}:26257/state_database",
-                cursor_factory=RealDictCursor,
-            )
-            return conn
-        except psycopg2.OperationalError as e:
-            print(f"Failed to connect to the database, retrying... ({attempts + 1})")
-            time.sleep(5)  # wait for 5 seconds before retrying
-            attempts += 1
-    raise Exception("Failed to connect to the database after several attempts")
+            async with conn.transaction():
+                return await func(conn, *args)
+        except asyncpg.SerializationError:
+            if attempt == TRANSACTION_RETRIES:
+                raise
+            # Jittered exponential backoff so conflicting sweeps do not retry in lockstep
+            await asyncio.sleep(0.05 * 2**attempt * random.random())
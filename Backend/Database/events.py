@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+# Events buffered per subscriber; a client that falls further behind loses the oldest ones
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+# Seconds between keep-alive comments on idle event streams
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+# Optional shared broker, e.g. redis://localhost:6379/0, so a status change written by one
+# worker reaches subscribers connected to any other worker
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL")
+
+EVENTS_CHANNEL = "zwift:transaction_events"
+
+
+class RedisBroker:
+    """Relays events between worker processes through a Redis pub/sub channel."""
+
+    def __init__(self, url):
+        # Imported lazily so redis stays an optional dependency
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+
+    async def publish(self, message):
+        await self._client.publish(EVENTS_CHANNEL, orjson.dumps(message))
+
+    async def listen(self, deliver):
+        pubsub = self._client.pubsub()
+        await pubsub.subscribe(EVENTS_CHANNEL)
+        try:
+            async for raw in pubsub.listen():
+                if raw["type"] == "message":
+                    deliver(orjson.loads(raw["data"]))
+        finally:
+            await pubsub.unsubscribe(EVENTS_CHANNEL)
+            await pubsub.close()
+
+
+class EventHub:
+    """In-process pub/sub of transaction status changes, keyed by wallet address.
+
+    Without a broker, events reach the subscribers of this worker only. With one, every
+    event goes through the broker and each worker fans it out to its own subscribers.
+    """
+
+    def __init__(self, broker=None):
+        self.broker = broker
+        self._subscribers = {}  # wallet_address -> set of asyncio.Queue
+        self._callbacks = []  # called with every delivered message, e.g. by matchmaking
+        self._listener = None
+        self._published = 0
+        self._dropped = 0
+
+    def subscribe(self, wallet_address):
+        queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self._subscribers.setdefault(wallet_address, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, wallet_address, queue):
+        queues = self._subscribers.get(wallet_address)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[wallet_address]
+
+    def add_callback(self, callback):
+        """Calls callback(message) for every event delivered to this worker, any wallet."""
+        self._callbacks.append(callback)
+
+    def _deliver(self, message):
+        for callback in self._callbacks:
+            try:
+                callback(message)
+            except Exception as e:
+                logging.error(f"Event callback failed: {e}")
+        for queue in self._subscribers.get(message["wallet_address"], ()):
+            if queue.full():
+                # Never block the publisher on a slow client
+                queue.get_nowait()
+                self._dropped += 1
+            queue.put_nowait(message)
+
+    async def publish(self, wallet_address, event, data):
+        """Sends an event to every subscriber of wallet_address.
+
+        Args:
+            wallet_address (str): wallet the event belongs to
+            event (str): SSE event name, e.g. "status"
+            data (dict): JSON-serializable payload
+        """
+        message = {"wallet_address": wallet_address, "event": event, "data": data}
+        self._published += 1
+        if self.broker is None:
+            self._deliver(message)
+            return
+        try:
+            await self.broker.publish(message)
+        except Exception as e:
+            # Subscribers on this worker still get the event
+            logging.warning(f"Event broker publish failed: {e}")
+            self._deliver(message)
+
+    async def publish_status_changes(self, transactions):
+        """Publishes one status event per changed transaction row."""
+        for tx in transactions:
+            await self.publish(
+                tx["wallet_address"],
+                "status",
+                {
+                    "transaction_hash": tx["transaction_hash"],
+                    "transaction_type": tx["transaction_type"],
+                    "transaction_status": tx["transaction_status"],
+                },
+            )
+
+    async def publish_onramps_closed(self, onramps):
+        """Publishes an "onramp_closed" event per deleted openonramps row."""
+        for onramp in onramps:
+            await self.publish(
+                onramp["wallet_address"], "onramp_closed", {"onramp_id": onramp["id"]}
+            )
+
+    async def _listen_forever(self):
+        while True:
+            try:
+                await self.broker.listen(self._deliver)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Event broker subscription failed: {e}")
+                await asyncio.sleep(1)
+
+    def start(self):
+        if self.broker is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def stream(self, wallet_address, queue, snapshot=None):
+        """Yields Server-Sent Events for one wallet until the client disconnects.
+
+        Subscribe before reading the snapshot, so no change committed in between is lost.
+
+        Args:
+            wallet_address (str): wallet to follow
+            queue (asyncio.Queue): subscription returned by subscribe, released at the end
+            snapshot (dict): optional first event data, sent as a "snapshot" event
+
+        Yields:
+            bytes: SSE frames, with a comment line every EVENTS_HEARTBEAT idle seconds
+        """
+        try:
+            if snapshot is not None:
+                yield _frame("snapshot", snapshot)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield _frame(message["event"], message["data"])
+        finally:
+            self.unsubscribe(wallet_address, queue)
+
+    def metrics(self):
+        return {
+            "broker": type(self.broker).__name__ if self.broker else None,
+            "wallets": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "published_total": self._published,
+            "dropped_total": self._dropped,
+        }
+
+
+class EventStreamResponse(StreamingResponse):
+    """text/event-stream response that releases its subscription however it ends.
+
+    That includes a client disconnecting before the body starts, when the stream generator
+    never runs and its own cleanup never happens.
+    """
+
+    def __init__(self, hub, wallet_address, queue, snapshot=None):
+        super().__init__(
+            hub.stream(wallet_address, queue, snapshot),
+            media_type="text/event-stream",
+            # Keep proxies from buffering or caching the stream
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        self._hub = hub
+        self._wallet_address = wallet_address
+        self._queue = queue
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+            self._hub.unsubscribe(self._wallet_address, self._queue)
+
+
+def _frame(event, data):
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+event_hub = EventHub(RedisBroker(EVENTS_REDIS_URL) if EVENTS_REDIS_URL else None)
@@ -1,6 +1,12 @@
 import os
+import time
 import psycopg2
 
+from migrations import LATEST_VERSION, apply_migrations, get_schema_version
+
+# Seconds to wait for the database to accept connections before giving up
+INIT_DB_WAIT = float(os.getenv("INIT_DB_WAIT", "60"))
+
 def setup_database():
     db_host = os.getenv("DB_HOST", "localhost")
 
@@ -79,6 +85,79 @@ def create_tables():
         cur.close()
         conn.close()
 
+def run_migrations():
+    db_host = os.getenv("DB_HOST", "localhost")
+
+    conn = psycopg2.connect(
+        database="state_database",
+        user="root",
+        host=db_host,
+        port="26257",
+        sslmode="disable",
+    )
+    try:
+        version = apply_migrations(conn)
+        print(f"Database schema is at version {version}")
+    finally:
+        conn.close()
+
+def schema_is_current():
+    """Checks whether state_database exists with every migration applied
+
+    One connection and one query, so restarts against a migrated database skip the DDL.
+
+    Returns:
+        bool: False when the database, the schema or a migration is missing
+    """
+    try:
+        conn = psycopg2.connect(
+            database="state_database",
+            user="root",
+            host=os.getenv("DB_HOST", "localhost"),
+            port="26257",
+            sslmode="disable",
+            connect_timeout=5,
+        )
+    except psycopg2.OperationalError:
+        return False
+    try:
+        cur = conn.cursor()
+        return get_schema_version(cur) >= LATEST_VERSION
+    except psycopg2.Error:
+        return False
+    finally:
+        conn.close()
+
+
+def wait_for_database(timeout=INIT_DB_WAIT):
+    """Polls until the database accepts connections, instead of sleeping a fixed time
+
+    Raises:
+        psycopg2.OperationalError: the database did not come up within timeout seconds
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            psycopg2.connect(
+                dbname="postgres",
+                user="root",
+                host=os.getenv("DB_HOST", "localhost"),
+                port="26257",
+                sslmode="disable",
+                connect_timeout=5,
+            ).close()
+            return
+        except psycopg2.OperationalError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.5)
+
+
 if __name__ == "__main__":
-    setup_database()
-    create_tables()
+    if schema_is_current():
+        print(f"Database schema is at version {LATEST_VERSION}, nothing to migrate")
+    else:
+        wait_for_database()
+        setup_database()
+        create_tables()
+        run_migrations()
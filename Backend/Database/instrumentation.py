@@ -0,0 +1,245 @@
+"""Prometheus metrics of the backend, exposed by GET /metrics in main.py.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory before
+start-up so every worker writes its samples there and /metrics aggregates them.
+"""
+
+import contextvars
+import functools
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from starlette.routing import Match
+
+import queries
+
+# Finer buckets than the default for work that usually takes milliseconds
+FAST_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+# Pending transaction ages reported by the backlog gauges, matching the reconciler schedule
+PENDING_AGE_BUCKETS = (60, 600, 3600, 86400)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "zwift_http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ["method", "route", "status"],
+)
+DB_QUERY_DURATION = Histogram(
+    "zwift_db_query_duration_seconds",
+    "Time spent executing SQL statements, by queries.py constant and calling operation",
+    ["query", "operation", "outcome"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_ACQUIRE_DURATION = Histogram(
+    "zwift_db_pool_acquire_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_ACQUIRE_TIMEOUTS = Counter(
+    "zwift_db_pool_acquire_timeouts_total",
+    "Connection checkouts that gave up after the acquire timeout",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "zwift_db_pool_connections",
+    "Pooled database connections by state",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+RPC_CALLS = Counter(
+    "zwift_rpc_calls_total",
+    "JSON-RPC calls by method and outcome (ok, error answer or transport_error)",
+    ["method", "outcome"],
+)
+RPC_BATCH_DURATION = Histogram(
+    "zwift_rpc_batch_duration_seconds",
+    "Time until a JSON-RPC batch was answered, retries included",
+    ["method", "outcome"],
+)
+RPC_ENDPOINT_DURATION = Histogram(
+    "zwift_rpc_endpoint_request_duration_seconds",
+    "Time of single POSTs to one RPC endpoint",
+    ["endpoint", "outcome"],
+)
+TASK_DURATION = Histogram(
+    "zwift_task_duration_seconds",
+    "Duration of background and helper tasks such as one reconciler tick",
+    ["task", "outcome"],
+    buckets=FAST_BUCKETS + (10.0, 30.0, 60.0),
+)
+PENDING_TRANSACTIONS = Gauge(
+    "zwift_pending_transactions",
+    "Transactions still pending on chain",
+    multiprocess_mode="max",
+)
+DUE_TRANSACTIONS = Gauge(
+    "zwift_due_transactions",
+    "Pending transactions whose next status check is due, the reconciler backlog",
+    multiprocess_mode="max",
+)
+PENDING_TRANSACTIONS_BY_AGE = Gauge(
+    "zwift_pending_transactions_younger_than",
+    "Pending transactions created less than max_age seconds ago (cumulative)",
+    ["max_age"],
+    multiprocess_mode="max",
+)
+STATUS_OUTBOX_BACKLOG = Gauge(
+    "zwift_status_outbox_backlog",
+    "Status changes whose side effects are not applied yet, counted up to OUTBOX_MAX_BACKLOG",
+    multiprocess_mode="max",
+)
+TRANSACTIONS_EXPIRED = Counter(
+    "zwift_transactions_expired_total",
+    "Pending transactions failed by the polling policy after their deadline",
+    ["last_rpc_status"],
+)
+LEADER = Gauge(
+    "zwift_leader",
+    "1 while this process holds the named leader lease; the sum over processes should be 1",
+    ["lease"],
+    multiprocess_mode="livesum",
+)
+
+# Route template or background task on whose behalf the current code runs
+current_operation = contextvars.ContextVar("current_operation", default="other")
+
+_query_names = None
+
+
+def query_name(sql):
+    """Returns the queries.py constant holding sql, "other" for ad-hoc statements."""
+    global _query_names
+    if _query_names is None:
+        _query_names = {
+            value: name
+            for name, value in vars(queries).items()
+            if name.isupper() and isinstance(value, str)
+        }
+    return _query_names.get(sql, "other")
+
+
+def observe_query(record):
+    """asyncpg query logger callback recording the duration of every statement."""
+    DB_QUERY_DURATION.labels(
+        query_name(record.query),
+        current_operation.get(),
+        "error" if record.exception is not None else "ok",
+    ).observe(record.elapsed)
+
+
+def timed(task):
+    """Decorator recording the duration of a coroutine function in TASK_DURATION.
+
+    Args:
+        task (str): task label, e.g. "reconciler_tick"
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                TASK_DURATION.labels(task, outcome).observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def set_backlog(backlog):
+    """Updates the backlog gauges from reconciler.collect_backlog()."""
+    PENDING_TRANSACTIONS.set(backlog["pending"])
+    DUE_TRANSACTIONS.set(backlog["due"])
+    for max_age in PENDING_AGE_BUCKETS:
+        PENDING_TRANSACTIONS_BY_AGE.labels(str(max_age)).set(
+            backlog[f"younger_than_{max_age}"]
+        )
+
+
+def set_outbox_backlog(backlog):
+    STATUS_OUTBOX_BACKLOG.set(backlog)
+
+
+def set_leader(lease, is_leader):
+    LEADER.labels(lease).set(1 if is_leader else 0)
+
+
+def set_pool_connections(in_use, idle):
+    DB_POOL_CONNECTIONS.labels("in_use").set(in_use)
+    DB_POOL_CONNECTIONS.labels("idle").set(idle)
+
+
+def _route_template(scope):
+    # Route templates keep wallet addresses and hashes out of the label values
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class PrometheusMiddleware:
+    """ASGI middleware timing every request by method, route template and status code."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_template(scope)
+        token = current_operation.set(route)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], route, str(status_code)
+            ).observe(time.perf_counter() - start)
+            current_operation.reset(token)
+
+
+def render():
+    """Returns (body, content type) of the Prometheus text exposition."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+
+import database
+import instrumentation
+import queries
+
+# Seconds a lease stays valid without a heartbeat; a crashed holder is replaced after this
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "15"))
+# Seconds between heartbeats of the holder and acquisition attempts of the standbys
+LEADER_LEASE_RENEW_INTERVAL = float(os.getenv("LEADER_LEASE_RENEW_INTERVAL", "5"))
+
+HOLDER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaderLease:
+    """Elects one holder of a role among all processes through a row in leader_leases.
+
+    The holder renews the lease every renew_interval seconds. Standbys try to take it just
+    as often, so they take over within renew_interval of a release and within ttl plus
+    renew_interval of a crash. A holder that cannot reach the database steps down once its
+    lease may have expired, before a standby can acquire it.
+    """
+
+    def __init__(
+        self,
+        name,
+        ttl=LEADER_LEASE_TTL,
+        renew_interval=LEADER_LEASE_RENEW_INTERVAL,
+        holder=HOLDER_ID,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.holder = holder
+        self._valid_until = 0.0  # monotonic deadline of the last successful heartbeat
+
+    @property
+    def is_leader(self):
+        return time.monotonic() < self._valid_until
+
+    async def try_acquire(self):
+        """Takes or renews the lease.
+
+        Returns:
+            bool: True while this process holds the lease
+        """
+        # Measured before the statement, so the local deadline never outlives the stored one
+        started = time.monotonic()
+        async with database.get_db_connection() as conn:
+            row = await conn.fetchrow(
+                queries.ACQUIRE_LEADER_LEASE, self.name, self.holder, self.ttl
+            )
+        if row is None:
+            self._valid_until = 0.0
+            return False
+        self._valid_until = started + self.ttl
+        return True
+
+    async def release(self):
+        """Gives the lease up so a standby takes over on its next attempt."""
+        self._valid_until = 0.0
+        async with database.get_db_connection() as conn:
+            await conn.execute(queries.RELEASE_LEADER_LEASE, self.name, self.holder)
+
+    async def run(self, tasks):
+        """Runs tasks while this process holds the lease, competing for it forever.
+
+        Args:
+            tasks (list): coroutine functions, started when the lease is won and cancelled
+                when it is lost or this coroutine is cancelled
+        """
+        running = []
+        try:
+            while True:
+                try:
+                    await self.try_acquire()
+                except Exception as e:
+                    # A holder keeps working until its lease may have run out
+                    logging.error(f"Leader lease {self.name} heartbeat failed: {e}")
+                if self.is_leader and not running:
+                    logging.info(f"{self.holder} is now the {self.name} leader")
+                    instrumentation.set_leader(self.name, True)
+                    running = [asyncio.create_task(task()) for task in tasks]
+                elif not self.is_leader and running:
+                    logging.warning(f"{self.holder} lost the {self.name} lease")
+                    instrumentation.set_leader(self.name, False)
+                    await _cancel(running)
+                    running = []
+                await asyncio.sleep(self.renew_interval)
+        finally:
+            if running:
+                await _cancel(running)
+                instrumentation.set_leader(self.name, False)
+                try:
+                    await self.release()
+                except Exception as e:
+                    logging.warning(f"Failed to release leader lease {self.name}: {e}")
+
+
+async def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,16 +1,55 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from typing import List
 import database
+import queries
+import reconciler
+import outbox
+import sweeper
+import wallet_state
+from cache import response_cache
+from events import event_hub, EventStreamResponse
+import cache
+import pagination
+import bulk_insert
+import matchmaking
+import math
+from status_refresh import status_fetcher, RateLimitedError
 import asyncio
-from schemas import TransactionBase, OnrampBase
+import asyncpg
+from schemas import (
+    TransactionBase,
+    OnrampBase,
+    MessageResponse,
+    RegistrationStatusResponse,
+    PendingTransactionsPage,
+    WalletAddressesPage,
+    DbPoolMetrics,
+    CacheMetrics,
+    BulkTransactionsResponse,
+    OnrampMatch,
+    EventMetrics,
+    StatusRefreshMetrics,
+    RpcMetrics,
+    LivenessResponse,
+    ReadinessResponse,
+)
 from fastapi.middleware.cors import CORSMiddleware
 import logging
+import os
 
-from fastapi.responses import JSONResponse
-from sync_transaction_statuses import fetch_newest_zksync_transaction_status
-import asyncio
+from fastapi.responses import Response, StreamingResponse
+from responses import ORJSONResponse
+from sync_transaction_statuses import close_session
+from rpc_client import rpc_client
+import instrumentation
+import time
+from migrations import LATEST_VERSION
 
 app = FastAPI()
 
+# Seconds the pending backlog gauges are reused between scrapes, so a scrape stays cheap
+METRICS_BACKLOG_INTERVAL = float(os.getenv("METRICS_BACKLOG_INTERVAL", "15"))
+
 logging.basicConfig(level=logging.INFO)
 
 # For development, you might allow all origins. Be more restrictive for productio
@@ -30,145 +69,175 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
 )
+app.add_middleware(instrumentation.PrometheusMiddleware)
 
+_backlog_collected_at = None
+_sweeper_task = None
 
-async def update_transaction_statuses():
-    """Update statuses of all pending transactions by checking the latest status from the zkSync blockchain and delete corresponding onramp entries for transactions that change to 'success'."""
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
-        # Fetch all pending transactions
-        cur.execute(
-            "SELECT id, transaction_hash, transaction_type FROM transactions WHERE transaction_status = 'pending'"
+
+@app.exception_handler(database.PoolExhaustedError)
+@app.exception_handler(database.DatabaseUnavailableError)
+async def database_unavailable_handler(request, exc):
+    # Fail fast instead of letting requests queue up behind a saturated or unreachable database
+    logging.warning(f"Database unavailable for {request.url.path}: {exc}")
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.get("/health/live", response_model=LivenessResponse)
+async def get_liveness():
+    """Liveness probe, answered as long as the event loop runs
+
+    Never touches the database, so an outage does not get healthy workers restarted.
+
+    Returns:
+        dict: status and the current connection pool usage
+    """
+    return {"status": "ok", "db_pool": database.db_pool.metrics()}
+
+
+@app.get("/health/ready", response_model=ReadinessResponse)
+async def get_readiness():
+    """Readiness probe: a pooled connection is available and the schema is migrated
+
+    Raises:
+        PoolExhaustedError: answered with 503 by database_unavailable_handler
+        DatabaseUnavailableError: answered with 503 by database_unavailable_handler
+
+    Returns:
+        dict: status and schema version, 503 while migrations are missing
+    """
+    async with database.get_db_connection() as conn:
+        try:
+            version = await conn.fetchval(queries.SELECT_SCHEMA_VERSION)
+        except asyncpg.UndefinedTableError:
+            # init_db.py has not created schema_migrations yet
+            version = 0
+    if version < LATEST_VERSION:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "detail": f"Schema is at version {version}, expected {LATEST_VERSION}"
+            },
+            headers={"Retry-After": "1"},
         )
-        pending_transactions = cur.fetchall()
+    return {"status": "ready", "schema_version": version}
 
-        # If there are no pending transactions, return an informative message
-        if not pending_transactions:
-            return {"message": "No pending transactions to update."}
 
-        # Fetch new statuses for each transaction
-        transaction_hashs = [
-            tx[1] for tx in pending_transactions
-        ]  # Index 1 is transaction_hash
-        new_statuses = await fetch_newest_zksync_transaction_status(transaction_hashs)
-
-        # Update transactions in the database with new statuses and delete onramp entries if successful
-        updated_count = 0
-        deleted_onramps_count = 0
-        for tx_id, tx_hash, tx_type in pending_transactions:
-            new_status = new_statuses.get(tx_hash)
-            if (
-                new_status and new_status != "pending"
-            ):  # Check if the status has changed
-                cur.execute(
-                    "UPDATE transactions SET transaction_status = %s WHERE id = %s",
-                    (new_status, tx_id),
-                )
-                updated_count += 1
+@app.get("/metrics", include_in_schema=False)
+async def get_prometheus_metrics():
+    """Returns all metrics in the Prometheus text format
 
-                # If the transaction is successful, delete from onramps
-                if new_status == "success" and tx_type == "onramp":
-                    cur.execute(
-                        "DELETE FROM openonramps WHERE transaction_hash = %s",
-                        (tx_hash,),
-                    )
-                    deleted_onramps_count += 1
+    Returns:
+        Response: request, query, RPC and task histograms plus pool, backlog and outbox
+            gauges
+    """
+    global _backlog_collected_at
+    now = time.monotonic()
+    if (
+        _backlog_collected_at is None
+        or now - _backlog_collected_at >= METRICS_BACKLOG_INTERVAL
+    ):
+        _backlog_collected_at = now
+        try:
+            instrumentation.set_backlog(await reconciler.collect_backlog())
+            instrumentation.set_outbox_backlog(await outbox.backlog())
+        except Exception as e:
+            # A scrape must still answer while the database is down
+            logging.warning(f"Failed to collect the pending backlog: {e}")
+
+    pool = database.db_pool.metrics()
+    instrumentation.set_pool_connections(pool["in_use"], pool["idle"])
+    body, content_type = instrumentation.render()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/metrics/db_pool", response_model=DbPoolMetrics)
+async def get_db_pool_metrics():
+    """Returns usage counters of the database connection pool
 
-        conn.commit()  # Commit all changes at once
-        return {
-            "message": f"Updated {updated_count} transactions, deleted {deleted_onramps_count} onramp entries."
-        }
+    Returns:
+        dict: in-use and idle connections, pool sizes and acquire wait times
+    """
+    return database.db_pool.metrics()
 
-    except Exception as e:
-        conn.rollback()  # Roll back in case of any error
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
 
+@app.get("/metrics/cache", response_model=CacheMetrics)
+async def get_cache_metrics():
+    """Returns hit/miss counters of the response cache
 
-@app.post("/transactions/{wallet_address}/update_transaction_status")
-async def update_transaction_statuses_for_account(wallet_address: str):
+    Returns:
+        dict: backend, entry count and hit ratio per cached endpoint
     """
-    Endpoint to update transaction statuses for a specific wallet address by checking the latest status from the blockchain.
+    return response_cache.metrics()
 
-    Args:
-        wallet_address (str): Wallet address for which transactions need to be updated
+
+@app.get("/metrics/events", response_model=EventMetrics)
+async def get_event_metrics():
+    """Returns subscriber and delivery counters of the status event hub
 
     Returns:
-        JSONResponse: Returns a message with the count of transactions that were updated
+        dict: broker, subscribed wallets and streams, published and dropped events
     """
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
-        # Fetch all pending transactions for the specified wallet address
-        cur.execute(
-            "SELECT id, transaction_hash FROM transactions WHERE transaction_status = 'pending' AND wallet_address = %s",
-            (wallet_address,),
-        )
-        pending_transactions = cur.fetchall()
+    return event_hub.metrics()
 
-        # If there are no pending transactions, return an informative message
-        if not pending_transactions:
-            return JSONResponse(
-                status_code=200,
-                content={"message": "No pending transactions to update."},
-            )
 
-        # Fetch new statuses for each transaction
-        transaction_ids = [tx["transaction_hash"] for tx in pending_transactions]
-        new_statuses = await fetch_newest_zksync_transaction_status(transaction_ids)
-
-        # Update transactions in the database with new statuses
-        updated_count = 0
-        for tx in pending_transactions:
-            new_status = new_statuses.get(tx["transaction_hash"])
-            if (
-                new_status and new_status != "pending"
-            ):  # Check if the status has changed and is not pending
-                cur.execute(
-                    "UPDATE transactions SET transaction_status = %s WHERE id = %s",
-                    (new_status, tx["id"]),
-                )
-                updated_count += 1
+@app.get("/metrics/status_refresh", response_model=StatusRefreshMetrics)
+async def get_status_refresh_metrics():
+    """Returns how many chain status lookups were answered without an RPC
 
-        conn.commit()  # Commit all changes at once
-        return JSONResponse(
-            status_code=200,
-            content={"message": f"Updated {updated_count} transactions."},
-        )
+    Returns:
+        dict: requested and fetched hashes, cache hits, coalesced and rate-limited refreshes
+    """
+    return status_fetcher.metrics()
 
-    except Exception as e:
-        conn.rollback()  # Roll back in case of any error
-        return JSONResponse(
-            status_code=500, content={"message": f"An error occurred: {str(e)}"}
-        )
-    finally:
-        cur.close()
-        conn.close()
 
+@app.get("/metrics/rpc", response_model=RpcMetrics)
+async def get_rpc_metrics():
+    """Returns latency, error rate and circuit state of every configured RPC endpoint
+
+    Returns:
+        dict: per-endpoint statistics plus hedged requests and failovers
+    """
+    return rpc_client.metrics()
 
-'''
+
+@app.post(
+    "/transactions/{wallet_address}/update_transaction_status",
+    response_model=MessageResponse,
+)
 async def update_transaction_statuses_for_account(wallet_address: str):
-    """Fetch all pending transactions from the database, fetch their transaction status from the zkSync layer, 
-    update the status in the database depending on the newly fetched zksync transaction status
+    """
+    Endpoint to update transaction statuses for a specific wallet address by checking the latest status from the blockchain.
+
+    Concurrent refreshes of one wallet share a single run, statuses fetched within the last
+    STATUS_CACHE_TTL seconds are reused, and each wallet may start REFRESH_BURST refreshes
+    before being limited to REFRESH_RATE per second.
+
+    Args:
+        wallet_address (str): Wallet address for which transactions need to be updated
 
     Raises:
-        HTTPException: _description_
+        HTTPException: 429 with Retry-After when the wallet refreshes too often
 
     Returns:
-        dict: key=message; value=amount of updated transactions
-    """ """Update statuses of all pending transactions by checking the latest status from the blockchain."""
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
-        # Fetch all pending transactions
-        cur.execute(
-            "SELECT id, transaction_hash FROM transactions WHERE transaction_status = 'pending' AND wallet_address = %s",
-            (wallet_address,),
-        )
-        pending_transactions = cur.fetchall()
+        dict: Returns a message with the count of transactions that were updated
+    """
+
+    async def refresh():
+        async with database.get_db_connection() as conn:
+            state = await wallet_state.get(conn, wallet_address)
+            if state is None or state["pending_count"] == 0:
+                pending_transactions = []
+            else:
+                # Fetch all pending transactions for the specified wallet address
+                pending_transactions = await conn.fetch(
+                    queries.SELECT_PENDING_HASHES_FOR_WALLET,
+                    wallet_address,
+                )
 
         # If there are no pending transactions, return an informative message
         if not pending_transactions:
@@ -176,85 +245,88 @@ async def update_transaction_statuses_for_account(wallet_address: str):
 
         # Fetch new statuses for each transaction
         transaction_ids = [tx["transaction_hash"] for tx in pending_transactions]
-        new_statuses = fetch_newest_zksync_transaction_status(transaction_ids)
-
-        # Update transactions in the database with new statuses
-        updated_count = 0
-        for tx in pending_transactions:
-            new_status = new_statuses.get(tx["transaction_hash"])
-            if (
-                new_status and new_status != "pending"
-            ):  # Check if the status has changed and is not pending
-                cur.execute(
-                    "UPDATE transactions SET transaction_status = %s WHERE id = %s",
-                    (new_status, tx["id"]),
-                )
-                updated_count += 1
+        new_statuses = await status_fetcher.fetch_statuses(transaction_ids)
 
-        conn.commit()  # Commit all changes at once
-        return {"message": f"Updated {updated_count} transactions."}
+        # Update transactions in the database with new statuses, going through the same
+        # path as the sweep so succeeded onramps leave the order book here as well, through
+        # the status outbox
+        result = await reconciler.apply_status_updates(
+            pending_transactions, new_statuses
+        )
+        if result["failed"]:
+            raise Exception(f"Failed to apply {result['failed']} status changes")
+        if result["updated"]:
+            # The outbox consumer invalidates as well, but the caller may read right away
+            await response_cache.invalidate_wallets([wallet_address])
 
+        return {"message": f"Updated {result['updated']} transactions."}
+
+    try:
+        return await status_fetcher.refresh_wallet(wallet_address, refresh)
+    except RateLimitedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except (database.PoolExhaustedError, database.DatabaseUnavailableError):
+        raise
     except Exception as e:
-        conn.rollback()  # Roll back in case of any error
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-'''
+        return ORJSONResponse(
+            status_code=500, content={"message": f"An error occurred: {str(e)}"}
+        )
 
 
-@app.get("/transactions/{wallet_address}/registration_status")
-def get_register_status(wallet_address: str):
+@app.get(
+    "/transactions/{wallet_address}/registration_status",
+    response_model=RegistrationStatusResponse,
+)
+async def get_register_status(wallet_address: str):
     """Retrieves registration status from database for a given wallet address and returns it
 
     Args:
         wallet_address (str): Wallet address for which the registration status should be checked
 
     Raises:
-        HTTPException: _description_
-        HTTPException: _description_
+        HTTPException: 404 if the wallet has more than one registration transaction
 
     Returns:
         dict: key="registration_status"; value="pending";"registered";"not_registered"
     """
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
-        print(wallet_address)
-        cur.execute(
-            "SELECT * FROM transactions WHERE wallet_address = %s AND transaction_type = 'register'",
-            (wallet_address,),
-        )
-        transactions = cur.fetchall()
-        print(transactions)
+
+    async def load_register_status():
+        # One primary-key lookup; wallet_state also counts archived registrations
+        async with database.get_db_connection() as conn:
+            state = await wallet_state.get(conn, wallet_address)
+
         # Check if there are no transactions first
-        if not transactions:
+        if state is None or state["registrations"] == 0:
             return {"registration_status": "not_registered"}
 
-        # Now, it's safe to assume transactions is not empty
-        if len(transactions) > 1:
+        if state["registrations"] > 1:
             raise HTTPException(
                 status_code=404,
                 detail="Duplicate entries for registration transaction, contact support",
             )
 
-        # Assuming you're using RealDictCursor or similar to access columns by name
-        if transactions[0]["transaction_status"] == "success":
+        if state["registration_status"] == "success":
             return {"registration_status": "registered"}
-        elif transactions[0]["transaction_status"] == "pending":
+        elif state["registration_status"] == "pending":
             return {"registration_status": "pending"}
         else:
             return {"registration_status": "not_registered"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+
+    return await response_cache.get_or_load(
+        cache.REGISTRATION_STATUS, wallet_address, load_register_status
+    )
 
 
 # Helper function to simulate an update from the blcokcchain
-@app.put("/transactions/{wallet_address}/update_registration_status")
-def update_register_status(wallet_address: str):
+@app.put(
+    "/transactions/{wallet_address}/update_registration_status",
+    response_model=MessageResponse,
+)
+async def update_register_status(wallet_address: str):
     """Helper function that will is only needed for local deployment
 
     Args:
@@ -267,41 +339,46 @@ def update_register_status(wallet_address: str):
     Returns:
         _type_: _description_
     """
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
+    async with database.get_db_connection() as conn:
+        try:
+            async with conn.transaction():
+                transaction = await conn.fetchrow(
+                    queries.SELECT_PENDING_REGISTRATION_FOR_WALLET,
+                    wallet_address,
+                )
 
-        cur.execute(
-            "SELECT id FROM transactions WHERE wallet_address = %s AND transaction_type = 'register' AND transaction_status = 'pending'",
-            (wallet_address,),
-        )
-        transaction = cur.fetchone()
+                # Step 2: If a pending registration transaction exists, update it to 'success'
+                # (None if the sweep settled it meanwhile)
+                updated = (
+                    await conn.fetchrow(
+                        queries.SET_TRANSACTION_SUCCESS,
+                        transaction["id"],
+                    )
+                    if transaction
+                    else None
+                )
+                if updated:
+                    await wallet_state.record_settled(conn, [updated])
+                else:
+                    raise HTTPException(
+                        status_code=404,
+                        detail="No pending registration transactions found for this wallet address.",
+                    )
 
-        # Step 2: If a pending registration transaction exists, update it to 'success'
-        if transaction:
-            cur.execute(
-                "UPDATE transactions SET transaction_status = 'success' WHERE id = %s",
-                (transaction["id"],),  # Assuming you're using RealDictCursor or similar
-            )
-            conn.commit()  # Don't forget to commit the transaction to make the update permanent
+            await response_cache.invalidate_wallets([wallet_address])
+            await event_hub.publish_status_changes([updated])
             return {"message": "Registration status updated to success."}
-        else:
-            raise HTTPException(
-                status_code=404,
-                detail="No pending registration transactions found for this wallet address.",
-            )
 
-    except Exception as e:
-        conn.rollback()  # Roll back in case of any error
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
 
 # Helper function to simulate an update from the blcokcchain on all registrations
-@app.put("/transactions/{wallet_address}/update_all_transactions")
-def update_register_status(wallet_address: str):
+@app.put(
+    "/transactions/{wallet_address}/update_all_transactions",
+    response_model=MessageResponse,
+)
+async def update_all_transactions_status(wallet_address: str):
     """Helper function that will is only needed for local deployment
 
     Args:
@@ -314,93 +391,196 @@ def update_register_status(wallet_address: str):
     Returns:
         _type_: _description_
     """
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
+    async with database.get_db_connection() as conn:
+        try:
+            async with conn.transaction():
+                transaction = await conn.fetchrow(
+                    queries.SELECT_PENDING_ID_FOR_WALLET,
+                    wallet_address,
+                )
 
-        cur.execute(
-            "SELECT id FROM transactions WHERE wallet_address = %s AND transaction_status = 'pending'",
-            (wallet_address,),
-        )
-        transaction = cur.fetchone()
+                # Step 2: If a pending registration transaction exists, update it to 'success'
+                # (None if the sweep settled it meanwhile)
+                updated = (
+                    await conn.fetchrow(
+                        queries.SET_TRANSACTION_SUCCESS,
+                        transaction["id"],
+                    )
+                    if transaction
+                    else None
+                )
+                if updated:
+                    await wallet_state.record_settled(conn, [updated])
+                else:
+                    raise HTTPException(
+                        status_code=404,
+                        detail="No pending transactions found for this wallet address.",
+                    )
 
-        # Step 2: If a pending registration transaction exists, update it to 'success'
-        if transaction:
-            cur.execute(
-                "UPDATE transactions SET transaction_status = 'success' WHERE id = %s",
-                (transaction["id"],),  # Assuming you're using RealDictCursor or similar
-            )
-            conn.commit()  # Don't forget to commit the transaction to make the update permanent
+            await response_cache.invalidate_wallets([wallet_address])
+            await event_hub.publish_status_changes([updated])
             return {"message": "All transactions status updated to success."}
-        else:
-            raise HTTPException(
-                status_code=404,
-                detail="No pending transactions found for this wallet address.",
-            )
 
-    except Exception as e:
-        conn.rollback()  # Roll back in case of any error
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/transactions/{wallet_address}/events", response_class=StreamingResponse)
+async def stream_transaction_events(wallet_address: str):
+    """Pushes transaction status changes of a wallet as Server-Sent Events
+
+    Replaces polling /pending, /registration_status and update_transaction_status: the
+    stream opens with a "snapshot" event holding the pending transactions, followed by a
+    "status" event ({transaction_hash, transaction_type, transaction_status}) for every
+    status change the reconciler or block ingestion writes.
 
+    Args:
+        wallet_address (str): wallet whose transactions to follow
+
+    Returns:
+        EventStreamResponse: text/event-stream that stays open until the client disconnects
+    """
+    queue = event_hub.subscribe(wallet_address)
+    try:
+        async with database.get_db_connection() as conn:
+            pending = await conn.fetch(
+                queries.SELECT_PENDING_FOR_WALLET_PAGE,
+                wallet_address,
+                0,
+                pagination.MAX_PAGE_SIZE,
+            )
+    except BaseException:
+        event_hub.unsubscribe(wallet_address, queue)
+        raise
+    snapshot = {"pending_transactions": [dict(tx) for tx in pending]}
+    return EventStreamResponse(event_hub, wallet_address, queue, snapshot)
 
-@app.get("/transactions/{wallet_address}/pending")
-def get_pending_transactions(wallet_address: str):
-    """Returns all pending transactions for a given wallet address
+
+@app.get(
+    "/transactions/{wallet_address}/pending", response_model=PendingTransactionsPage
+)
+async def get_pending_transactions(
+    wallet_address: str, limit: int = None, cursor: str = None
+):
+    """Returns one page of pending transactions for a given wallet address
 
     Args:
         wallet_address (str): wallet address to search transactions for
+        limit (int): page size, capped at MAX_PAGE_SIZE
+        cursor (str): next_cursor of the previous page, omitted for the first page
 
     Raises:
         HTTPException: _description_
         HTTPException: _description_
 
     Returns:
-        dict: key="pending_transactions"; value=transactions (id, wallet_address, hash, status, timestamp)
+        dict: key="pending_transactions"; value=transactions (id, wallet_address, hash, status, timestamp),
+            key="next_cursor"; value=token for the next page or None on the last page
     """
-    conn = database.get_db_connection()
-    cur = conn.cursor()
+    limit = pagination.page_size(limit)
+    after_id = pagination.decode_cursor(cursor)
+
+    async def load_pending_transactions():
+        async with database.get_db_connection() as conn:
+            # Wallets without pending transactions never reach the transactions table
+            state = await wallet_state.get(conn, wallet_address)
+            if state is None or state["pending_count"] == 0:
+                return {"pending_transactions": [], "next_cursor": None}
+            transactions = await conn.fetch(
+                queries.SELECT_PENDING_FOR_WALLET_PAGE,
+                wallet_address,
+                after_id,
+                limit + 1,
+            )
+            transactions, next_cursor = pagination.split_page(transactions, limit)
+            return {
+                "pending_transactions": [dict(tx) for tx in transactions],
+                "next_cursor": next_cursor,
+            }
+
     try:
-        cur.execute(
-            "SELECT * FROM transactions WHERE wallet_address = %s AND transaction_status = 'pending'",
-            (wallet_address,),
-        )
-        transactions = cur.fetchall()
-        if not transactions:
+        # Only the default first page is cached, deeper pages go straight to the database
+        if after_id == 0 and limit == pagination.DEFAULT_PAGE_SIZE:
+            page = await response_cache.get_or_load(
+                cache.PENDING_TRANSACTIONS, wallet_address, load_pending_transactions
+            )
+        else:
+            page = await load_pending_transactions()
+        if not page["pending_transactions"]:
             raise HTTPException(
                 status_code=404,
                 detail="No pending transactions found for this wallet address",
             )
-        return {"pending_transactions": transactions}
+        return page
+    except (database.PoolExhaustedError, database.DatabaseUnavailableError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-    pass
 
 
-@app.get("/transactions/{wallet_address}/pending_offramps")
-def get_pending_transactions(wallet_address: str):
-    conn = database.get_db_connection()
-    cur = conn.cursor()
+@app.get(
+    "/transactions/{wallet_address}/pending/stream", response_class=StreamingResponse
+)
+async def stream_pending_transactions(wallet_address: str):
+    """Streams every pending transaction of a wallet as NDJSON, one transaction per line"""
+    return await pagination.stream_ndjson(
+        queries.SELECT_PENDING_FOR_WALLET, wallet_address
+    )
+
+
+@app.get(
+    "/transactions/{wallet_address}/pending_offramps",
+    response_model=PendingTransactionsPage,
+)
+async def get_pending_offramps(
+    wallet_address: str, limit: int = None, cursor: str = None
+):
+    limit = pagination.page_size(limit)
+    after_id = pagination.decode_cursor(cursor)
+
+    async def load_pending_offramps():
+        async with database.get_db_connection() as conn:
+            state = await wallet_state.get(conn, wallet_address)
+            if state is None or state["pending_offramps"] == 0:
+                return {"pending_transactions": [], "next_cursor": None}
+            transactions = await conn.fetch(
+                queries.SELECT_PENDING_OFFRAMPS_FOR_WALLET_PAGE,
+                wallet_address,
+                after_id,
+                limit + 1,
+            )
+            transactions, next_cursor = pagination.split_page(transactions, limit)
+            return {
+                "pending_transactions": [dict(tx) for tx in transactions],
+                "next_cursor": next_cursor,
+            }
+
     try:
-        cur.execute(
-            "SELECT * FROM transactions WHERE wallet_address = %s AND transaction_status = 'pending' AND transaction_type = 'offramp'",
-            (wallet_address,),
-        )
-        transactions = cur.fetchall()
+        if after_id == 0 and limit == pagination.DEFAULT_PAGE_SIZE:
+            page = await response_cache.get_or_load(
+                cache.PENDING_OFFRAMPS, wallet_address, load_pending_offramps
+            )
+        else:
+            page = await load_pending_offramps()
         # Instead of raising an HTTPException for no results, return an empty list.
-        return {"pending_transactions": transactions if transactions else []}
+        return page
+    except (database.PoolExhaustedError, database.DatabaseUnavailableError):
+        raise
     except Exception as e:
         # It's good to log the exception here to understand what went wrong.
         print(f"An error occurred: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+
+
+@app.get(
+    "/transactions/{wallet_address}/pending_offramps/stream",
+    response_class=StreamingResponse,
+)
+async def stream_pending_offramps(wallet_address: str):
+    """Streams every pending offramp of a wallet as NDJSON, one transaction per line"""
+    return await pagination.stream_ndjson(
+        queries.SELECT_PENDING_OFFRAMPS_FOR_WALLET, wallet_address
+    )
 
 
 ###########################################################
@@ -414,150 +594,230 @@ def get_pending_transactions(wallet_address: str):
     response_model=TransactionBase,
     status_code=status.HTTP_201_CREATED,
 )
-def create_transaction(transaction: TransactionBase):
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
-        print("trying to write transaction into databse")
-        cur.execute(
-            "INSERT INTO transactions (wallet_address, transaction_hash, transaction_type, transaction_status) VALUES (%s, %s, %s, %s) RETURNING *;",
-            (
-                transaction.wallet_address,
-                transaction.transaction_hash,
-                transaction.transaction_type,
-                transaction.transaction_status,
-            ),
-        )
+async def create_transaction(transaction: TransactionBase):
+    async with database.get_db_connection() as conn:
+        try:
+            async with conn.transaction():
+                new_transaction = await conn.fetchrow(
+                    queries.INSERT_TRANSACTION,
+                    transaction.wallet_address,
+                    transaction.transaction_hash,
+                    transaction.transaction_type,
+                    transaction.transaction_status,
+                )
+                await wallet_state.record_inserted(conn, [new_transaction])
+            await response_cache.invalidate_wallets([transaction.wallet_address])
+            # The response model picks the TransactionBase fields out of the stored row
+            return dict(new_transaction)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
-        new_transaction = cur.fetchone()
-        print(new_transaction)
-        conn.commit()
-        return TransactionBase(
-            wallet_address=new_transaction["wallet_address"],
-            transaction_hash=new_transaction["transaction_hash"],
-            transaction_type=new_transaction["transaction_type"],
-            transaction_status=new_transaction["transaction_status"],
-        )
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
-    finally:
-        cur.close()
-        conn.close()
-    pass
 
+@app.post("/transactions/bulk", response_model=BulkTransactionsResponse)
+async def create_transactions_bulk(request: Request):
+    """Stores many transactions at once, for relayers submitting bursts of transactions
+
+    The body is a JSON array of TransactionBase records, or one record per line when sent
+    as application/x-ndjson. Records are validated, written in chunked multi-row inserts
+    and deduplicated on transaction_hash. NDJSON bodies are written chunk by chunk while
+    they arrive, with malformed lines reported as invalid items.
+
+    Raises:
+        HTTPException: 400 for a JSON array body that cannot be decoded
 
-@app.post("/wallets/", status_code=status.HTTP_201_CREATED)
-def add_wallet_address(onramp_data: OnrampBase):
+    Returns:
+        dict: counts per outcome and one result per record (created, duplicate, invalid or failed)
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        return await bulk_insert.insert_ndjson(request.stream())
+    try:
+        records = bulk_insert.parse_records(await request.body())
+    except bulk_insert.BulkPayloadError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return await bulk_insert.insert_transactions(records)
+
+
+@app.post(
+    "/wallets/", response_model=MessageResponse, status_code=status.HTTP_201_CREATED
+)
+async def add_wallet_address(onramp_data: OnrampBase):
     off_ramp_wallet_address = (
         onramp_data.wallet_address.lower()
     )  # Normalize to lowercase
 
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
-        sql = "INSERT INTO openonramps (wallet_address, transaction_hash) VALUES (%s, %s);"
-        params = (off_ramp_wallet_address, "0")  # Initialize transaction_hash with 0
-
-        cur.execute(sql, params)
-        conn.commit()  # Only commit if no exceptions occurred
+    async with database.get_db_connection() as conn:
+        try:
+            # Initialize transaction_hash with 0
+            async with conn.transaction():
+                onramp = await conn.fetchrow(
+                    queries.INSERT_ONRAMP, off_ramp_wallet_address, "0"
+                )
+                await wallet_state.set_open_onramp(
+                    conn, [onramp["wallet_address"]], True
+                )
+            await response_cache.invalidate_wallet_listing()
+            matchmaking.onramp_queue.add(
+                onramp["wallet_address"], onramp["added_at"], onramp["id"]
+            )
 
-        logging.info("Wallet address added successfully.")
-        return {"message": "Wallet address added successfully to onramps database"}
+            logging.info("Wallet address added successfully.")
+            return {"message": "Wallet address added successfully to onramps database"}
 
-    except Exception as e:
-        conn.rollback()  # Rollback in case of any error
-        logging.error(f"Error adding wallet address: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
-        )
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            logging.error(f"Error adding wallet address: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+            )
 
 
-@app.put("/wallets/{wallet_address}/transaction-hash")
-def update_transaction_hash(onramp_data: OnrampBase):
-    conn = database.get_db_connection()
-    cur = conn.cursor()
+@app.put("/wallets/{wallet_address}/transaction-hash", response_model=MessageResponse)
+async def update_transaction_hash(onramp_data: OnrampBase):
     off_ramp_wallet_address = onramp_data.wallet_address.lower()
     transaction_hash = onramp_data.transaction_hash
-    try:
-        sql = "UPDATE openonramps SET transaction_hash = %s WHERE wallet_address = %s;"
-        params = (transaction_hash, off_ramp_wallet_address)
+    async with database.get_db_connection() as conn:
+        try:
+            await conn.execute(
+                queries.UPDATE_ONRAMP_HASH, transaction_hash, off_ramp_wallet_address
+            )
+            await response_cache.invalidate_wallet_listing()
 
-        cur.execute(sql, params)
-        conn.commit()  # Only commit if no exceptions occurred
+            logging.info("Transaction hash updated successfully.")
+            return {"message": "Transaction hash updated successfully"}
 
-        logging.info("Transaction hash updated successfully.")
-        return {"message": "Transaction hash updated successfully"}
+        except Exception as e:
+            logging.error(f"Error updating transaction hash: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+            )
 
-    except Exception as e:
-        conn.rollback()  # Rollback in case of any error
-        logging.error(f"Error updating transaction hash: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
-        )
-    finally:
-        cur.close()
-        conn.close()
 
+@app.get("/wallets/", response_model=WalletAddressesPage)
+async def get_wallet_addresses(limit: int = None, cursor: str = None):
+    """Returns one page of wallet addresses from the onramp order book
 
-@app.get("/wallets/")
-def get_wallet_addresses():
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT wallet_address FROM openonramps;")
-        wallet_addresses = cur.fetchall()
-        return {
-            "wallet_addresses": (
-                [address[0] for address in wallet_addresses] if wallet_addresses else []
-            )
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
-        )
-    finally:
-        cur.close()
-        conn.close()
+    Args:
+        limit (int): page size, capped at MAX_PAGE_SIZE
+        cursor (str): next_cursor of the previous page, omitted for the first page
 
+    Returns:
+        dict: key="wallet_addresses"; value=wallet addresses in insertion order,
+            key="next_cursor"; value=token for the next page or None on the last page
+    """
+    limit = pagination.page_size(limit)
+    after_id = pagination.decode_cursor(cursor)
+
+    async def load_wallet_addresses():
+        async with database.get_db_connection() as conn:
+            try:
+                wallet_addresses = await conn.fetch(
+                    queries.SELECT_ONRAMP_WALLETS_PAGE, after_id, limit + 1
+                )
+                wallet_addresses, next_cursor = pagination.split_page(
+                    wallet_addresses, limit
+                )
+                return {
+                    "wallet_addresses": [
+                        address["wallet_address"] for address in wallet_addresses
+                    ],
+                    "next_cursor": next_cursor,
+                }
+            except Exception as e:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+                )
 
-@app.delete("/wallets/{wallet_address}")
-def delete_wallet_address(wallet_address: str):
-    conn = database.get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(
-            "DELETE FROM openonramps WHERE wallet_address = %s RETURNING id;",
-            (wallet_address,),
+    if after_id == 0 and limit == pagination.DEFAULT_PAGE_SIZE:
+        return await response_cache.get_or_load(
+            cache.WALLET_LISTING, "all", load_wallet_addresses
         )
-        deleted = cur.fetchone()
-        if deleted is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Wallet address not found.",
-            )
-        conn.commit()
-        return {"message": "Wallet address removed successfully"}
-    except Exception as e:
-        conn.rollback()
+    return await load_wallet_addresses()
+
+
+@app.get("/wallets/stream", response_class=StreamingResponse)
+async def stream_wallet_addresses():
+    """Streams the whole onramp order book as NDJSON, one wallet address per line"""
+    return await pagination.stream_ndjson(
+        queries.SELECT_ONRAMP_WALLETS, project=lambda row: row["wallet_address"]
+    )
+
+
+@app.get("/wallets/match", response_model=OnrampMatch)
+async def match_wallet_address(exclude: List[str] = Query(default=[])):
+    """Returns the longest-queuing open onramp, the server-side getLongestQueuingOffRampIntentAddress
+
+    Args:
+        exclude (str[]): wallet addresses that must not be matched, repeat ?exclude= per address
+
+    Raises:
+        HTTPException: 404 if no open onramp is left after the exclusions
+
+    Returns:
+        dict: wallet_address, transaction_hash and added_at of the matched onramp
+    """
+    onramp = await matchmaking.find_match(exclude)
+    if onramp is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No open onramp available for matching.",
         )
-    finally:
-        cur.close()
-        conn.close()
+    return dict(onramp)
 
 
-async def periodic_update():
-    while True:
-        print("fetching blockchain transactions - updating database entries")
-        await update_transaction_statuses()
-        await asyncio.sleep(600)
+@app.delete("/wallets/{wallet_address}", response_model=MessageResponse)
+async def delete_wallet_address(wallet_address: str):
+    async with database.get_db_connection() as conn:
+        try:
+            async with conn.transaction():
+                deleted = await conn.fetchrow(
+                    queries.DELETE_ONRAMP_BY_WALLET,
+                    wallet_address,
+                )
+                if deleted is not None:
+                    await wallet_state.set_open_onramp(
+                        conn, [deleted["wallet_address"]], False
+                    )
+            if deleted is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Wallet address not found.",
+                )
+            await response_cache.invalidate_wallet_listing()
+            matchmaking.onramp_queue.remove(deleted["wallet_address"])
+            return {"message": "Wallet address removed successfully"}
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+            )
 
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(periodic_update())
+    global _sweeper_task
+    event_hub.start()
+    # Connections open in the background, readiness reports when they are up
+    asyncio.create_task(database.db_pool.warm_up())
+    # With SWEEPER_MODE=external this worker only serves requests
+    if sweeper.SWEEPER_MODE == "embedded":
+        _sweeper_task = asyncio.create_task(sweeper.run_forever())
+    else:
+        missing = sweeper.missing_shared_backends()
+        if missing:
+            logging.error(
+                f"SWEEPER_MODE=external without {', '.join(missing)}: status events, "
+                "cache invalidations and closed onramps from the sweeper will not reach "
+                "this worker"
+            )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _sweeper_task is not None:
+        # Releases the sweeper lease for a fast takeover by another worker
+        _sweeper_task.cancel()
+        try:
+            await _sweeper_task
+        except asyncio.CancelledError:
+            pass
+    await event_hub.stop()
+    await close_session()
+    await database.db_pool.close()
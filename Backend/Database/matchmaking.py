@@ -0,0 +1,160 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+
+import database
+import queries
+from events import event_hub
+
+# Seconds between full reloads of the queue, picking up onramps opened or closed by other
+# worker processes; 0 disables reloading
+MATCHMAKING_RELOAD_INTERVAL = float(os.getenv("MATCHMAKING_RELOAD_INTERVAL", "60"))
+
+
+class OnrampQueue:
+    """In-memory priority queue of open onramps, longest-queuing first.
+
+    Mirrors openonramps ordered by (added_at, id). Removals are lazy: a removed wallet is
+    only forgotten in the index and its heap entry is dropped once it reaches the top, so
+    add, remove and match all stay O(log n).
+    """
+
+    def __init__(self):
+        self._heap = []  # (added_at, id, wallet_address)
+        self._entries = {}  # wallet_address -> (added_at, id), the live entries
+        self._loaded_at = None
+        self._load_lock = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def add(self, wallet_address, added_at, onramp_id):
+        entry = (added_at, onramp_id)
+        if self._entries.get(wallet_address) == entry:
+            return
+        self._entries[wallet_address] = entry
+        heapq.heappush(self._heap, (added_at, onramp_id, wallet_address))
+
+    def remove(self, wallet_address, onramp_id=None):
+        """Forgets the wallet's entry, only if it is still onramp_id when that is given."""
+        entry = self._entries.get(wallet_address)
+        if entry is not None and onramp_id in (None, entry[1]):
+            del self._entries[wallet_address]
+
+    def _is_live(self, item):
+        added_at, onramp_id, wallet_address = item
+        return self._entries.get(wallet_address) == (added_at, onramp_id)
+
+    def peek(self, excluded=()):
+        """Returns the longest-queuing wallet not in excluded, or None.
+
+        Excluded entries are popped and pushed back, so a match costs O((k + 1) log n) for
+        k excluded wallets ahead of it in the queue.
+        """
+        skipped = []
+        match = None
+        while self._heap:
+            item = self._heap[0]
+            if not self._is_live(item):
+                heapq.heappop(self._heap)
+                continue
+            if item[2] in excluded:
+                skipped.append(heapq.heappop(self._heap))
+                continue
+            match = item[2]
+            break
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return match
+
+    async def load(self):
+        """Replaces the queue with the current contents of openonramps."""
+        async with database.get_db_connection() as conn:
+            rows = await conn.fetch(queries.SELECT_ONRAMPS_BY_AGE)
+        # Rows arrive sorted, which is already a valid heap
+        self._heap = [
+            (row["added_at"], row["id"], row["wallet_address"]) for row in rows
+        ]
+        self._entries = {
+            wallet_address: (added_at, onramp_id)
+            for added_at, onramp_id, wallet_address in self._heap
+        }
+        self._loaded_at = time.monotonic()
+
+    def _needs_load(self):
+        if self._loaded_at is None:
+            return True
+        return (
+            MATCHMAKING_RELOAD_INTERVAL > 0
+            and time.monotonic() - self._loaded_at > MATCHMAKING_RELOAD_INTERVAL
+        )
+
+    async def ensure_loaded(self):
+        if not self._needs_load():
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            # Another request may have finished loading while this one waited
+            if self._needs_load():
+                await self.load()
+                logging.info(
+                    f"Loaded {len(self)} open onramps into the matchmaking queue"
+                )
+
+
+onramp_queue = OnrampQueue()
+
+
+def _on_event(message):
+    # Onramps closed by the outbox consumer, possibly in the sweeper process
+    if message["event"] == "onramp_closed":
+        # A newer onramp of the same wallet stays queued
+        onramp_queue.remove(message["wallet_address"], message["data"]["onramp_id"])
+
+
+event_hub.add_callback(_on_event)
+
+
+async def find_match(excluded):
+    """Returns the longest-queuing open onramp whose wallet is not excluded.
+
+    The candidate from the in-memory queue is confirmed against the database, so an onramp
+    closed by another worker is skipped even before the next reload. Without a loaded queue
+    the added_at index answers the query directly.
+
+    Args:
+        excluded (list): wallet addresses that must not be matched, e.g. the caller's own
+
+    Returns:
+        Record: wallet_address, transaction_hash and added_at, or None if nothing is open
+    """
+    excluded = {wallet_address.lower() for wallet_address in excluded}
+    try:
+        await onramp_queue.ensure_loaded()
+    except (database.PoolExhaustedError, database.DatabaseUnavailableError):
+        raise
+    except Exception as e:
+        logging.error(f"Failed to load the matchmaking queue: {e}")
+
+    async with database.get_db_connection() as conn:
+        if not onramp_queue.loaded:
+            return await conn.fetchrow(
+                queries.SELECT_OLDEST_ONRAMP_EXCLUDING, list(excluded)
+            )
+        while True:
+            wallet_address = onramp_queue.peek(excluded)
+            if wallet_address is None:
+                return None
+            onramp = await conn.fetchrow(
+                queries.SELECT_ONRAMP_BY_WALLET, wallet_address
+            )
+            if onramp is not None:
+                return onramp
+            onramp_queue.remove(wallet_address)
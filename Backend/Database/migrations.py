@@ -0,0 +1,296 @@
+"""Versioned schema migrations applied on top of the base tables from init_db.create_tables.
+
+Each migration is a (version, name, statements) tuple. Versions are applied in order and
+recorded in schema_migrations, so every migration runs exactly once per database. New
+migrations are appended to MIGRATIONS with the next version number, never edited in place.
+"""
+
+MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMPTZ DEFAULT now()
+);
+"""
+
+MIGRATIONS_TABLE_EXISTS = """
+SELECT 1 FROM information_schema.tables WHERE table_name = 'schema_migrations';
+"""
+
+MIGRATIONS = [
+    (
+        1,
+        "transactions access-path indexes",
+        [
+            # Fails if the table already holds duplicate hashes; those rows must be cleaned up first
+            "CREATE UNIQUE INDEX IF NOT EXISTS transactions_transaction_hash_key ON transactions (transaction_hash);",
+            # Registration lookups and pending offramps: wallet + type (+ status)
+            "CREATE INDEX IF NOT EXISTS transactions_wallet_type_status_idx ON transactions (wallet_address, transaction_type, transaction_status);",
+            # Pending transactions of one wallet, only indexing the small pending slice of the table
+            "CREATE INDEX IF NOT EXISTS transactions_wallet_pending_idx ON transactions (wallet_address) INCLUDE (transaction_hash, transaction_type) WHERE transaction_status = 'pending';",
+            # Status sweep over all pending transactions, oldest first
+            "CREATE INDEX IF NOT EXISTS transactions_pending_created_at_idx ON transactions (created_at) INCLUDE (transaction_hash, transaction_type) WHERE transaction_status = 'pending';",
+        ],
+    ),
+    (
+        2,
+        "reconciler scheduling and lease columns",
+        [
+            "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS next_check_at TIMESTAMPTZ DEFAULT now();",
+            "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS lease_owner TEXT;",
+            "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;",
+            # Due pending transactions in check order, the reconciler's claim path
+            "CREATE INDEX IF NOT EXISTS transactions_pending_next_check_idx ON transactions (next_check_at) INCLUDE (lease_expires_at) WHERE transaction_status = 'pending';",
+        ],
+    ),
+    (
+        3,
+        "block ingestion cursor and inclusion tracking",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_cursors (
+                name TEXT PRIMARY KEY,
+                block_number INT8 NOT NULL,
+                updated_at TIMESTAMPTZ DEFAULT now()
+            );
+            """,
+            "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS included_block INT8;",
+            # Pending transactions already seen in a block, waiting for that block to be finalized
+            "CREATE INDEX IF NOT EXISTS transactions_pending_included_block_idx ON transactions (included_block) INCLUDE (transaction_hash, transaction_type) WHERE transaction_status = 'pending';",
+        ],
+    ),
+    (
+        4,
+        "open onramps in queue order",
+        [
+            # Longest-queuing onramp first, the order matchmaking hands out counterparties in
+            "CREATE INDEX IF NOT EXISTS openonramps_added_at_idx ON openonramps (added_at, id) INCLUDE (wallet_address, transaction_hash);",
+        ],
+    ),
+    (
+        5,
+        "settled transaction archive and wallet summaries",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS transactions_archive (
+                id INT8 PRIMARY KEY,
+                wallet_address TEXT,
+                transaction_hash TEXT,
+                transaction_type TEXT NOT NULL,
+                transaction_status TEXT NOT NULL,
+                created_at TIMESTAMPTZ,
+                included_block INT8,
+                archived_at TIMESTAMPTZ DEFAULT now()
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS transactions_archive_wallet_idx ON transactions_archive (wallet_address, created_at);",
+            # What the hot endpoints still need to know about a wallet's archived history
+            """
+            CREATE TABLE IF NOT EXISTS wallet_summaries (
+                wallet_address TEXT PRIMARY KEY,
+                registrations INT8 NOT NULL DEFAULT 0,
+                registration_status TEXT,
+                onramps INT8 NOT NULL DEFAULT 0,
+                offramps INT8 NOT NULL DEFAULT 0,
+                succeeded INT8 NOT NULL DEFAULT 0,
+                failed INT8 NOT NULL DEFAULT 0,
+                last_created_at TIMESTAMPTZ,
+                updated_at TIMESTAMPTZ DEFAULT now()
+            );
+            """,
+            # Settled transactions oldest first, the retention job's scan
+            "CREATE INDEX IF NOT EXISTS transactions_settled_created_at_idx ON transactions (created_at) WHERE transaction_status IN ('success', 'failed');",
+        ],
+    ),
+    (
+        6,
+        "denormalized wallet state",
+        [
+            # One row per wallet, kept up to date by every write so hot reads are a key lookup
+            """
+            CREATE TABLE IF NOT EXISTS wallet_state (
+                wallet_address TEXT PRIMARY KEY,
+                registrations INT8 NOT NULL DEFAULT 0,
+                registration_status TEXT,
+                pending_count INT8 NOT NULL DEFAULT 0,
+                pending_offramps INT8 NOT NULL DEFAULT 0,
+                open_onramp BOOL NOT NULL DEFAULT false,
+                updated_at TIMESTAMPTZ DEFAULT now()
+            );
+            """,
+            # Initial fill; python -m wallet_state recomputes it later if it ever drifts
+            """
+            INSERT INTO wallet_state (wallet_address, registrations, registration_status, pending_count, pending_offramps, open_onramp)
+            SELECT
+                wallets.wallet_address,
+                COALESCE(live.registrations, 0) + COALESCE(archived.registrations, 0),
+                COALESCE(live.registration_status, archived.registration_status),
+                COALESCE(live.pending_count, 0),
+                COALESCE(live.pending_offramps, 0),
+                onramps.wallet_address IS NOT NULL
+            FROM (
+                SELECT wallet_address FROM transactions
+                UNION SELECT wallet_address FROM wallet_summaries
+                UNION SELECT wallet_address FROM openonramps
+            ) AS wallets
+            LEFT JOIN (
+                SELECT
+                    wallet_address,
+                    count(*) FILTER (WHERE transaction_type = 'register') AS registrations,
+                    (array_agg(transaction_status ORDER BY created_at DESC, id DESC) FILTER (WHERE transaction_type = 'register'))[1] AS registration_status,
+                    count(*) FILTER (WHERE transaction_status = 'pending') AS pending_count,
+                    count(*) FILTER (WHERE transaction_status = 'pending' AND transaction_type = 'offramp') AS pending_offramps
+                FROM transactions GROUP BY wallet_address
+            ) AS live ON live.wallet_address = wallets.wallet_address
+            LEFT JOIN wallet_summaries AS archived ON archived.wallet_address = wallets.wallet_address
+            LEFT JOIN openonramps AS onramps ON onramps.wallet_address = wallets.wallet_address
+            WHERE wallets.wallet_address IS NOT NULL
+            ON CONFLICT (wallet_address) DO NOTHING;
+            """,
+        ],
+    ),
+    (
+        7,
+        "indexed orchestrator calls",
+        [
+            # Decoded calls to the Orchestrator contract from chain history, for analytics
+            """
+            CREATE TABLE IF NOT EXISTS orchestrator_calls (
+                transaction_hash TEXT PRIMARY KEY,
+                block_number INT8 NOT NULL,
+                from_address TEXT,
+                function_name TEXT NOT NULL,
+                args JSONB NOT NULL,
+                succeeded BOOL NOT NULL,
+                indexed_at TIMESTAMPTZ DEFAULT now()
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS orchestrator_calls_function_block_idx ON orchestrator_calls (function_name, block_number);",
+            "CREATE INDEX IF NOT EXISTS orchestrator_calls_from_address_idx ON orchestrator_calls (from_address);",
+        ],
+    ),
+    (
+        8,
+        "status change outbox",
+        [
+            # Side effects of status changes, written with the change and drained by outbox.py
+            """
+            CREATE TABLE IF NOT EXISTS status_outbox (
+                id BIGSERIAL PRIMARY KEY,
+                transaction_id INT8 NOT NULL,
+                wallet_address TEXT,
+                transaction_hash TEXT,
+                transaction_type TEXT NOT NULL,
+                transaction_status TEXT NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT now(),
+                next_attempt_at TIMESTAMPTZ DEFAULT now(),
+                attempts INT8 NOT NULL DEFAULT 0,
+                last_error TEXT,
+                lease_owner TEXT,
+                lease_expires_at TIMESTAMPTZ
+            );
+            """,
+            # Due entries in arrival order, the consumer's claim path
+            "CREATE INDEX IF NOT EXISTS status_outbox_next_attempt_idx ON status_outbox (next_attempt_at, id) INCLUDE (lease_expires_at);",
+        ],
+    ),
+    (
+        9,
+        "leader leases",
+        [
+            # One row per singleton role, e.g. the sweeper; held while expires_at is in the future
+            """
+            CREATE TABLE IF NOT EXISTS leader_leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL,
+                acquired_at TIMESTAMPTZ DEFAULT now(),
+                renewed_at TIMESTAMPTZ DEFAULT now()
+            );
+            """,
+        ],
+    ),
+    (
+        10,
+        "adaptive polling state",
+        [
+            # Consecutive status checks with the same node answer, see polling_policy
+            "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS attempts INT8 NOT NULL DEFAULT 0;",
+            # Status zks_getTransactionDetails last reported for a still-pending transaction
+            "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS last_rpc_status TEXT;",
+        ],
+    ),
+    (
+        11,
+        "lower-case stored transaction hashes",
+        [
+            # Hashes are lower-cased on insert since this version; pending rows and open
+            # onramps stored before are matched against blocks too. A hash whose lower-case
+            # form is already stored keeps its spelling instead of breaking the unique index
+            """
+            UPDATE transactions SET transaction_hash = lower(transaction_hash)
+            WHERE transaction_status = 'pending' AND transaction_hash <> lower(transaction_hash)
+            AND NOT EXISTS (
+                SELECT 1 FROM transactions AS other
+                WHERE other.transaction_hash = lower(transactions.transaction_hash)
+            );
+            """,
+            """
+            UPDATE openonramps SET transaction_hash = lower(transaction_hash)
+            WHERE transaction_hash <> lower(transaction_hash)
+            AND NOT EXISTS (
+                SELECT 1 FROM openonramps AS other
+                WHERE other.transaction_hash = lower(openonramps.transaction_hash)
+            );
+            """,
+        ],
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(cur):
+    """Returns the highest applied migration version, 0 for a fresh database."""
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+    return cur.fetchone()[0]
+
+
+def apply_migrations(conn):
+    """Applies all migrations newer than the recorded schema version.
+
+    DDL runs outside explicit transactions because CockroachDB executes schema changes
+    asynchronously and does not allow mixing them with writes in one transaction. All
+    statements are idempotent, so a migration interrupted halfway is simply re-run.
+
+    Args:
+        conn: psycopg2 connection to state_database
+
+    Returns:
+        int: schema version after applying the migrations
+    """
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        # DDL only on a fresh database, CockroachDB runs schema changes slowly even as no-ops
+        cur.execute(MIGRATIONS_TABLE_EXISTS)
+        if cur.fetchone() is None:
+            cur.execute(MIGRATIONS_TABLE)
+        current_version = get_schema_version(cur)
+
+        for version, name, statements in MIGRATIONS:
+            if version <= current_version:
+                continue
+            print(f"Applying migration {version}: {name}")
+            for statement in statements:
+                cur.execute(statement)
+            # Another instance may have finished the same migration concurrently
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s) ON CONFLICT (version) DO NOTHING;",
+                (version, name),
+            )
+            current_version = version
+
+        return current_version
+    finally:
+        cur.close()
@@ -0,0 +1,314 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, NamedTuple
+
+# Compiled contract output holding the Orchestrator ABI; the built-in ABI below is used
+# when the file is missing
+ORCHESTRATOR_ABI_PATH = os.getenv(
+    "ORCHESTRATOR_ABI_PATH",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "HelperScripts",
+        "Orchestrator_zksync.json",
+    ),
+)
+# Directory for the selector cache files, one per ABI hash
+SELECTOR_CACHE_DIR = os.getenv(
+    "ORCHESTRATOR_SELECTOR_CACHE_DIR", os.path.expanduser("~/.cache/zwift")
+)
+
+
+def _function(name, *inputs):
+    return {
+        "type": "function",
+        "name": name,
+        "inputs": [{"name": arg, "type": abi_type} for abi_type, arg in inputs],
+    }
+
+
+# Orchestrator functions called by users, matching the selectors seen on chain
+ORCHESTRATOR_ABI = [
+    _function("registerUserAccount", ("address", "wallet"), ("string", "email")),
+    _function("loginUserAccount", ("address", "wallet")),
+    _function("getUserEmail", ("address", "wallet")),
+    _function(
+        "createOffRampIntentAndSendETH", ("address", "user"), ("uint256", "amount")
+    ),
+    _function(
+        "getLongestQueuingOffRampIntentAddress", ("address[]", "excludedAddresses")
+    ),
+    _function(
+        "onRamp",
+        ("uint256", "amount"),
+        ("address", "offRamper"),
+        ("string", "senderEmail"),
+        ("string", "receiverEmail"),
+        ("uint256", "transactionAmount"),
+    ),
+    _function(
+        "releasePartialFundsToOnRamper",
+        ("address", "offRamper"),
+        ("address", "onRamper"),
+        ("uint256", "releaseAmount"),
+    ),
+]
+
+
+class DecodeError(ValueError):
+    """Raised when calldata does not match the ABI of its function selector."""
+
+
+class DecodedCall(NamedTuple):
+    selector: str
+    function: str
+    args: Dict[str, Any]
+
+
+## Field decoders: (calldata after the selector, offset of the field's head word) -> value
+def _word(data, position):
+    if position + 32 > len(data):
+        raise DecodeError(f"Calldata ends before byte {position + 32}")
+    return data[position : position + 32]
+
+
+def _decode_uint(data, position):
+    return int.from_bytes(_word(data, position), "big")
+
+
+def _decode_int(data, position):
+    return int.from_bytes(_word(data, position), "big", signed=True)
+
+
+def _decode_address(data, position):
+    # Lowercase like the addresses stored by the API, not checksummed
+    return "0x" + _word(data, position)[12:].hex()
+
+
+def _decode_bool(data, position):
+    return _word(data, position)[31] != 0
+
+
+def _fixed_bytes_decoder(size):
+    def decode(data, position):
+        return bytes(_word(data, position)[:size])
+
+    return decode
+
+
+def _tail(data, position):
+    # The head word holds the offset of the value from the start of the parameters
+    offset = _decode_uint(data, position)
+    length = _decode_uint(data, offset)
+    end = offset + 32 + length
+    if end > len(data):
+        raise DecodeError("Dynamic value runs past the end of the calldata")
+    return data[offset + 32 : end]
+
+
+def _decode_bytes(data, position):
+    return bytes(_tail(data, position))
+
+
+def _decode_string(data, position):
+    try:
+        return str(_tail(data, position), "utf-8")
+    except UnicodeDecodeError as e:
+        raise DecodeError(f"Invalid UTF-8 string: {e}") from e
+
+
+def _array_decoder(element_decoder):
+    def decode(data, position):
+        offset = _decode_uint(data, position)
+        length = _decode_uint(data, offset)
+        elements = data[offset + 32 :]
+        if length * 32 > len(elements):
+            raise DecodeError("Array runs past the end of the calldata")
+        return [element_decoder(elements, i * 32) for i in range(length)]
+
+    return decode
+
+
+def _static_decoder(abi_type):
+    if abi_type == "address":
+        return _decode_address
+    if abi_type == "bool":
+        return _decode_bool
+    if abi_type.startswith("uint"):
+        return _decode_uint
+    if abi_type.startswith("int"):
+        return _decode_int
+    if abi_type.startswith("bytes") and abi_type != "bytes":
+        return _fixed_bytes_decoder(int(abi_type[5:]))
+    return None
+
+
+def field_decoder(abi_type):
+    """Returns the decoder of one top-level ABI type.
+
+    Static types, string, bytes and dynamic arrays of static types are supported.
+
+    Raises:
+        ValueError: for tuples, fixed-size and nested arrays
+    """
+    if abi_type == "string":
+        return _decode_string
+    if abi_type == "bytes":
+        return _decode_bytes
+    if abi_type.endswith("[]"):
+        element_decoder = _static_decoder(abi_type[:-2])
+        if element_decoder is not None:
+            return _array_decoder(element_decoder)
+    else:
+        decoder = _static_decoder(abi_type)
+        if decoder is not None:
+            return decoder
+    raise ValueError(f"Unsupported ABI type {abi_type}")
+
+
+def function_signature(function):
+    return f"{function['name']}({','.join(arg['type'] for arg in function['inputs'])})"
+
+
+def abi_hash(abi):
+    return hashlib.sha256(
+        json.dumps(abi, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def _keccak_selector(signature):
+    # Imported lazily, only needed when the selectors are not cached yet
+    from eth_hash.auto import keccak
+
+    return "0x" + keccak(signature.encode())[:4].hex()
+
+
+def compute_selectors(abi, cache_dir=SELECTOR_CACHE_DIR):
+    """Returns signature -> 4-byte selector of every function in abi.
+
+    Selectors are read from a cache file named after the ABI hash, so keccak only runs the
+    first time an ABI is seen.
+    """
+    signatures = [
+        function_signature(function)
+        for function in abi
+        if function.get("type") == "function"
+    ]
+    cache_path = os.path.join(cache_dir, f"orchestrator_selectors_{abi_hash(abi)}.json")
+    try:
+        with open(cache_path) as file:
+            selectors = json.load(file)
+        if all(signature in selectors for signature in signatures):
+            return selectors
+    except (OSError, ValueError):
+        pass
+
+    selectors = {signature: _keccak_selector(signature) for signature in signatures}
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "w") as file:
+            json.dump(selectors, file, indent=2)
+    except OSError as e:
+        logging.warning(f"Could not write the selector cache {cache_path}: {e}")
+    return selectors
+
+
+class CalldataDecoder:
+    """Decodes transaction inputs of one contract from raw bytes.
+
+    Field decoders are compiled once per function, and every field is read through a
+    memoryview of the calldata, so decoding copies nothing but the returned values.
+    """
+
+    def __init__(self, abi, cache_dir=SELECTOR_CACHE_DIR):
+        selectors = compute_selectors(abi, cache_dir)
+        self._functions = {}  # selector bytes -> (selector, name, [(arg, decoder)])
+        for function in abi:
+            if function.get("type") != "function":
+                continue
+            try:
+                fields = [
+                    (arg["name"], field_decoder(arg["type"]))
+                    for arg in function["inputs"]
+                ]
+            except ValueError as e:
+                logging.warning(f"Skipping {function['name']}: {e}")
+                continue
+            selector = selectors[function_signature(function)]
+            self._functions[bytes.fromhex(selector[2:])] = (
+                selector,
+                function["name"],
+                fields,
+            )
+
+    @property
+    def selectors(self):
+        """Selector -> function name of every decodable function."""
+        return {selector: name for selector, name, _ in self._functions.values()}
+
+    def decode(self, calldata):
+        """Decodes one transaction input.
+
+        Args:
+            calldata (bytes|bytearray|memoryview|str): raw input, or hex with or without 0x
+
+        Raises:
+            DecodeError: the input is shorter or otherwise different from what its
+                function's ABI describes
+
+        Returns:
+            DecodedCall: selector, function name and arguments by name, None for a selector
+                of another function
+        """
+        if isinstance(calldata, str):
+            calldata = bytes.fromhex(calldata[2:] if calldata[:2] == "0x" else calldata)
+        data = memoryview(calldata)
+        function = self._functions.get(bytes(data[:4]))
+        if function is None:
+            return None
+        selector, name, fields = function
+        params = data[4:]
+        return DecodedCall(
+            selector,
+            name,
+            {arg: decoder(params, i * 32) for i, (arg, decoder) in enumerate(fields)},
+        )
+
+    def decode_many(self, inputs, skip_errors=True):
+        """Decodes a batch of transaction inputs, e.g. every input of a block range.
+
+        Args:
+            inputs (iterable): calldata values accepted by decode
+            skip_errors (bool): return None for malformed inputs instead of raising
+
+        Returns:
+            list: DecodedCall or None per input, in input order
+        """
+        decode = self.decode
+        if not skip_errors:
+            return [decode(calldata) for calldata in inputs]
+        results = []
+        for calldata in inputs:
+            try:
+                results.append(decode(calldata))
+            except (DecodeError, ValueError):
+                results.append(None)
+        return results
+
+
+def load_abi(path=ORCHESTRATOR_ABI_PATH):
+    """Returns the Orchestrator ABI from the compiled contract output, or the built-in one."""
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return ORCHESTRATOR_ABI
+    return data["contracts"]["src/Orchestrator.sol"]["Orchestrator"]["abi"]
+
+
+@functools.lru_cache(maxsize=None)
+def get_decoder():
+    """Returns the shared Orchestrator decoder, built on first use."""
+    return CalldataDecoder(load_abi())
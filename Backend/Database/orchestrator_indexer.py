@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import logging
+import os
+
+import orjson
+
+import database
+import instrumentation
+import queries
+from block_ingestor import fetch_failed_hashes
+from orchestrator_decoder import get_decoder
+from rpc_client import RPC_CONCURRENCY
+from sync_transaction_statuses import RpcError, close_session, rpc_batch, rpc_call
+
+# Address of the deployed Orchestrator contract whose calls are indexed
+ORCHESTRATOR_ADDRESS = os.getenv("ORCHESTRATOR_ADDRESS", "").lower()
+# Blocks requested in one JSON-RPC batch
+INDEXER_BLOCK_BATCH_SIZE = int(os.getenv("INDEXER_BLOCK_BATCH_SIZE", "25"))
+# Blocks indexed per checkpoint; a crash repeats at most one chunk per range
+INDEXER_CHUNK_BLOCKS = int(os.getenv("INDEXER_CHUNK_BLOCKS", "500"))
+# Disjoint block ranges backfilled side by side
+INDEXER_WORKERS = int(os.getenv("INDEXER_WORKERS", "4"))
+
+CURSOR_PREFIX = "orchestrator"
+
+
+def split_range(from_block, to_block, workers):
+    """Splits from_block..to_block into at most workers contiguous, disjoint ranges."""
+    total = to_block - from_block + 1
+    workers = max(1, min(workers, total))
+    size, extra = divmod(total, workers)
+    ranges = []
+    start = from_block
+    for i in range(workers):
+        end = start + size - 1 + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def cursor_name(start, end):
+    # One cursor per range, so rerunning the same backfill resumes every range
+    return f"{CURSOR_PREFIX}:{start}-{end}"
+
+
+def _jsonable(value):
+    # uint256 amounts do not fit JSON numbers, store integers as decimal strings
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+async def fetch_full_blocks(block_numbers, semaphore):
+    """Fetches blocks with their transaction objects, INDEXER_BLOCK_BATCH_SIZE per batch,
+    all batches in parallel.
+
+    Raises:
+        RpcError: a block could not be fetched, so the range must not be checkpointed
+
+    Returns:
+        list: block objects in block_numbers order
+    """
+    batches = [
+        block_numbers[i : i + INDEXER_BLOCK_BATCH_SIZE]
+        for i in range(0, len(block_numbers), INDEXER_BLOCK_BATCH_SIZE)
+    ]
+    results = await asyncio.gather(
+        *(
+            rpc_batch(
+                [("eth_getBlockByNumber", [hex(number), True]) for number in batch],
+                semaphore,
+            )
+            for batch in batches
+        )
+    )
+    blocks = []
+    for batch, batch_results in zip(batches, results):
+        for number, block in zip(batch, batch_results):
+            if isinstance(block, RpcError) or block is None:
+                raise RpcError(f"Block {number} is not available")
+            blocks.append(block)
+    return blocks
+
+
+def extract_calls(blocks, address=None):
+    """Decodes every transaction sent to the Orchestrator in blocks.
+
+    Returns:
+        tuple: (calls as dicts, number of Orchestrator transactions that could not be decoded)
+    """
+    address = address or ORCHESTRATOR_ADDRESS
+    sent = [
+        (int(block["number"], 16), tx)
+        for block in blocks
+        for tx in block["transactions"]
+        if isinstance(tx, dict) and (tx.get("to") or "").lower() == address
+    ]
+    decoded = get_decoder().decode_many(tx.get("input", "0x") for _, tx in sent)
+    calls = []
+    for (block_number, tx), call in zip(sent, decoded):
+        if call is None:
+            continue
+        calls.append(
+            {
+                "transaction_hash": tx["hash"].lower(),
+                "block_number": block_number,
+                "from_address": (tx.get("from") or "").lower() or None,
+                "function_name": call.function,
+                "args": orjson.dumps(
+                    {name: _jsonable(value) for name, value in call.args.items()}
+                ).decode(),
+            }
+        )
+    return calls, len(sent) - len(calls)
+
+
+async def _store_chunk(conn, calls, failed_hashes, name, to_block):
+    if calls:
+        await conn.execute(
+            queries.BULK_INSERT_ORCHESTRATOR_CALLS,
+            [call["transaction_hash"] for call in calls],
+            [call["block_number"] for call in calls],
+            [call["from_address"] for call in calls],
+            [call["function_name"] for call in calls],
+            [call["args"] for call in calls],
+            [call["transaction_hash"] not in failed_hashes for call in calls],
+        )
+    # Same transaction as the rows, so a checkpoint never gets ahead of the data
+    await conn.execute(queries.UPSERT_INGESTION_CURSOR, name, to_block)
+
+
+@instrumentation.timed("orchestrator_index_chunk")
+async def index_chunk(from_block, to_block, name, semaphore):
+    """Indexes the Orchestrator calls of blocks from_block..to_block and checkpoints to_block.
+
+    Returns:
+        dict: number of blocks, indexed calls and undecodable Orchestrator transactions
+    """
+    blocks = await fetch_full_blocks(list(range(from_block, to_block + 1)), semaphore)
+    calls, undecodable = extract_calls(blocks)
+    failed_hashes = await fetch_failed_hashes(
+        [call["transaction_hash"] for call in calls], semaphore
+    )
+    async with database.get_db_connection() as conn:
+        await database.run_in_transaction(
+            conn, _store_chunk, calls, failed_hashes, name, to_block
+        )
+    return {"blocks": len(blocks), "calls": len(calls), "undecodable": undecodable}
+
+
+async def index_range(start, end, semaphore):
+    """Indexes blocks start..end chunk by chunk, resuming after the stored checkpoint.
+
+    Returns:
+        dict: totals over the chunks indexed by this call
+    """
+    name = cursor_name(start, end)
+    async with database.get_db_connection() as conn:
+        checkpoint = await conn.fetchval(queries.SELECT_INGESTION_CURSOR, name)
+    cursor = start - 1 if checkpoint is None else checkpoint
+    if cursor >= start:
+        logging.info(f"Resuming {name} after block {cursor}")
+
+    totals = {"blocks": 0, "calls": 0, "undecodable": 0}
+    while cursor < end:
+        to_block = min(end, cursor + INDEXER_CHUNK_BLOCKS)
+        result = await index_chunk(cursor + 1, to_block, name, semaphore)
+        for key in totals:
+            totals[key] += result[key]
+        cursor = to_block
+    return totals
+
+
+async def backfill(from_block, to_block, workers=INDEXER_WORKERS):
+    """Indexes from_block..to_block over workers disjoint ranges in parallel.
+
+    Rerunning with the same arguments resumes every range from its checkpoint. Calls are
+    keyed by transaction hash, so overlapping runs with other arguments only repeat work.
+
+    Returns:
+        dict: totals over all ranges
+    """
+    if not ORCHESTRATOR_ADDRESS:
+        raise ValueError("ORCHESTRATOR_ADDRESS is not set")
+    instrumentation.current_operation.set("orchestrator_indexer")
+    # Shared by all ranges, bounding the RPC batches in flight
+    semaphore = asyncio.Semaphore(RPC_CONCURRENCY)
+    results = await asyncio.gather(
+        *(
+            index_range(start, end, semaphore)
+            for start, end in split_range(from_block, to_block, workers)
+        )
+    )
+    return {
+        key: sum(result[key] for result in results)
+        for key in ("blocks", "calls", "undecodable")
+    }
+
+
+async def latest_finalized_block():
+    block = await rpc_call("eth_getBlockByNumber", ["finalized", False])
+    return int(block["number"], 16)
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Index Orchestrator calls of a block range into orchestrator_calls"
+    )
+    parser.add_argument("--from-block", type=int, required=True)
+    parser.add_argument(
+        "--to-block",
+        type=int,
+        help="last block to index, defaults to the finalized block",
+    )
+    parser.add_argument("--workers", type=int, default=INDEXER_WORKERS)
+    args = parser.parse_args()
+
+    try:
+        to_block = args.to_block
+        if to_block is None:
+            to_block = await latest_finalized_block()
+        totals = await backfill(args.from_block, to_block, args.workers)
+        print(
+            f"Indexed blocks {args.from_block}-{to_block}: {totals['calls']} Orchestrator"
+            f" calls in {totals['blocks']} new blocks, {totals['undecodable']} undecodable"
+        )
+    finally:
+        await close_session()
+        await database.db_pool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import socket
+
+import database
+import instrumentation
+import queries
+import wallet_state
+from cache import response_cache
+from events import event_hub
+
+# Outbox entries whose side effects are applied together
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+# Seconds a claimed batch stays leased; an expired lease lets another worker take it over
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+# Seconds between polls of an empty outbox; status changes of this worker wake it earlier
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+# Seconds before the first retry of a failed batch, doubled per attempt up to the maximum
+OUTBOX_RETRY_DELAY = float(os.getenv("OUTBOX_RETRY_DELAY", "1"))
+OUTBOX_MAX_RETRY_DELAY = float(os.getenv("OUTBOX_MAX_RETRY_DELAY", "300"))
+# Outbox size at which the reconciler stops claiming transactions until it is drained
+OUTBOX_MAX_BACKLOG = int(os.getenv("OUTBOX_MAX_BACKLOG", "10000"))
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+_wakeup = None
+
+
+def notify():
+    """Wakes this worker's consumer after status changes were committed."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def retry_delay(attempts):
+    """Returns the seconds until a batch that failed attempts times is tried again."""
+    return min(OUTBOX_MAX_RETRY_DELAY, OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+async def backlog(limit=OUTBOX_MAX_BACKLOG):
+    """Returns the number of queued outbox entries, counted up to limit."""
+    async with database.get_db_connection() as conn:
+        return await conn.fetchval(queries.SELECT_STATUS_OUTBOX_BACKLOG, limit)
+
+
+async def _claim(conn, limit):
+    return await conn.fetch(
+        queries.CLAIM_STATUS_OUTBOX, WORKER_ID, OUTBOX_LEASE_SECONDS, limit
+    )
+
+
+async def _apply(conn, entries):
+    """Applies the database side effects of a batch and acknowledges it.
+
+    Deleting open onramps by transaction hash is idempotent, so a batch repeated after an
+    expired lease changes nothing twice.
+
+    Returns:
+        Record[]: id and wallet_address of the deleted onramp entries
+    """
+    succeeded_onramps = [
+        entry["transaction_hash"]
+        for entry in entries
+        if entry["transaction_status"] == "success"
+        and entry["transaction_type"] == "onramp"
+    ]
+    deleted = []
+    if succeeded_onramps:
+        deleted = await conn.fetch(
+            queries.BULK_DELETE_ONRAMPS_BY_HASH, succeeded_onramps
+        )
+        await wallet_state.set_open_onramp(
+            conn, [row["wallet_address"] for row in deleted], False
+        )
+    await conn.execute(
+        queries.DELETE_STATUS_OUTBOX, [entry["id"] for entry in entries], WORKER_ID
+    )
+    return deleted
+
+
+@instrumentation.timed("outbox_batch")
+async def drain_batch(limit=OUTBOX_BATCH_SIZE):
+    """Claims one batch of outbox entries and applies their side effects.
+
+    Onramp deletions and the acknowledgement commit in one transaction. Cache invalidation,
+    events and the matchmaking queues follow after the commit, as they did when the
+    sweep applied them inline. A failed batch is released and retried with backoff.
+
+    Returns:
+        dict: number of claimed entries, deleted onramps and entries that failed
+    """
+    async with database.get_db_connection() as conn:
+        entries = await database.run_in_transaction(conn, _claim, limit)
+        if not entries:
+            return {"claimed": 0, "deleted_onramps": 0, "failed": 0}
+        try:
+            deleted = await database.run_in_transaction(conn, _apply, entries)
+        except Exception as e:
+            attempts = max(entry["attempts"] for entry in entries)
+            logging.error(
+                f"Failed to apply {len(entries)} outbox entries (attempt {attempts}): {e}"
+            )
+            await conn.execute(
+                queries.RETRY_STATUS_OUTBOX,
+                [entry["id"] for entry in entries],
+                retry_delay(attempts),
+                str(e),
+                WORKER_ID,
+            )
+            return {
+                "claimed": len(entries),
+                "deleted_onramps": 0,
+                "failed": len(entries),
+            }
+
+    await response_cache.invalidate_wallets(
+        [entry["wallet_address"] for entry in entries]
+    )
+    await event_hub.publish_status_changes(entries)
+    if deleted:
+        await response_cache.invalidate_wallet_listing()
+        # Through the event hub, so the matchmaking queues of all workers drop them
+        await event_hub.publish_onramps_closed(deleted)
+    return {"claimed": len(entries), "deleted_onramps": len(deleted), "failed": 0}
+
+
+async def drain():
+    """Drains the outbox batch by batch until no entry is due.
+
+    Returns:
+        dict: totals over all batches
+    """
+    totals = {"claimed": 0, "deleted_onramps": 0, "failed": 0}
+    while True:
+        result = await drain_batch()
+        for key in totals:
+            totals[key] += result[key]
+        if result["claimed"] < OUTBOX_BATCH_SIZE or result["failed"]:
+            return totals
+
+
+async def run_forever():
+    """Background task applying the side effects of status changes, one per worker process."""
+    global _wakeup
+    logging.info(f"Starting status outbox consumer {WORKER_ID}")
+    instrumentation.current_operation.set("outbox")
+    _wakeup = asyncio.Event()
+    while True:
+        _wakeup.clear()
+        try:
+            totals = await drain()
+            if totals["deleted_onramps"]:
+                logging.info(
+                    f"Applied {totals['claimed']} status changes, deleted "
+                    f"{totals['deleted_onramps']} onramp entries"
+                )
+        except Exception as e:
+            # Keep the consumer alive through transient database failures
+            logging.error(f"Status outbox drain failed: {e}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), OUTBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
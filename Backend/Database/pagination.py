@@ -0,0 +1,114 @@
+import base64
+import json
+import os
+from contextlib import AsyncExitStack
+
+import orjson
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+import database
+
+# Page size used when a list endpoint is called without ?limit=
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+# Rows fetched per round trip by the server-side cursors behind NDJSON streams
+STREAM_PREFETCH = int(os.getenv("STREAM_PREFETCH", "500"))
+
+
+def encode_cursor(last_id):
+    """Builds the opaque cursor token pointing after the row with id last_id."""
+    raw = json.dumps({"after": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns the id to continue after, 0 for the first page.
+
+    Raises:
+        HTTPException: the token was not produced by encode_cursor
+    """
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["after"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def page_size(limit):
+    """Clamps a requested ?limit= to 1..MAX_PAGE_SIZE, defaulting to DEFAULT_PAGE_SIZE."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def split_page(rows, limit):
+    """Splits rows fetched with LIMIT limit + 1 into the page and the next cursor.
+
+    Returns:
+        tuple: (rows of this page, cursor token or None on the last page)
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1]["id"])
+    return rows, None
+
+
+class ConnectionStreamingResponse(StreamingResponse):
+    """StreamingResponse that returns the connection behind its body to the pool.
+
+    release runs however the response ends. That includes a client disconnecting before
+    the body starts, when the body generator never runs and its cleanup never happens.
+    """
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._release()
+
+
+async def stream_ndjson(query, *args, project=dict):
+    """Streams the rows of query as newline-delimited JSON through a server-side cursor.
+
+    The connection is checked out before the response starts, so an exhausted pool still
+    surfaces as a 503 instead of a truncated 200. Only STREAM_PREFETCH rows are held in
+    memory at a time; the connection goes back to the pool once the stream ends or the
+    client disconnects.
+
+    Args:
+        query (str): SELECT statement from queries.py
+        project (callable): turns a row into the JSON-serializable object sent per line
+
+    Returns:
+        ConnectionStreamingResponse: application/x-ndjson body, one object per line
+    """
+    stack = AsyncExitStack()
+    conn = await stack.enter_async_context(database.get_db_connection())
+
+    async def lines():
+        try:
+            # asyncpg cursors only exist inside a transaction
+            async with conn.transaction():
+                async for row in conn.cursor(query, *args, prefetch=STREAM_PREFETCH):
+                    yield orjson.dumps(project(row)) + b"\n"
+        finally:
+            await stack.aclose()
+
+    body = lines()
+
+    async def release():
+        # Closing the generator rolls back its cursor transaction; closing the stack alone
+        # covers a body that never started
+        await body.aclose()
+        await stack.aclose()
+
+    return ConnectionStreamingResponse(body, release, media_type="application/x-ndjson")
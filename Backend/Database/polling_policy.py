@@ -0,0 +1,88 @@
+import os
+
+# Seconds until the first check of a status the node reported, doubled by POLL_BACKOFF
+# per further check with the same answer up to the status' maximum delay
+POLL_INITIAL_DELAY = float(os.getenv("POLL_INITIAL_DELAY", "2"))
+POLL_BACKOFF = float(os.getenv("POLL_BACKOFF", "2"))
+# Known to the node but not in a block yet; inclusion usually follows within seconds, so
+# a transaction still waiting after that is likely stuck
+POLL_PENDING_MAX_DELAY = float(os.getenv("POLL_PENDING_MAX_DELAY", "600"))
+# Unknown to the node: not propagated yet or dropped
+POLL_UNKNOWN_MAX_DELAY = float(os.getenv("POLL_UNKNOWN_MAX_DELAY", "600"))
+# Included in a block, waiting hours for its batch to be verified on L1. The maximum
+# bounds how late a verification is noticed; HelperScripts/simulate_polling.py shows
+# the RPC calls it costs
+POLL_INCLUDED_DELAY = float(os.getenv("POLL_INCLUDED_DELAY", "60"))
+POLL_INCLUDED_MAX_DELAY = float(os.getenv("POLL_INCLUDED_MAX_DELAY", "300"))
+# Transaction age in seconds after which a transaction still in that state is failed
+POLL_PENDING_DEADLINE = float(os.getenv("POLL_PENDING_DEADLINE", str(24 * 60 * 60)))
+POLL_UNKNOWN_DEADLINE = float(os.getenv("POLL_UNKNOWN_DEADLINE", str(60 * 60)))
+POLL_INCLUDED_DEADLINE = float(
+    os.getenv("POLL_INCLUDED_DEADLINE", str(7 * 24 * 60 * 60))
+)
+
+# last_rpc_status of a transaction the node has not answered for yet
+NO_ANSWER = None
+
+
+class PollingPolicy:
+    """Schedules status checks of pending transactions from the node's last answer.
+
+    Every check with the same answer as the one before backs the next check off
+    exponentially, from initial_delay for "pending" and "unknown" and from included_delay
+    for "included". A changed answer starts its own schedule over. A transaction still
+    "pending", "unknown" or "included" past that state's deadline is expired to failed.
+    Checks the node did not answer keep the previous schedule and never expire a
+    transaction, so an RPC outage does not fail anything.
+    """
+
+    def __init__(
+        self,
+        initial_delay=POLL_INITIAL_DELAY,
+        backoff=POLL_BACKOFF,
+        pending_max_delay=POLL_PENDING_MAX_DELAY,
+        unknown_max_delay=POLL_UNKNOWN_MAX_DELAY,
+        included_delay=POLL_INCLUDED_DELAY,
+        included_max_delay=POLL_INCLUDED_MAX_DELAY,
+        pending_deadline=POLL_PENDING_DEADLINE,
+        unknown_deadline=POLL_UNKNOWN_DEADLINE,
+        included_deadline=POLL_INCLUDED_DEADLINE,
+    ):
+        self.backoff = backoff
+        # rpc status -> (first delay, maximum delay, deadline)
+        self.schedules = {
+            "pending": (initial_delay, pending_max_delay, pending_deadline),
+            "unknown": (initial_delay, unknown_max_delay, unknown_deadline),
+            "included": (included_delay, included_max_delay, included_deadline),
+        }
+
+    def next_attempts(self, previous_status, attempts, rpc_status):
+        """Returns the consecutive checks with the same answer, counting this one."""
+        if rpc_status is NO_ANSWER or rpc_status == previous_status:
+            return attempts + 1
+        return 1
+
+    def next_check(self, previous_status, attempts, rpc_status, age):
+        """Decides when a transaction that is still not settled is checked again.
+
+        Args:
+            previous_status (str|None): last_rpc_status before this check
+            attempts (int): attempts stored before this check
+            rpc_status (str|None): this check's answer, NO_ANSWER if the node gave none
+            age (float): seconds since the transaction was recorded
+
+        Returns:
+            tuple: (status, attempts, delay) to store, with delay None when the
+                transaction is past its deadline and has to be failed
+        """
+        attempts = self.next_attempts(previous_status, attempts, rpc_status)
+        status = previous_status if rpc_status is NO_ANSWER else rpc_status
+        first, maximum, deadline = self.schedules.get(status, self.schedules["unknown"])
+        if rpc_status is not NO_ANSWER and age >= deadline:
+            return status, attempts, None
+        # The exponent is capped so long-stuck transactions cannot overflow the float
+        backoff = self.backoff ** min(attempts - 1, 64)
+        return status, attempts, min(maximum, first * backoff)
+
+
+polling_policy = PollingPolicy()
@@ -0,0 +1,410 @@
+# SQL used by the API endpoints and the status sweep.
+# Kept in one place so HelperScripts/check_query_plans.py can EXPLAIN every query
+# against the indexes created in migrations.py.
+
+## transactions
+# Leases up to $3 due pending transactions to worker $1 for $2 seconds. Rows leased by
+# another live worker are skipped; concurrent claims of the same row surface as
+# serialization conflicts and are retried by database.run_in_transaction.
+CLAIM_DUE_TRANSACTIONS = """
+UPDATE transactions SET lease_owner = $1, lease_expires_at = now() + $2 * INTERVAL '1 second'
+WHERE id IN (
+    SELECT id FROM transactions
+    WHERE transaction_status = 'pending' AND next_check_at <= now()
+    AND (lease_expires_at IS NULL OR lease_expires_at < now())
+    ORDER BY next_check_at
+    LIMIT $3
+)
+RETURNING id, transaction_hash, transaction_type, created_at, attempts, last_rpc_status
+"""
+
+# Like CLAIM_DUE_TRANSACTIONS, limited to transactions older than $4 seconds that no
+# ingested block contained; block ingestion mode checks only these by hash
+CLAIM_DUE_UNINCLUDED_TRANSACTIONS = """
+UPDATE transactions SET lease_owner = $1, lease_expires_at = now() + $2 * INTERVAL '1 second'
+WHERE id IN (
+    SELECT id FROM transactions
+    WHERE transaction_status = 'pending' AND next_check_at <= now()
+    AND (lease_expires_at IS NULL OR lease_expires_at < now())
+    AND included_block IS NULL AND created_at < now() - $4 * INTERVAL '1 second'
+    ORDER BY next_check_at
+    LIMIT $3
+)
+RETURNING id, transaction_hash, transaction_type, created_at, attempts, last_rpc_status
+"""
+
+# Releases the lease of still-pending transactions, storing the node's last answer and the
+# attempts and next check time decided by polling_policy
+RESCHEDULE_TRANSACTIONS = """
+UPDATE transactions
+SET next_check_at = now() + schedule.delay * INTERVAL '1 second', attempts = schedule.attempts,
+    last_rpc_status = schedule.rpc_status, lease_owner = NULL, lease_expires_at = NULL
+FROM unnest($1::INT8[], $2::FLOAT8[], $3::INT8[], $4::TEXT[]) AS schedule (id, delay, attempts, rpc_status)
+WHERE transactions.id = schedule.id AND transactions.lease_owner = $5
+"""
+
+# Pending transactions among the hashes of freshly ingested blocks
+SELECT_PENDING_BY_HASHES = """
+SELECT id, transaction_hash, transaction_type FROM transactions
+WHERE transaction_status = 'pending' AND transaction_hash = ANY($1::TEXT[])
+"""
+
+MARK_TRANSACTIONS_INCLUDED = """
+UPDATE transactions SET included_block = blocks.block_number
+FROM unnest($1::INT8[], $2::INT8[]) AS blocks (id, block_number)
+WHERE transactions.id = blocks.id AND transactions.transaction_status = 'pending'
+"""
+
+# Pending transactions whose block is at or below the finalized block
+SELECT_PENDING_INCLUDED_UP_TO = """
+SELECT id, transaction_hash, transaction_type FROM transactions
+WHERE transaction_status = 'pending' AND included_block <= $1
+"""
+
+SELECT_PENDING_HASHES_FOR_WALLET = """
+SELECT id, transaction_hash, transaction_type FROM transactions
+WHERE transaction_status = 'pending' AND wallet_address = $1
+"""
+
+SELECT_PENDING_REGISTRATION_FOR_WALLET = """
+SELECT id FROM transactions
+WHERE wallet_address = $1 AND transaction_type = 'register' AND transaction_status = 'pending'
+"""
+
+SELECT_PENDING_ID_FOR_WALLET = """
+SELECT id FROM transactions
+WHERE wallet_address = $1 AND transaction_status = 'pending'
+"""
+
+SELECT_PENDING_FOR_WALLET = """
+SELECT id, wallet_address, transaction_hash, transaction_type, transaction_status, created_at FROM transactions
+WHERE wallet_address = $1 AND transaction_status = 'pending'
+ORDER BY id
+"""
+
+# Keyset pages: rows after id $2, at most $3 of them (callers ask for one extra row to
+# learn whether another page follows)
+SELECT_PENDING_FOR_WALLET_PAGE = """
+SELECT id, wallet_address, transaction_hash, transaction_type, transaction_status, created_at FROM transactions
+WHERE wallet_address = $1 AND transaction_status = 'pending' AND id > $2
+ORDER BY id LIMIT $3
+"""
+
+SELECT_PENDING_OFFRAMPS_FOR_WALLET_PAGE = """
+SELECT id, wallet_address, transaction_hash, transaction_type, transaction_status, created_at FROM transactions
+WHERE wallet_address = $1 AND transaction_status = 'pending' AND transaction_type = 'offramp' AND id > $2
+ORDER BY id LIMIT $3
+"""
+
+SELECT_PENDING_OFFRAMPS_FOR_WALLET = """
+SELECT id, wallet_address, transaction_hash, transaction_type, transaction_status, created_at FROM transactions
+WHERE wallet_address = $1 AND transaction_status = 'pending' AND transaction_type = 'offramp'
+ORDER BY id
+"""
+
+# Applies many status changes in one statement; rows no longer pending are left untouched.
+# Every change is queued in status_outbox by the same statement, so its side effects are
+# committed or rolled back together with it.
+BULK_UPDATE_TRANSACTION_STATUSES = """
+WITH updated AS (
+    UPDATE transactions
+    SET transaction_status = updates.transaction_status, lease_owner = NULL, lease_expires_at = NULL
+    FROM unnest($1::INT8[], $2::TEXT[]) AS updates (id, transaction_status)
+    WHERE transactions.id = updates.id AND transactions.transaction_status = 'pending'
+    RETURNING transactions.id, transactions.wallet_address, transactions.transaction_hash, transactions.transaction_type, transactions.transaction_status
+), queued AS (
+    INSERT INTO status_outbox (transaction_id, wallet_address, transaction_hash, transaction_type, transaction_status)
+    SELECT * FROM updated
+    RETURNING id
+)
+SELECT wallet_address, transaction_hash, transaction_type, transaction_status FROM updated
+"""
+
+SET_TRANSACTION_SUCCESS = """
+UPDATE transactions SET transaction_status = 'success' WHERE id = $1 AND transaction_status = 'pending'
+RETURNING wallet_address, transaction_hash, transaction_type, transaction_status
+"""
+
+INSERT_TRANSACTION = """
+INSERT INTO transactions (wallet_address, transaction_hash, transaction_type, transaction_status)
+VALUES ($1, $2, $3, $4) RETURNING *
+"""
+
+# Size and age profile of the pending backlog for the metrics endpoint
+SELECT_PENDING_BACKLOG = """
+SELECT
+    count(*) AS pending,
+    COALESCE(sum(CASE WHEN next_check_at <= now() THEN 1 ELSE 0 END), 0) AS due,
+    COALESCE(sum(CASE WHEN created_at > now() - INTERVAL '1 minute' THEN 1 ELSE 0 END), 0) AS younger_than_60,
+    COALESCE(sum(CASE WHEN created_at > now() - INTERVAL '10 minutes' THEN 1 ELSE 0 END), 0) AS younger_than_600,
+    COALESCE(sum(CASE WHEN created_at > now() - INTERVAL '1 hour' THEN 1 ELSE 0 END), 0) AS younger_than_3600,
+    COALESCE(sum(CASE WHEN created_at > now() - INTERVAL '1 day' THEN 1 ELSE 0 END), 0) AS younger_than_86400
+FROM transactions
+WHERE transaction_status = 'pending'
+"""
+
+# Multi-row insert of parallel arrays; hashes already stored are skipped, and only the
+# rows actually written come back
+BULK_INSERT_TRANSACTIONS = """
+INSERT INTO transactions (wallet_address, transaction_hash, transaction_type, transaction_status)
+SELECT * FROM unnest($1::TEXT[], $2::TEXT[], $3::TEXT[], $4::TEXT[])
+ON CONFLICT (transaction_hash) DO NOTHING
+RETURNING id, wallet_address, transaction_hash, transaction_type, transaction_status
+"""
+
+# Moves up to $2 settled transactions older than $1 seconds into transactions_archive and
+# folds them into wallet_summaries, all in one statement. Returns the archived rows and
+# the number of wallets whose summary changed.
+ARCHIVE_SETTLED_TRANSACTIONS = """
+WITH moved AS (
+    DELETE FROM transactions
+    WHERE id IN (
+        SELECT id FROM transactions
+        WHERE transaction_status IN ('success', 'failed')
+        AND created_at < now() - $1 * INTERVAL '1 second'
+        ORDER BY created_at
+        LIMIT $2
+    )
+    RETURNING id, wallet_address, transaction_hash, transaction_type, transaction_status, created_at, included_block
+), archived AS (
+    INSERT INTO transactions_archive (id, wallet_address, transaction_hash, transaction_type, transaction_status, created_at, included_block)
+    SELECT * FROM moved
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id
+), summarized AS (
+    INSERT INTO wallet_summaries AS summary (wallet_address, registrations, registration_status, onramps, offramps, succeeded, failed, last_created_at)
+    SELECT
+        wallet_address,
+        count(*) FILTER (WHERE transaction_type = 'register'),
+        (array_agg(transaction_status ORDER BY created_at DESC) FILTER (WHERE transaction_type = 'register'))[1],
+        count(*) FILTER (WHERE transaction_type = 'onramp'),
+        count(*) FILTER (WHERE transaction_type = 'offramp'),
+        count(*) FILTER (WHERE transaction_status = 'success'),
+        count(*) FILTER (WHERE transaction_status = 'failed'),
+        max(created_at)
+    FROM moved
+    WHERE wallet_address IS NOT NULL
+    GROUP BY wallet_address
+    ON CONFLICT (wallet_address) DO UPDATE SET
+        registrations = summary.registrations + excluded.registrations,
+        registration_status = COALESCE(excluded.registration_status, summary.registration_status),
+        onramps = summary.onramps + excluded.onramps,
+        offramps = summary.offramps + excluded.offramps,
+        succeeded = summary.succeeded + excluded.succeeded,
+        failed = summary.failed + excluded.failed,
+        last_created_at = GREATEST(summary.last_created_at, excluded.last_created_at),
+        updated_at = now()
+    RETURNING wallet_address
+)
+SELECT (SELECT count(*) FROM moved) AS archived, (SELECT count(*) FROM summarized) AS wallets
+"""
+
+## wallet_state
+SELECT_WALLET_STATE = """
+SELECT wallet_address, registrations, registration_status, pending_count, pending_offramps, open_onramp, updated_at
+FROM wallet_state WHERE wallet_address = $1
+"""
+
+# Adds per-wallet deltas: registrations and pending counts are incremented, a non-NULL
+# registration status replaces the stored one
+APPLY_WALLET_STATE_DELTAS = """
+INSERT INTO wallet_state AS state (wallet_address, registrations, registration_status, pending_count, pending_offramps)
+SELECT * FROM unnest($1::TEXT[], $2::INT8[], $3::TEXT[], $4::INT8[], $5::INT8[])
+ON CONFLICT (wallet_address) DO UPDATE SET
+    registrations = state.registrations + excluded.registrations,
+    registration_status = COALESCE(excluded.registration_status, state.registration_status),
+    pending_count = state.pending_count + excluded.pending_count,
+    pending_offramps = state.pending_offramps + excluded.pending_offramps,
+    updated_at = now()
+"""
+
+SET_WALLET_OPEN_ONRAMP = """
+INSERT INTO wallet_state (wallet_address, open_onramp)
+SELECT wallet_address, $2 FROM unnest($1::TEXT[]) AS wallet_address
+ON CONFLICT (wallet_address) DO UPDATE SET open_onramp = excluded.open_onramp, updated_at = now()
+"""
+
+# The wallet $2 rows after wallet $1 in transactions, the end of the next rebuild range
+SELECT_WALLET_RANGE_END = """
+SELECT wallet_address FROM transactions WHERE wallet_address > $1
+ORDER BY wallet_address OFFSET $2 LIMIT 1
+"""
+
+SELECT_MAX_WALLET_ADDRESS = """
+SELECT GREATEST(
+    (SELECT max(wallet_address) FROM transactions),
+    (SELECT max(wallet_address) FROM wallet_summaries),
+    (SELECT max(wallet_address) FROM openonramps),
+    (SELECT max(wallet_address) FROM wallet_state)
+)
+"""
+
+# Held for the rebuild of a range, so concurrent deltas land after the recomputed values
+LOCK_WALLET_STATE_RANGE = """
+SELECT wallet_address FROM wallet_state
+WHERE wallet_address > $1 AND wallet_address <= $2
+FOR UPDATE
+"""
+
+# Recomputes the state of every wallet in the range ($1, $2] from transactions, the
+# archived summaries and openonramps
+REBUILD_WALLET_STATE_RANGE = """
+INSERT INTO wallet_state AS state (wallet_address, registrations, registration_status, pending_count, pending_offramps, open_onramp)
+SELECT
+    wallets.wallet_address,
+    COALESCE(live.registrations, 0) + COALESCE(archived.registrations, 0),
+    COALESCE(live.registration_status, archived.registration_status),
+    COALESCE(live.pending_count, 0),
+    COALESCE(live.pending_offramps, 0),
+    onramps.wallet_address IS NOT NULL
+FROM (
+    SELECT wallet_address FROM transactions WHERE wallet_address > $1 AND wallet_address <= $2
+    UNION SELECT wallet_address FROM wallet_summaries WHERE wallet_address > $1 AND wallet_address <= $2
+    UNION SELECT wallet_address FROM openonramps WHERE wallet_address > $1 AND wallet_address <= $2
+    UNION SELECT wallet_address FROM wallet_state WHERE wallet_address > $1 AND wallet_address <= $2
+) AS wallets
+LEFT JOIN (
+    SELECT
+        wallet_address,
+        count(*) FILTER (WHERE transaction_type = 'register') AS registrations,
+        (array_agg(transaction_status ORDER BY created_at DESC, id DESC) FILTER (WHERE transaction_type = 'register'))[1] AS registration_status,
+        count(*) FILTER (WHERE transaction_status = 'pending') AS pending_count,
+        count(*) FILTER (WHERE transaction_status = 'pending' AND transaction_type = 'offramp') AS pending_offramps
+    FROM transactions
+    WHERE wallet_address > $1 AND wallet_address <= $2
+    GROUP BY wallet_address
+) AS live ON live.wallet_address = wallets.wallet_address
+LEFT JOIN wallet_summaries AS archived ON archived.wallet_address = wallets.wallet_address
+LEFT JOIN openonramps AS onramps ON onramps.wallet_address = wallets.wallet_address
+ON CONFLICT (wallet_address) DO UPDATE SET
+    registrations = excluded.registrations,
+    registration_status = excluded.registration_status,
+    pending_count = excluded.pending_count,
+    pending_offramps = excluded.pending_offramps,
+    open_onramp = excluded.open_onramp,
+    updated_at = now()
+RETURNING wallet_address
+"""
+
+## openonramps
+BULK_DELETE_ONRAMPS_BY_HASH = """
+DELETE FROM openonramps WHERE transaction_hash = ANY($1::TEXT[]) RETURNING id, wallet_address
+"""
+
+INSERT_ONRAMP = """
+INSERT INTO openonramps (wallet_address, transaction_hash) VALUES ($1, $2)
+RETURNING id, wallet_address, added_at
+"""
+
+UPDATE_ONRAMP_HASH = """
+UPDATE openonramps SET transaction_hash = $1 WHERE wallet_address = $2
+"""
+
+SELECT_ONRAMP_WALLETS = """
+SELECT id, wallet_address FROM openonramps ORDER BY id
+"""
+
+SELECT_ONRAMP_WALLETS_PAGE = """
+SELECT id, wallet_address FROM openonramps WHERE id > $1 ORDER BY id LIMIT $2
+"""
+
+DELETE_ONRAMP_BY_WALLET = """
+DELETE FROM openonramps WHERE wallet_address = $1 RETURNING id, wallet_address
+"""
+
+# Whole order book in queue order, loaded once into the in-memory matchmaking queue
+SELECT_ONRAMPS_BY_AGE = """
+SELECT id, wallet_address, added_at FROM openonramps ORDER BY added_at, id
+"""
+
+# Confirms a match picked from the in-memory queue is still open
+SELECT_ONRAMP_BY_WALLET = """
+SELECT wallet_address, transaction_hash, added_at FROM openonramps WHERE wallet_address = $1
+"""
+
+# Longest-queuing open onramp outside the excluded addresses, used until the queue is loaded
+SELECT_OLDEST_ONRAMP_EXCLUDING = """
+SELECT wallet_address, transaction_hash, added_at FROM openonramps
+WHERE wallet_address <> ALL($1::TEXT[])
+ORDER BY added_at, id LIMIT 1
+"""
+
+## ingestion_cursors
+SELECT_INGESTION_CURSOR = """
+SELECT block_number FROM ingestion_cursors WHERE name = $1
+"""
+
+UPSERT_INGESTION_CURSOR = """
+INSERT INTO ingestion_cursors (name, block_number) VALUES ($1, $2)
+ON CONFLICT (name) DO UPDATE SET block_number = excluded.block_number, updated_at = now()
+"""
+
+## status_outbox
+# Leases up to $3 due outbox entries to worker $1 for $2 seconds, counting the attempt
+CLAIM_STATUS_OUTBOX = """
+UPDATE status_outbox SET lease_owner = $1, lease_expires_at = now() + $2 * INTERVAL '1 second', attempts = attempts + 1
+WHERE id IN (
+    SELECT id FROM status_outbox
+    WHERE next_attempt_at <= now() AND (lease_expires_at IS NULL OR lease_expires_at < now())
+    ORDER BY next_attempt_at, id
+    LIMIT $3
+)
+RETURNING id, wallet_address, transaction_hash, transaction_type, transaction_status, attempts
+"""
+
+# Acknowledges processed entries; entries whose lease was taken over stay for the new owner
+DELETE_STATUS_OUTBOX = """
+DELETE FROM status_outbox WHERE id = ANY($1::INT8[]) AND lease_owner = $2
+"""
+
+# Releases entries whose side effects failed, to be retried after $2 seconds
+RETRY_STATUS_OUTBOX = """
+UPDATE status_outbox
+SET lease_owner = NULL, lease_expires_at = NULL, next_attempt_at = now() + $2 * INTERVAL '1 second', last_error = $3
+WHERE id = ANY($1::INT8[]) AND lease_owner = $4
+"""
+
+# Outbox size, counted up to $1 entries so the check stays cheap when it is far behind
+SELECT_STATUS_OUTBOX_BACKLOG = """
+SELECT count(*) FROM (SELECT 1 FROM status_outbox LIMIT $1) AS backlog
+"""
+
+## schema_migrations
+SELECT_SCHEMA_VERSION = """
+SELECT COALESCE(MAX(version), 0) FROM schema_migrations
+"""
+
+## leader_leases
+# Takes lease $1 for holder $2 for $3 seconds if it is free, expired or already held by $2,
+# which also makes it the heartbeat. Returns no row while another holder keeps it alive.
+ACQUIRE_LEADER_LEASE = """
+INSERT INTO leader_leases AS lease (name, holder, expires_at)
+VALUES ($1, $2, now() + $3 * INTERVAL '1 second')
+ON CONFLICT (name) DO UPDATE SET
+    holder = excluded.holder,
+    expires_at = excluded.expires_at,
+    acquired_at = CASE WHEN lease.holder = excluded.holder THEN lease.acquired_at ELSE now() END,
+    renewed_at = now()
+WHERE lease.holder = excluded.holder OR lease.expires_at < now()
+RETURNING holder, acquired_at
+"""
+
+# Expires the lease right away so a standby takes over on its next attempt
+RELEASE_LEADER_LEASE = """
+UPDATE leader_leases SET expires_at = now() WHERE name = $1 AND holder = $2
+"""
+
+SELECT_LEADER_LEASE = """
+SELECT name, holder, expires_at, acquired_at, renewed_at, expires_at > now() AS active
+FROM leader_leases WHERE name = $1
+"""
+
+## orchestrator_calls
+# Calls already indexed by an earlier, interrupted run are skipped
+BULK_INSERT_ORCHESTRATOR_CALLS = """
+INSERT INTO orchestrator_calls (transaction_hash, block_number, from_address, function_name, args, succeeded)
+SELECT transaction_hash, block_number, from_address, function_name, args::JSONB, succeeded
+FROM unnest($1::TEXT[], $2::INT8[], $3::TEXT[], $4::TEXT[], $5::TEXT[], $6::BOOL[])
+    AS calls (transaction_hash, block_number, from_address, function_name, args, succeeded)
+ON CONFLICT (transaction_hash) DO NOTHING
+"""
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+
+import database
+import instrumentation
+import outbox
+import queries
+import wallet_state
+from polling_policy import polling_policy
+from status_refresh import status_fetcher
+from sync_transaction_statuses import map_zksync_status
+
+# Seconds between two reconciler ticks
+TICK_INTERVAL = float(os.getenv("RECONCILER_TICK_INTERVAL", "5"))
+# Seconds a single tick may spend claiming and checking batches before yielding
+TICK_BUDGET = float(os.getenv("RECONCILER_TICK_BUDGET", "4"))
+# Transactions claimed and checked together in one batch
+BATCH_SIZE = int(os.getenv("RECONCILER_BATCH_SIZE", "200"))
+# Seconds a claimed batch stays leased; an expired lease lets another worker take it over
+LEASE_SECONDS = float(os.getenv("RECONCILER_LEASE_SECONDS", "60"))
+# Number of status changes written per transaction
+SWEEP_CHUNK_SIZE = int(os.getenv("SWEEP_CHUNK_SIZE", "500"))
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def _apply_status_chunk(conn, changes):
+    """Writes one chunk of status changes, queueing their side effects in status_outbox.
+
+    wallet_state is updated in the same transaction.
+
+    Returns:
+        Record[]: updated transaction rows
+    """
+    updated = await conn.fetch(
+        queries.BULK_UPDATE_TRANSACTION_STATUSES,
+        [tx_id for tx_id, _ in changes],
+        [new_status for _, new_status in changes],
+    )
+    await wallet_state.record_settled(conn, updated)
+    return updated
+
+
+@instrumentation.timed("apply_status_updates")
+async def apply_status_updates(pending_transactions, new_statuses):
+    """Persists changed statuses with set-based statements, SWEEP_CHUNK_SIZE rows per transaction.
+
+    Each chunk commits on its own, so one failing chunk does not roll back the rest of the sweep.
+    Removing succeeded onramps, cache invalidation and events are left to the outbox consumer.
+
+    Args:
+        pending_transactions (Record[]): rows with id, transaction_hash and transaction_type
+        new_statuses (dict): Key=transaction_hash; value=transaction_status
+
+    Returns:
+        dict: counts of updated transactions and changes that failed to apply
+    """
+    changes = [
+        (tx["id"], new_statuses[tx["transaction_hash"]])
+        for tx in pending_transactions
+        if new_statuses.get(tx["transaction_hash"], "pending") != "pending"
+    ]
+
+    updated_count = 0
+    failed_count = 0
+    async with database.get_db_connection() as conn:
+        for i in range(0, len(changes), SWEEP_CHUNK_SIZE):
+            chunk = changes[i : i + SWEEP_CHUNK_SIZE]
+            try:
+                updated = await database.run_in_transaction(
+                    conn, _apply_status_chunk, chunk
+                )
+                updated_count += len(updated)
+            except Exception as e:
+                failed_count += len(chunk)
+                logging.error(f"Failed to apply {len(chunk)} status changes: {e}")
+    if updated_count:
+        outbox.notify()
+
+    return {"updated": updated_count, "failed": failed_count}
+
+
+async def _claim(conn, limit, unincluded_older_than):
+    if unincluded_older_than is not None:
+        return await conn.fetch(
+            queries.CLAIM_DUE_UNINCLUDED_TRANSACTIONS,
+            WORKER_ID,
+            LEASE_SECONDS,
+            limit,
+            unincluded_older_than,
+        )
+    return await conn.fetch(
+        queries.CLAIM_DUE_TRANSACTIONS, WORKER_ID, LEASE_SECONDS, limit
+    )
+
+
+async def claim_due_transactions(limit, unincluded_older_than=None):
+    """Leases up to limit pending transactions whose next check is due to this worker.
+
+    Args:
+        limit (int): maximum number of transactions
+        unincluded_older_than (float): only claim transactions older than this many seconds
+            that no ingested block contained
+    """
+    async with database.get_db_connection() as conn:
+        return await database.run_in_transaction(
+            conn, _claim, limit, unincluded_older_than
+        )
+
+
+def schedule_checks(pending_transactions, rpc_statuses, now=None):
+    """Asks polling_policy when each checked but still pending transaction is due again.
+
+    Args:
+        pending_transactions (Record[]): claimed rows the node did not settle
+        rpc_statuses (dict): Key=transaction_hash; value=rpc_status, unanswered hashes left out
+        now (datetime): reference time, defaults to the current time
+
+    Returns:
+        tuple: (id, rpc status, attempts, delay) schedules and the transactions that are
+            past their deadline
+    """
+    now = now or datetime.now(timezone.utc)
+    schedules = []
+    expired = []
+    for tx in pending_transactions:
+        status, attempts, delay = polling_policy.next_check(
+            tx["last_rpc_status"],
+            tx["attempts"],
+            rpc_statuses.get(tx["transaction_hash"]),
+            (now - tx["created_at"]).total_seconds(),
+        )
+        if delay is None:
+            expired.append(tx)
+        else:
+            schedules.append((tx["id"], status, attempts, delay))
+    return schedules, expired
+
+
+async def reschedule_transactions(schedules):
+    """Releases the lease on still-pending transactions and schedules their next check."""
+    if not schedules:
+        return
+    async with database.get_db_connection() as conn:
+        await conn.execute(
+            queries.RESCHEDULE_TRANSACTIONS,
+            [tx_id for tx_id, _, _, _ in schedules],
+            [delay for _, _, _, delay in schedules],
+            [attempts for _, _, attempts, _ in schedules],
+            [status for _, status, _, _ in schedules],
+            WORKER_ID,
+        )
+
+
+async def reconcile_batch(limit=BATCH_SIZE, unincluded_older_than=None):
+    """Claims one batch of due transactions, checks them on chain and stores the results.
+
+    Transactions the node still reports as pending, included or unknown are rescheduled
+    by polling_policy, or failed once they are past its deadline for that state.
+
+    Args:
+        limit (int): maximum number of transactions
+        unincluded_older_than (float): see claim_due_transactions
+
+    Returns:
+        dict: number of claimed and expired transactions plus the counts from
+            apply_status_updates
+    """
+    claimed = await claim_due_transactions(limit, unincluded_older_than)
+    if not claimed:
+        return {"claimed": 0, "expired": 0, "updated": 0, "failed": 0}
+
+    # Shares recent lookups with on-demand refreshes instead of asking the node again
+    rpc_statuses = await status_fetcher.fetch_rpc_statuses(
+        [tx["transaction_hash"] for tx in claimed]
+    )
+    new_statuses = {
+        tx_hash: map_zksync_status(status) for tx_hash, status in rpc_statuses.items()
+    }
+    schedules, expired = schedule_checks(
+        [
+            tx
+            for tx in claimed
+            if new_statuses.get(tx["transaction_hash"], "pending") == "pending"
+        ],
+        rpc_statuses,
+    )
+    for tx in expired:
+        new_statuses[tx["transaction_hash"]] = "failed"
+        instrumentation.TRANSACTIONS_EXPIRED.labels(
+            rpc_statuses[tx["transaction_hash"]]
+        ).inc()
+    if expired:
+        logging.warning(f"Failed {len(expired)} transactions past their deadline")
+    result = await apply_status_updates(claimed, new_statuses)
+
+    # Changes that failed to apply keep their lease until it expires and are retried
+    # after that
+    await reschedule_transactions(schedules)
+    return {"claimed": len(claimed), "expired": len(expired), **result}
+
+
+async def collect_backlog():
+    """Counts pending transactions, the due ones and how many fall into each age bucket.
+
+    Returns:
+        dict: pending, due and younger_than_<seconds> counts for the backlog gauges
+    """
+    async with database.get_db_connection() as conn:
+        return dict(await conn.fetchrow(queries.SELECT_PENDING_BACKLOG))
+
+
+@instrumentation.timed("reconciler_tick")
+async def run_tick(budget=TICK_BUDGET):
+    """Reconciles due transactions batch by batch until none are due or the budget is spent.
+
+    Skipped while the outbox holds OUTBOX_MAX_BACKLOG entries, so status changes are not
+    written faster than their side effects are applied.
+
+    Returns:
+        dict: totals over all batches of this tick
+    """
+    totals = {"claimed": 0, "expired": 0, "updated": 0, "failed": 0}
+    if await outbox.backlog() >= outbox.OUTBOX_MAX_BACKLOG:
+        logging.warning("Status outbox is full, skipping this reconciler tick")
+        return totals
+    deadline = time.monotonic() + budget
+    while time.monotonic() < deadline:
+        result = await reconcile_batch()
+        for key in totals:
+            totals[key] += result[key]
+        if result["claimed"] < BATCH_SIZE:
+            break
+    return totals
+
+
+async def run_forever():
+    """Background task replacing the old 10 minute full sweep, one per worker process."""
+    logging.info(f"Starting transaction status reconciler {WORKER_ID}")
+    instrumentation.current_operation.set("reconciler")
+    while True:
+        try:
+            totals = await run_tick()
+            if totals["claimed"]:
+                logging.info(
+                    f"Reconciled {totals['claimed']} transactions, updated {totals['updated']}"
+                )
+        except Exception as e:
+            # Keep the reconciler alive through transient database or RPC failures
+            logging.error(f"Transaction status reconciler tick failed: {e}")
+        await asyncio.sleep(TICK_INTERVAL)
@@ -0,0 +1,13 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, for handlers that build their response by hand.
+
+    Routes with a response model do not need it: FastAPI already serializes those with
+    pydantic's compiled encoder.
+    """
+
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
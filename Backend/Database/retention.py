@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+
+import database
+import instrumentation
+import queries
+
+# Settled transactions younger than this many days stay in transactions; 0 disables retention
+RETENTION_AGE_DAYS = float(os.getenv("RETENTION_AGE_DAYS", "30"))
+# Transactions archived per batch
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+# Seconds between two batches, leaving room for the writers on the same table
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", "0.1"))
+# Seconds between two retention passes
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+
+
+async def _archive(conn, age_seconds, limit):
+    return await conn.fetchrow(queries.ARCHIVE_SETTLED_TRANSACTIONS, age_seconds, limit)
+
+
+async def archive_batch(age_days=RETENTION_AGE_DAYS, limit=RETENTION_BATCH_SIZE):
+    """Archives up to limit settled transactions older than age_days.
+
+    The rows move to transactions_archive and their registration state and per-type counts
+    are folded into wallet_summaries, in one short transaction so writers on the pending
+    rows are not held up.
+
+    Returns:
+        int: number of transactions moved to the archive
+    """
+    async with database.get_db_connection() as conn:
+        result = await database.run_in_transaction(
+            conn, _archive, age_days * 24 * 60 * 60, limit
+        )
+    return result["archived"]
+
+
+@instrumentation.timed("retention_pass")
+async def run_pass(age_days=RETENTION_AGE_DAYS):
+    """Archives batch after batch until no settled transaction is older than age_days.
+
+    Returns:
+        int: number of transactions archived in this pass
+    """
+    total = 0
+    while True:
+        archived = await archive_batch(age_days)
+        total += archived
+        if archived < RETENTION_BATCH_SIZE:
+            return total
+        await asyncio.sleep(RETENTION_BATCH_PAUSE)
+
+
+async def run_forever():
+    """Background task archiving settled transactions every RETENTION_INTERVAL seconds."""
+    logging.info(
+        f"Starting retention of settled transactions older than {RETENTION_AGE_DAYS} days"
+    )
+    instrumentation.current_operation.set("retention")
+    while True:
+        try:
+            archived = await run_pass()
+            if archived:
+                logging.info(f"Archived {archived} settled transactions")
+        except Exception as e:
+            # Retention is housekeeping, a failed pass is simply retried next interval
+            logging.error(f"Retention pass failed: {e}")
+        await asyncio.sleep(RETENTION_INTERVAL)
+
+
+async def main():
+    """Archives until caught up, for a manual run: python -m retention"""
+    try:
+        archived = await run_pass()
+        print(f"Archived {archived} settled transactions")
+    finally:
+        await database.db_pool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+import instrumentation
+
+# Comma-separated JSON-RPC endpoints, like the urls list of an eth_source in shovel's
+# config.json; ZKSYNC_RPC_URL still works for a single endpoint
+ZKSYNC_RPC_URLS = [
+    url.strip()
+    for url in os.getenv(
+        "ZKSYNC_RPC_URLS", os.getenv("ZKSYNC_RPC_URL", "https://sepolia.era.zksync.dev")
+    ).split(",")
+    if url.strip()
+]
+# Seconds before a single POST to one endpoint is abandoned
+RPC_TIMEOUT = float(os.getenv("ZKSYNC_RPC_TIMEOUT", "10"))
+# Maximum number of POSTs in flight at the same time, shared by all endpoints
+RPC_CONCURRENCY = int(os.getenv("ZKSYNC_RPC_CONCURRENCY", "4"))
+# A request still unanswered after this latency percentile of its endpoint is also sent to
+# the next endpoint, and whichever answers first wins
+RPC_HEDGE_PERCENTILE = float(os.getenv("ZKSYNC_RPC_HEDGE_PERCENTILE", "0.95"))
+# Hedge delay while an endpoint has too few samples for a percentile, and its lower bound
+RPC_HEDGE_DEFAULT_DELAY = float(os.getenv("ZKSYNC_RPC_HEDGE_DEFAULT_DELAY", "1"))
+RPC_HEDGE_MIN_DELAY = float(os.getenv("ZKSYNC_RPC_HEDGE_MIN_DELAY", "0.05"))
+# Consecutive failures that open an endpoint's circuit, and seconds until it is probed again
+RPC_BREAKER_FAILURES = int(os.getenv("ZKSYNC_RPC_BREAKER_FAILURES", "5"))
+RPC_BREAKER_COOLDOWN = float(os.getenv("ZKSYNC_RPC_BREAKER_COOLDOWN", "30"))
+# Weight of the newest sample in the latency and error rate averages
+RPC_EWMA_ALPHA = float(os.getenv("ZKSYNC_RPC_EWMA_ALPHA", "0.3"))
+
+# Latency samples kept per endpoint for the hedge percentile
+LATENCY_WINDOW = 100
+MIN_PERCENTILE_SAMPLES = 10
+
+
+class RpcError(Exception):
+    """Raised when a JSON-RPC request could not be completed."""
+
+
+class Endpoint:
+    """One JSON-RPC URL with its latency and error averages and circuit breaker state."""
+
+    def __init__(self, url):
+        self.url = url
+        self.ewma_latency = None
+        self.ewma_error_rate = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.opened_until = None
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def state(self):
+        if self.opened_until is None:
+            return "closed"
+        return "open" if time.monotonic() < self.opened_until else "half_open"
+
+    def available(self):
+        state = self.state
+        # A half-open circuit lets one probe through at a time
+        return state == "closed" or (state == "half_open" and not self.probing)
+
+    def score(self):
+        """Expected seconds a request costs, counting a failure as a full timeout.
+
+        Unmeasured endpoints score 0, so every endpoint gets tried early on.
+        """
+        return (self.ewma_latency or 0.0) + self.ewma_error_rate * RPC_TIMEOUT
+
+    def hedge_delay(self):
+        if len(self.latencies) < MIN_PERCENTILE_SAMPLES:
+            return RPC_HEDGE_DEFAULT_DELAY
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * RPC_HEDGE_PERCENTILE))
+        return max(RPC_HEDGE_MIN_DELAY, ordered[index])
+
+    def _update_latency(self, latency):
+        self.ewma_latency = (
+            latency
+            if self.ewma_latency is None
+            else RPC_EWMA_ALPHA * latency + (1 - RPC_EWMA_ALPHA) * self.ewma_latency
+        )
+
+    def record_latency_floor(self, elapsed):
+        # Keeps a slow endpoint that always loses hedge races from looking unmeasured
+        if self.ewma_latency is None or elapsed > self.ewma_latency:
+            self._update_latency(elapsed)
+
+    def record_success(self, latency):
+        self.requests += 1
+        self.latencies.append(latency)
+        self._update_latency(latency)
+        self.ewma_error_rate *= 1 - RPC_EWMA_ALPHA
+        self.consecutive_failures = 0
+        self.opened_until = None
+        self.probing = False
+
+    def record_failure(self):
+        self.requests += 1
+        self.failures += 1
+        self.ewma_error_rate = (
+            RPC_EWMA_ALPHA + (1 - RPC_EWMA_ALPHA) * self.ewma_error_rate
+        )
+        self.consecutive_failures += 1
+        if self.probing or self.consecutive_failures >= RPC_BREAKER_FAILURES:
+            if self.state == "closed":
+                logging.warning(f"Opening RPC circuit for {self.url}")
+            self.opened_until = time.monotonic() + RPC_BREAKER_COOLDOWN
+        self.probing = False
+
+    def metrics(self):
+        return {
+            "url": self.url,
+            "state": self.state,
+            "ewma_latency_ms": (
+                self.ewma_latency * 1000 if self.ewma_latency is not None else None
+            ),
+            "ewma_error_rate": self.ewma_error_rate,
+            "hedge_delay_ms": self.hedge_delay() * 1000,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class RpcClient:
+    """JSON-RPC client spreading requests over several endpoints.
+
+    Each request goes to the fastest available endpoint. If it has not answered within that
+    endpoint's RPC_HEDGE_PERCENTILE latency, the request is sent to the runner-up as well;
+    an endpoint failing outright is replaced by the next one right away. Endpoints failing
+    RPC_BREAKER_FAILURES times in a row are skipped for RPC_BREAKER_COOLDOWN seconds.
+    """
+
+    def __init__(self, urls, timeout=RPC_TIMEOUT):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.timeout = timeout
+        self._session = None
+        self._hedged = 0
+        self._hedges_won = 0
+        self._failovers = 0
+
+    def get_session(self):
+        """Returns the shared keep-alive HTTP session, creating it on first use inside the running loop."""
+        if self._session is None or self._session.closed:
+            # Imported on first use to keep aiohttp out of the API start-up time
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                # Room for a hedged duplicate of every request in flight
+                connector=aiohttp.TCPConnector(
+                    limit=2 * RPC_CONCURRENCY, keepalive_timeout=60
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def ranked_endpoints(self):
+        """Available endpoints, fastest first."""
+        return sorted(
+            (endpoint for endpoint in self.endpoints if endpoint.available()),
+            key=Endpoint.score,
+        )
+
+    async def _send(self, endpoint, payload):
+        import aiohttp
+
+        probe = endpoint.state == "half_open"
+        if probe:
+            endpoint.probing = True
+        start = time.monotonic()
+        try:
+            async with self.get_session().post(
+                endpoint.url,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not a failure, but the endpoint took at least this long
+            endpoint.record_latency_floor(time.monotonic() - start)
+            if probe:
+                endpoint.probing = False
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            endpoint.record_failure()
+            instrumentation.RPC_ENDPOINT_DURATION.labels(endpoint.url, "error").observe(
+                time.monotonic() - start
+            )
+            raise RpcError(f"{endpoint.url}: {e or type(e).__name__}") from e
+        latency = time.monotonic() - start
+        endpoint.record_success(latency)
+        instrumentation.RPC_ENDPOINT_DURATION.labels(endpoint.url, "ok").observe(
+            latency
+        )
+        return data
+
+    async def post(self, payload):
+        """POSTs a JSON-RPC request or batch and returns the decoded response body.
+
+        Raises:
+            RpcError: every available endpoint failed, or none is available
+        """
+        candidates = self.ranked_endpoints()
+        if not candidates:
+            raise RpcError("No RPC endpoint available, all circuits are open")
+
+        in_flight = {}
+        errors = []
+        next_candidate = 0
+        hedge = None
+
+        def launch():
+            nonlocal next_candidate
+            endpoint = candidates[next_candidate]
+            next_candidate += 1
+            in_flight[asyncio.ensure_future(self._send(endpoint, payload))] = endpoint
+            return endpoint
+
+        primary = launch()
+        try:
+            while in_flight:
+                can_hedge = hedge is None and next_candidate < len(candidates)
+                done, _ = await asyncio.wait(
+                    in_flight,
+                    timeout=primary.hedge_delay() if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    self._hedged += 1
+                    hedge = launch()
+                    continue
+                for task in done:
+                    endpoint = in_flight.pop(task)
+                    if task.exception() is None:
+                        if endpoint is hedge:
+                            self._hedges_won += 1
+                        return task.result()
+                    errors.append(str(task.exception()))
+                if not in_flight and next_candidate < len(candidates):
+                    self._failovers += 1
+                    primary = launch()
+            raise RpcError(f"All RPC endpoints failed: {'; '.join(errors)}")
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    def metrics(self):
+        """Per-endpoint latency, error rate and circuit state plus hedging counters.
+
+        Returns:
+            dict: endpoints ordered as configured, hedged requests, hedges that answered
+                first and failovers after an endpoint error
+        """
+        return {
+            "endpoints": [endpoint.metrics() for endpoint in self.endpoints],
+            "hedged_requests": self._hedged,
+            "hedges_won": self._hedges_won,
+            "failovers": self._failovers,
+        }
+
+
+rpc_client = RpcClient(ZKSYNC_RPC_URLS)
@@ -1,4 +1,12 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, field_validator
+
+
+def _lowercase_hash(value):
+    # Hashes are compared with the lower-case hashes of fetched blocks and receipts
+    return value.lower()
 
 
 ## base model for transaction databse
@@ -8,8 +16,132 @@ class TransactionBase(BaseModel):
     transaction_type: str
     transaction_status: str
 
+    normalize_hash = field_validator("transaction_hash")(_lowercase_hash)
+
 
 ## base model for an incoming onramp request
 class OnrampBase(BaseModel):
     wallet_address: str
     transaction_hash: str
+
+    normalize_hash = field_validator("transaction_hash")(_lowercase_hash)
+
+
+## response models, so FastAPI serializes responses straight to JSON bytes via pydantic
+class MessageResponse(BaseModel):
+    message: str
+
+
+class RegistrationStatusResponse(BaseModel):
+    registration_status: Literal["pending", "registered", "not_registered"]
+
+
+class PendingTransaction(BaseModel):
+    id: int
+    wallet_address: str
+    transaction_hash: str
+    transaction_type: str
+    transaction_status: str
+    created_at: datetime
+
+
+class PendingTransactionsPage(BaseModel):
+    pending_transactions: List[PendingTransaction]
+    next_cursor: Optional[str] = None
+
+
+class WalletAddressesPage(BaseModel):
+    wallet_addresses: List[str]
+    next_cursor: Optional[str] = None
+
+
+class DbPoolMetrics(BaseModel):
+    min_size: int
+    max_size: int
+    in_use: int
+    idle: int
+    acquired_total: int
+    timeouts_total: int
+    wait_time_avg_ms: float
+    wait_time_max_ms: float
+
+
+class LivenessResponse(BaseModel):
+    status: Literal["ok"]
+    db_pool: DbPoolMetrics
+
+
+class ReadinessResponse(BaseModel):
+    status: Literal["ready"]
+    schema_version: int
+
+
+class CacheNamespaceMetrics(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class CacheMetrics(BaseModel):
+    backend: str
+    entries: Optional[int] = None
+    ttl: float
+    namespaces: Dict[str, CacheNamespaceMetrics]
+
+
+class BulkTransactionResult(BaseModel):
+    index: int
+    status: Literal["created", "duplicate", "invalid", "failed"]
+    transaction_hash: Optional[str] = None
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkTransactionsResponse(BaseModel):
+    created: int
+    duplicate: int
+    invalid: int
+    failed: int
+    results: List[BulkTransactionResult]
+
+
+class OnrampMatch(BaseModel):
+    wallet_address: str
+    transaction_hash: str
+    added_at: datetime
+
+
+class EventMetrics(BaseModel):
+    broker: Optional[str] = None
+    wallets: int
+    subscribers: int
+    published_total: int
+    dropped_total: int
+
+
+class StatusRefreshMetrics(BaseModel):
+    cache_entries: int
+    hashes_requested: int
+    hashes_fetched: int
+    cache_hits: int
+    coalesced_hashes: int
+    coalesced_refreshes: int
+    rate_limited_refreshes: int
+    rpc_lookups_saved: int
+
+
+class RpcEndpointMetrics(BaseModel):
+    url: str
+    state: Literal["closed", "open", "half_open"]
+    ewma_latency_ms: Optional[float] = None
+    ewma_error_rate: float
+    hedge_delay_ms: float
+    requests: int
+    failures: int
+
+
+class RpcMetrics(BaseModel):
+    endpoints: List[RpcEndpointMetrics]
+    hedged_requests: int
+    hedges_won: int
+    failovers: int
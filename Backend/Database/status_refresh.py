@@ -0,0 +1,211 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from sync_transaction_statuses import fetch_zksync_rpc_statuses, map_zksync_status
+
+# Seconds a status fetched from the chain is reused for the same hash, by refreshes and the
+# background sweep alike
+STATUS_CACHE_TTL = float(os.getenv("STATUS_CACHE_TTL", "5"))
+STATUS_CACHE_MAX_ENTRIES = int(os.getenv("STATUS_CACHE_MAX_ENTRIES", "100000"))
+# On-demand refreshes per wallet: tokens regained per second and bucket size
+REFRESH_RATE = float(os.getenv("REFRESH_RATE", "0.2"))
+REFRESH_BURST = float(os.getenv("REFRESH_BURST", "3"))
+# Wallets whose bucket is remembered; the least recently seen ones start over with a full bucket
+REFRESH_MAX_WALLETS = int(os.getenv("REFRESH_MAX_WALLETS", "100000"))
+
+
+class RateLimitedError(Exception):
+    """Raised when a wallet asks for refreshes faster than its token bucket allows."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many status refreshes, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets holding up to burst tokens, refilled at rate tokens per second."""
+
+    def __init__(self, rate, burst, max_keys):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def acquire(self, key):
+        """Takes one token for key.
+
+        Raises:
+            RateLimitedError: the bucket is empty, with the seconds until the next token
+        """
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            raise RateLimitedError((1 - tokens) / self.rate)
+        self._buckets[key] = (tokens - 1, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._calls = {}
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    async def do(self, key, func):
+        """Returns the result of func(), joining the call already running for key if any.
+
+        The shared call runs as its own task, so a caller going away does not cancel it
+        for the others.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class StatusFetcher:
+    """Chain status lookups with a short per-hash cache and per-hash in-flight coalescing."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # hash -> (expires_at, rpc status), in expiry order
+        self._in_flight = {}  # hash -> task fetching it
+        self.refreshes = SingleFlight()
+        self.limiter = TokenBucketLimiter(
+            REFRESH_RATE, REFRESH_BURST, REFRESH_MAX_WALLETS
+        )
+
+        self._requested = 0
+        self._fetched = 0
+        self._cache_hits = 0
+        self._coalesced_hashes = 0
+        self._coalesced_refreshes = 0
+        self._rate_limited = 0
+
+    def _store(self, statuses):
+        expires_at = time.monotonic() + self.ttl
+        for tx_hash, status in statuses.items():
+            self._cache.pop(tx_hash, None)
+            self._cache[tx_hash] = (expires_at, status)
+        # Every entry lives for the same TTL, so the oldest insertions expire first
+        now = time.monotonic()
+        while self._cache and (
+            len(self._cache) > self.max_entries
+            or next(iter(self._cache.values()))[0] < now
+        ):
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, transaction_hashes):
+        self._fetched += len(transaction_hashes)
+        statuses = await fetch_zksync_rpc_statuses(transaction_hashes)
+        self._store(statuses)
+        return statuses
+
+    async def fetch_statuses(self, transaction_hashes):
+        """Drop-in for fetch_newest_zksync_transaction_status that avoids repeated RPCs.
+
+        Returns:
+            dict: Key=transaction_hash; value=transaction_status, hashes the node did not
+                answer are left out
+        """
+        statuses = await self.fetch_rpc_statuses(transaction_hashes)
+        return {
+            tx_hash: map_zksync_status(status) for tx_hash, status in statuses.items()
+        }
+
+    async def fetch_rpc_statuses(self, transaction_hashes):
+        """Drop-in for fetch_zksync_rpc_statuses that avoids repeated RPCs.
+
+        Hashes with a fresh cached status are answered from the cache, hashes already being
+        fetched by another caller wait for that fetch, and only the rest go to the node.
+
+        Returns:
+            dict: Key=transaction_hash; value=rpc_status, hashes the node did not answer
+                are left out
+        """
+        statuses = {}
+        waiting = {}
+        misses = []
+        now = time.monotonic()
+        for tx_hash in dict.fromkeys(transaction_hashes):
+            self._requested += 1
+            cached = self._cache.get(tx_hash)
+            if cached is not None and cached[0] >= now:
+                self._cache_hits += 1
+                statuses[tx_hash] = cached[1]
+            elif tx_hash in self._in_flight:
+                self._coalesced_hashes += 1
+                waiting[tx_hash] = self._in_flight[tx_hash]
+            else:
+                misses.append(tx_hash)
+
+        if misses:
+            task = asyncio.ensure_future(self._fetch(misses))
+            for tx_hash in misses:
+                self._in_flight[tx_hash] = task
+                waiting[tx_hash] = task
+
+            def release(done, hashes=misses):
+                for tx_hash in hashes:
+                    if self._in_flight.get(tx_hash) is done:
+                        del self._in_flight[tx_hash]
+
+            task.add_done_callback(release)
+
+        for task in set(waiting.values()):
+            fetched = await asyncio.shield(task)
+            for tx_hash, fetched_task in waiting.items():
+                if fetched_task is task and tx_hash in fetched:
+                    statuses[tx_hash] = fetched[tx_hash]
+        return statuses
+
+    async def refresh_wallet(self, wallet_address, refresh):
+        """Runs refresh() for an on-demand refresh of wallet_address.
+
+        A refresh already running for the wallet is joined for free; starting a new one
+        takes a token from the wallet's bucket.
+
+        Raises:
+            RateLimitedError: no refresh is running and the bucket is empty
+        """
+        if self.refreshes.in_flight(wallet_address):
+            self._coalesced_refreshes += 1
+        else:
+            try:
+                self.limiter.acquire(wallet_address)
+            except RateLimitedError:
+                self._rate_limited += 1
+                raise
+        return await self.refreshes.do(wallet_address, refresh)
+
+    def metrics(self):
+        """Counters of status lookups and how many of them never reached the node.
+
+        Returns:
+            dict: hashes requested and fetched, cache hits, coalesced hashes and refreshes,
+                rate-limited refreshes and the resulting RPC lookups saved
+        """
+        return {
+            "cache_entries": len(self._cache),
+            "hashes_requested": self._requested,
+            "hashes_fetched": self._fetched,
+            "cache_hits": self._cache_hits,
+            "coalesced_hashes": self._coalesced_hashes,
+            "coalesced_refreshes": self._coalesced_refreshes,
+            "rate_limited_refreshes": self._rate_limited,
+            "rpc_lookups_saved": self._requested - self._fetched,
+        }
+
+
+status_fetcher = StatusFetcher(STATUS_CACHE_TTL, STATUS_CACHE_MAX_ENTRIES)
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import signal
+
+# "embedded": every API worker competes for the sweeper lease and runs the background tasks
+# while it holds it; "external": API workers only serve requests, python -m sweeper runs them.
+# External mode requires EVENTS_REDIS_URL and CACHE_REDIS_URL on the API workers and the
+# sweeper: status events, cache invalidation and matchmaking queue removals are applied in
+# the sweeper process and only reach the API workers through those shared backends
+SWEEPER_MODE = os.getenv("SWEEPER_MODE", "embedded")
+# Row in leader_leases electing the single sweeper
+SWEEPER_LEASE_NAME = os.getenv("SWEEPER_LEASE_NAME", "sweeper")
+# "poll" checks every pending hash on a schedule, "blocks" follows the chain instead
+STATUS_INGESTION_MODE = os.getenv("STATUS_INGESTION_MODE", "poll")
+
+# Runtime modules are imported inside the functions, so python -m sweeper can set their
+# settings from its own options before they are read
+
+
+def missing_shared_backends():
+    """Returns the names of the shared backends external mode needs but are not set.
+
+    Read from the environment rather than from cache and events, which connect to a
+    configured Redis on import and fail there when the redis package is missing.
+    """
+    missing = [
+        name for name in ("EVENTS_REDIS_URL", "CACHE_REDIS_URL") if not os.getenv(name)
+    ]
+    if importlib.util.find_spec("redis") is None:
+        missing.append("the redis package")
+    return missing
+
+
+def background_tasks():
+    """Returns the coroutine functions the elected sweeper runs."""
+    import block_ingestor
+    import outbox
+    import reconciler
+    import retention
+
+    if STATUS_INGESTION_MODE == "blocks":
+        tasks = [block_ingestor.run_forever]
+    else:
+        tasks = [reconciler.run_forever]
+    # Side effects of the status changes written by either mode
+    tasks.append(outbox.run_forever)
+    if retention.RETENTION_AGE_DAYS > 0:
+        tasks.append(retention.run_forever)
+    return tasks
+
+
+async def run_forever():
+    """Competes for the sweeper lease and runs the background tasks while holding it."""
+    import leader
+
+    await leader.LeaderLease(SWEEPER_LEASE_NAME).run(background_tasks())
+
+
+async def main():
+    """Standalone sweeper for SWEEPER_MODE=external: python -m sweeper
+
+    Run one per deployment, or a few for fast failover; only the lease holder works.
+    """
+    parser = argparse.ArgumentParser(
+        description="Run the status sweeper under the leader lease"
+    )
+    parser.add_argument(
+        "--rpc-concurrency",
+        type=int,
+        default=os.getenv("SWEEPER_RPC_CONCURRENCY"),
+        help="JSON-RPC batches in flight, ZKSYNC_RPC_CONCURRENCY of this process",
+    )
+    parser.add_argument(
+        "--db-pool-size",
+        type=int,
+        default=os.getenv("SWEEPER_DB_POOL_SIZE"),
+        help="database connections, DB_POOL_MAX_SIZE of this process",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=os.getenv("SWEEPER_BATCH_SIZE"),
+        help="transactions claimed per reconciler batch, RECONCILER_BATCH_SIZE",
+    )
+    args = parser.parse_args()
+    for name, value in (
+        ("ZKSYNC_RPC_CONCURRENCY", args.rpc_concurrency),
+        ("DB_POOL_MAX_SIZE", args.db_pool_size),
+        ("RECONCILER_BATCH_SIZE", args.batch_size),
+    ):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    missing = missing_shared_backends()
+    if missing:
+        logging.error(
+            f"Refusing to start the external sweeper without {', '.join(missing)}: "
+            "its status side effects would never reach the API workers"
+        )
+        raise SystemExit(1)
+
+    import database
+    from sync_transaction_statuses import close_session
+
+    # Cancelling releases the lease, so a standby takes over without waiting for its expiry
+    sweep = asyncio.create_task(run_forever())
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, sweep.cancel)
+    try:
+        await sweep
+    except asyncio.CancelledError:
+        logging.info("Sweeper stopped")
+    finally:
+        await close_session()
+        await database.db_pool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,52 +1,207 @@
 # https://docs.zksync.io/build/api.html#zks-gettransactiondetails
 
-import requests
 import asyncio
+import logging
+import os
+import time
 
+import instrumentation
+from rpc_client import RPC_CONCURRENCY, RpcError, rpc_client
 
-async def fetch_newest_zksync_transaction_status(transaction_ids):
-    """Retrieves all current transaction statuses from blockchain for the given array of transaction_ids
+# Endpoints are configured in rpc_client through ZKSYNC_RPC_URLS
+# url mainnet: https://mainnet.era.zksync.io
+# Number of zks_getTransactionDetails calls packed into one JSON-RPC batch POST
+RPC_BATCH_SIZE = int(os.getenv("ZKSYNC_RPC_BATCH_SIZE", "50"))
+RPC_RETRIES = int(os.getenv("ZKSYNC_RPC_RETRIES", "3"))
+RPC_BACKOFF = float(os.getenv("ZKSYNC_RPC_BACKOFF", "0.5"))
+
+
+async def close_session():
+    await rpc_client.close()
+
+
+def rpc_status(details):
+    """Returns the lower-cased status of a zks_getTransactionDetails result.
 
     Args:
-        transaction_ids (string[]): string array with transaction_ids as elements
+        details (dict|None): result object of the RPC call, None if the node does not know the hash
 
     Returns:
-        dict: Key=transaction_id; value=transaction_status
+        str: e.g. "pending", "included", "verified" or "failed"; "unknown" for unknown hashes
     """
-    # url mainnet: https://mainnet.era.zksync.io
-    url = "https://sepolia.era.zksync.dev"
-    headers = {"Content-Type": "application/json"}
-    statuses = {}
+    return (details or {}).get("status", "Unknown").lower()
 
-    for tx_id in transaction_ids:
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "zks_getTransactionDetails",
-            "params": [tx_id],
-        }
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            status = data.get("result", {}).get("status", "Unknown").lower()
-            if status == "pending" or status == "included":
-                status = "pending"
-            elif status == "verified":
-                status = "success"
-            else:
-                status = "failed"
-            statuses[tx_id] = status
-        else:
+
+def map_zksync_status(status):
+    """Maps a status from rpc_status onto our transaction_status values.
+
+    Hashes the node does not know stay pending; polling_policy fails them once they are
+    unknown for longer than their deadline.
+
+    Returns:
+        str: "pending", "success" or "failed"
+    """
+    if status in ("pending", "included", "unknown"):
+        return "pending"
+    elif status == "verified":
+        return "success"
+    return "failed"
+
+
+async def rpc_batch(calls, semaphore=None):
+    """Sends several JSON-RPC calls in one batch POST, retrying with exponential backoff.
+
+    Args:
+        calls (list): (method, params) tuples
+        semaphore (asyncio.Semaphore): optional limit on concurrent POSTs
+
+    Raises:
+        RpcError: the node could not be reached or did not answer with a batch
+
+    Returns:
+        list: one result per call in the same order; calls the node answered with an
+            error (or not at all) hold an RpcError instance instead of a result
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": index, "method": method, "params": params}
+        for index, (method, params) in enumerate(calls)
+    ]
+    semaphore = semaphore or asyncio.Semaphore(RPC_CONCURRENCY)
+    methods = {method for method, _ in calls}
+    method_label = methods.pop() if len(methods) == 1 else "mixed"
+    start = time.perf_counter()
+
+    def record_transport_error():
+        instrumentation.RPC_CALLS.labels(method_label, "transport_error").inc(
+            len(calls)
+        )
+        instrumentation.RPC_BATCH_DURATION.labels(
+            method_label, "transport_error"
+        ).observe(time.perf_counter() - start)
+
+    for attempt in range(RPC_RETRIES + 1):
+        try:
+            async with semaphore:
+                # Picks the endpoint, hedges slow requests and fails over on errors
+                data = await rpc_client.post(payload)
+            break
+        except RpcError as e:
+            if attempt == RPC_RETRIES:
+                record_transport_error()
+                raise RpcError(f"Batch of {len(calls)} calls failed: {e}") from e
+            await asyncio.sleep(RPC_BACKOFF * 2**attempt)
+
+    # A node that does not support batching answers with a single error object
+    if not isinstance(data, list):
+        record_transport_error()
+        raise RpcError(f"Unexpected batch response: {data}")
+
+    results = [RpcError("No response for call")] * len(calls)
+    for item in data:
+        index = item.get("id")
+        if not isinstance(index, int) or index >= len(calls):
             continue
+        if "error" in item:
+            results[index] = RpcError(str(item["error"]))
+        else:
+            results[index] = item.get("result")
+
+    errors = sum(isinstance(result, RpcError) for result in results)
+    instrumentation.RPC_CALLS.labels(method_label, "ok").inc(len(calls) - errors)
+    if errors:
+        instrumentation.RPC_CALLS.labels(method_label, "error").inc(errors)
+    instrumentation.RPC_BATCH_DURATION.labels(method_label, "ok").observe(
+        time.perf_counter() - start
+    )
+    return results
+
 
+async def rpc_call(method, params):
+    """Sends a single JSON-RPC call through the batch path and returns its result."""
+    result = (await rpc_batch([(method, params)]))[0]
+    if isinstance(result, RpcError):
+        raise result
+    return result
+
+
+async def _post_batch(semaphore, transaction_ids):
+    """Fetches the details of one batch of hashes.
+
+    Returns:
+        dict: Key=transaction_id; value=rpc_status, empty if every attempt failed
+    """
+    try:
+        results = await rpc_batch(
+            [("zks_getTransactionDetails", [tx_id]) for tx_id in transaction_ids],
+            semaphore,
+        )
+    except RpcError as e:
+        logging.error(
+            f"Giving up on status batch of {len(transaction_ids)} transactions: {e}"
+        )
+        return {}
+    # Hashes the node answered with an error are left out and checked again later
+    return {
+        tx_id: rpc_status(details)
+        for tx_id, details in zip(transaction_ids, results)
+        if not isinstance(details, RpcError)
+    }
+
+
+@instrumentation.timed("fetch_transaction_statuses")
+async def fetch_zksync_rpc_statuses(transaction_ids):
+    """Retrieves the statuses the node reports for the given transaction_ids, unmapped
+
+    Args:
+        transaction_ids (string[]): string array with transaction_ids as elements
+
+    Returns:
+        dict: Key=transaction_id; value=rpc_status, hashes the node did not answer are left out
+    """
+    transaction_ids = list(dict.fromkeys(transaction_ids))
+    if not transaction_ids:
+        return {}
+
+    semaphore = asyncio.Semaphore(RPC_CONCURRENCY)
+    batches = [
+        transaction_ids[i : i + RPC_BATCH_SIZE]
+        for i in range(0, len(transaction_ids), RPC_BATCH_SIZE)
+    ]
+    results = await asyncio.gather(
+        *(_post_batch(semaphore, batch) for batch in batches)
+    )
+
+    statuses = {}
+    for batch_statuses in results:
+        statuses.update(batch_statuses)
     return statuses
 
 
+async def fetch_newest_zksync_transaction_status(transaction_ids):
+    """Retrieves all current transaction statuses from blockchain for the given array of transaction_ids
+
+    Args:
+        transaction_ids (string[]): string array with transaction_ids as elements
+
+    Returns:
+        dict: Key=transaction_id; value=transaction_status
+    """
+    statuses = await fetch_zksync_rpc_statuses(transaction_ids)
+    return {tx_id: map_zksync_status(status) for tx_id, status in statuses.items()}
+
+
 if __name__ == "__main__":
     # Example usage:
     transaction_ids = [
         "0xbfeedbbdf86f396ecfec65b61465749997626f8dcced491b9ad09b4909d31966",
         "0x39ad286efbfba427dccf6c1fe29aaf8f28b7784c754e7bcd543190ab6d6b9821",
     ]
-    status_dict = asyncio.run(fetch_newest_zksync_transaction_status(transaction_ids))
+
+    async def main():
+        try:
+            return await fetch_newest_zksync_transaction_status(transaction_ids)
+        finally:
+            await close_session()
+
+    status_dict = asyncio.run(main())
     print(status_dict)
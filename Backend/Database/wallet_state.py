@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import os
+
+import database
+import queries
+
+# Transactions rows per rebuild range; each range is recomputed in its own transaction
+REBUILD_BATCH_ROWS = int(os.getenv("WALLET_STATE_REBUILD_BATCH_ROWS", "5000"))
+
+
+def _new_delta():
+    # [registrations, registration_status, pending_count, pending_offramps]
+    return [0, None, 0, 0]
+
+
+async def _apply(conn, deltas):
+    if not deltas:
+        return
+    # Sorted so concurrent writers lock the state rows in the same order
+    wallets = sorted(deltas)
+    await conn.execute(
+        queries.APPLY_WALLET_STATE_DELTAS,
+        wallets,
+        [deltas[wallet][0] for wallet in wallets],
+        [deltas[wallet][1] for wallet in wallets],
+        [deltas[wallet][2] for wallet in wallets],
+        [deltas[wallet][3] for wallet in wallets],
+    )
+
+
+async def record_inserted(conn, transactions):
+    """Counts newly stored transactions into wallet_state.
+
+    Must run in the transaction that inserted them.
+
+    Args:
+        conn (asyncpg.Connection): connection inside that transaction
+        transactions (Record[]): inserted rows with wallet_address, transaction_type and
+            transaction_status
+    """
+    deltas = {}
+    for tx in transactions:
+        if tx["wallet_address"] is None:
+            continue
+        delta = deltas.setdefault(tx["wallet_address"], _new_delta())
+        if tx["transaction_type"] == "register":
+            delta[0] += 1
+            delta[1] = tx["transaction_status"]
+        if tx["transaction_status"] == "pending":
+            delta[2] += 1
+            if tx["transaction_type"] == "offramp":
+                delta[3] += 1
+    await _apply(conn, deltas)
+
+
+async def record_settled(conn, transactions):
+    """Counts transactions that just left the pending state out of wallet_state.
+
+    Must run in the transaction that changed their status, and only for rows that were
+    pending before, as returned by the status updates guarded on transaction_status.
+
+    Args:
+        conn (asyncpg.Connection): connection inside that transaction
+        transactions (Record[]): updated rows with wallet_address, transaction_type and the
+            new transaction_status
+    """
+    deltas = {}
+    for tx in transactions:
+        if tx["wallet_address"] is None:
+            continue
+        delta = deltas.setdefault(tx["wallet_address"], _new_delta())
+        if tx["transaction_type"] == "register":
+            delta[1] = tx["transaction_status"]
+        delta[2] -= 1
+        if tx["transaction_type"] == "offramp":
+            delta[3] -= 1
+    await _apply(conn, deltas)
+
+
+async def set_open_onramp(conn, wallet_addresses, is_open):
+    """Marks whether the wallets have an entry in openonramps."""
+    if wallet_addresses:
+        await conn.execute(
+            queries.SET_WALLET_OPEN_ONRAMP, sorted(set(wallet_addresses)), is_open
+        )
+
+
+async def get(conn, wallet_address):
+    """Returns the wallet_state row of a wallet, None for a wallet never seen."""
+    return await conn.fetchrow(queries.SELECT_WALLET_STATE, wallet_address)
+
+
+async def _rebuild_range(conn, lower, upper):
+    await conn.fetch(queries.LOCK_WALLET_STATE_RANGE, lower, upper)
+    return await conn.fetch(queries.REBUILD_WALLET_STATE_RANGE, lower, upper)
+
+
+async def rebuild(batch_rows=REBUILD_BATCH_ROWS):
+    """Recomputes wallet_state from transactions, wallet_summaries and openonramps.
+
+    Walks the wallets in address order, about batch_rows transactions per range. The state
+    rows of a range are locked while it is recomputed, so writers keep running and their
+    deltas apply on top of the recomputed values.
+
+    Returns:
+        int: number of wallets recomputed
+    """
+    async with database.get_db_connection() as conn:
+        last_wallet = await conn.fetchval(queries.SELECT_MAX_WALLET_ADDRESS)
+        if last_wallet is None:
+            return 0
+        rebuilt = 0
+        lower = ""
+        while True:
+            # Range ends come from the database, so its collation decides the order
+            upper = await conn.fetchval(
+                queries.SELECT_WALLET_RANGE_END, lower, batch_rows
+            )
+            last_range = upper is None or upper == last_wallet
+            if upper is None:
+                upper = last_wallet
+            rows = await database.run_in_transaction(conn, _rebuild_range, lower, upper)
+            rebuilt += len(rows)
+            if last_range:
+                return rebuilt
+            lower = upper
+
+
+async def main():
+    """Rebuilds wallet_state from scratch: python -m wallet_state"""
+    try:
+        rebuilt = await rebuild()
+        print(f"Rebuilt the state of {rebuilt} wallets")
+    finally:
+        await database.db_pool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())